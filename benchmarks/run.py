@@ -0,0 +1,473 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (c) 2014-2016 Scaleway and Contributors. All Rights Reserved.
+#                         Kevin Deldycke <kdeldycke@scaleway.com>
+#
+# Licensed under the BSD 2-Clause License (the "License"); you may not use this
+# file except in compliance with the License. You may obtain a copy of the
+# License at https://opensource.org/licenses/BSD-2-Clause
+
+""" Benchmark suite of ``PortRange`` hot paths.
+
+Run from the root of the repository::
+
+    $ python benchmarks/run.py
+    $ python benchmarks/run.py --save benchmarks/baseline.json
+    $ python benchmarks/run.py --compare benchmarks/baseline.json
+
+Timings are the best of several runs over a fixed, seeded workload, in
+nanoseconds per item. Memory is the traced allocation per item. Baselines
+are only comparable on the same machine and Python version.
+"""
+
+from __future__ import (absolute_import, division, print_function,
+                        unicode_literals)
+
+import argparse
+import gc
+import json
+import multiprocessing
+import os
+import platform
+import random
+import sys
+import timeit
+from collections import deque
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(
+    __file__))))
+
+from port_range import PortRange  # noqa: E402
+from port_range.allocator import PortAllocator  # noqa: E402
+from port_range.classifier import PortRuleClassifier  # noqa: E402
+from port_range.index import PortRangeIndex  # noqa: E402
+from port_range.packer import pack_rules  # noqa: E402
+from port_range.parallel import normalize_parallel  # noqa: E402
+
+try:
+    import tracemalloc
+except ImportError:  # pragma: no cover
+    tracemalloc = None
+
+# All benchmarks, registered in order by the ``benchmark`` decorator.
+BENCHMARKS = []
+
+
+def benchmark(name, size, kind='time'):
+    """ Register a function building a workload of ``size`` items.
+
+    Time benchmarks return a callable running the whole workload. Memory
+    benchmarks return a callable building and returning all objects.
+    """
+    def register(function):
+        BENCHMARKS.append((name, size, kind, function))
+        return function
+    return register
+
+
+def workload(size, seed=42):
+    """ Mixed real-world specifications: ports, ranges and CIDR-likes. """
+    rand = random.Random(seed)
+    specs = []
+    for _ in range(size):
+        port = rand.randint(1, 60000)
+        kind = rand.random()
+        if kind < 0.5:
+            specs.append(str(port))
+        elif kind < 0.8:
+            specs.append('{}-{}'.format(port, port + rand.randint(1, 1000)))
+        else:
+            prefix = rand.randint(6, 16)
+            specs.append('{}/{}'.format(
+                port >> (16 - prefix) << (16 - prefix) or 1, prefix))
+    return specs
+
+
+def all_cidrs():
+    """ All aligned CIDR-like blocks of the port space. """
+    return [
+        '{}/{}'.format(base, prefix) for prefix in range(1, 17)
+        for base in range(1 << (16 - prefix), 65536, 1 << (16 - prefix))]
+
+
+def ports(size):
+    """ Single ports spread over the whole port space. """
+    return [1 + (index * 7919) % 65535 for index in range(size)]
+
+
+@benchmark('parse.int', 100000)
+def parse_int(size):
+    specs = ports(size)
+    return lambda: [PortRange(spec) for spec in specs]
+
+
+@benchmark('parse.single_port_string', 100000)
+def parse_single_port_string(size):
+    specs = [str(port) for port in ports(size)]
+    return lambda: [PortRange(spec) for spec in specs]
+
+
+@benchmark('parse.range_string', 100000)
+def parse_range_string(size):
+    specs = ['{}-{}'.format(port, port + 100) for port in ports(size)]
+    return lambda: [PortRange(spec) for spec in specs]
+
+
+@benchmark('parse.cidr_string', 100000)
+def parse_cidr_string(size):
+    specs = ['{}/{}'.format(port, 8 + port % 9) for port in ports(size)]
+    return lambda: [PortRange(spec) for spec in specs]
+
+
+@benchmark('parse.all_cidrs', 131054)
+def parse_all_cidrs(size):
+    specs = all_cidrs()[:size]
+    return lambda: [PortRange(spec) for spec in specs]
+
+
+@benchmark('parse.cidr_strict', 100000)
+def parse_cidr_strict(size):
+    specs = [
+        '{}/{}'.format(1 << bits, prefix)
+        for bits in range(16) for prefix in range(1, 17)]
+    specs = (specs * (size // len(specs) + 1))[:size]
+    return lambda: [PortRange(spec, strict=True) for spec in specs]
+
+
+@benchmark('parse.tuple', 100000)
+def parse_tuple(size):
+    specs = [(port, port + 100) for port in ports(size)]
+    return lambda: [PortRange(spec) for spec in specs]
+
+
+@benchmark('parse.mixed', 100000)
+def parse_mixed(size):
+    specs = workload(size)
+    return lambda: [PortRange(spec) for spec in specs]
+
+
+@benchmark('parse.mixed_strict', 100000)
+def parse_mixed_strict(size):
+    specs = [
+        spec for spec in workload(size) if '/' not in spec]
+    return lambda: [PortRange(spec, strict=True) for spec in specs]
+
+
+@benchmark('parse.parse_many_raw', 100000)
+def parse_many_raw(size):
+    specs = workload(size)
+    return lambda: list(PortRange.parse_many(specs, raw=True))
+
+
+@benchmark('format.str', 100000)
+def format_str(size):
+    ranges = [PortRange(spec) for spec in workload(size)]
+    return lambda: [str(port_range) for port_range in ranges]
+
+
+@benchmark('format.repr', 100000)
+def format_repr(size):
+    ranges = [PortRange(spec) for spec in workload(size)]
+    return lambda: [repr(port_range) for port_range in ranges]
+
+
+@benchmark('format.str_all_single_ports', 65535)
+def format_str_all_single_ports(size):
+    ranges = [PortRange(port) for port in range(1, size + 1)]
+    return lambda: [str(port_range) for port_range in ranges]
+
+
+@benchmark('format.str_all_cidrs', 131054)
+def format_str_all_cidrs(size):
+    ranges = [PortRange(spec) for spec in all_cidrs()[:size]]
+    return lambda: [str(port_range) for port_range in ranges]
+
+
+@benchmark('hash', 100000)
+def hash_ranges(size):
+    ranges = [PortRange(spec) for spec in workload(size)]
+    return lambda: [hash(port_range) for port_range in ranges]
+
+
+@benchmark('property.prefix', 100000)
+def property_prefix(size):
+    ranges = [PortRange(spec) for spec in workload(size)]
+    return lambda: [port_range.prefix for port_range in ranges]
+
+
+@benchmark('property.is_cidr', 100000)
+def property_is_cidr(size):
+    ranges = [PortRange(spec) for spec in workload(size)]
+    return lambda: [port_range.is_cidr for port_range in ranges]
+
+
+@benchmark('property.is_cidr_all_single_ports', 65535)
+def property_is_cidr_all_single_ports(size):
+    ranges = [PortRange(port) for port in range(1, size + 1)]
+    return lambda: [port_range.is_cidr for port_range in ranges]
+
+
+@benchmark('property.prefix_all_cidrs', 131054)
+def property_prefix_all_cidrs(size):
+    ranges = [PortRange(spec) for spec in all_cidrs()[:size]]
+    return lambda: [port_range.prefix for port_range in ranges]
+
+
+@benchmark('property.offset', 100000)
+def property_offset(size):
+    ranges = [PortRange(spec) for spec in workload(size)]
+    return lambda: [port_range.offset for port_range in ranges]
+
+
+@benchmark('container.set_1m', 1000000)
+def container_set(size):
+    ranges = [PortRange(spec) for spec in workload(size)]
+    return lambda: set(ranges)
+
+
+@benchmark('container.dict_1m', 1000000)
+def container_dict(size):
+    ranges = [PortRange(spec) for spec in workload(size)]
+    lookups = ranges[::-1]
+
+    def run():
+        index = dict.fromkeys(ranges, True)
+        return [index[port_range] for port_range in lookups]
+    return run
+
+
+@benchmark('memory.port_range', 100000, kind='memory')
+def memory_port_range(size):
+    specs = workload(size)
+    return lambda: [PortRange(spec) for spec in specs]
+
+
+@benchmark('index.build_100k', 100000)
+def index_build(size):
+    table = [(spec, rule_id) for rule_id, spec in enumerate(workload(size))]
+    return lambda: PortRangeIndex(table)
+
+
+@benchmark('index.first_100k', 100000)
+def index_first(size):
+    index = PortRangeIndex(
+        (spec, rule_id) for rule_id, spec in enumerate(workload(size)))
+    lookups = ports(size)
+    return lambda: [index.first(port) for port in lookups]
+
+
+@benchmark('index.match_100k', 100000)
+def index_match(size):
+    index = PortRangeIndex(
+        (spec, rule_id) for rule_id, spec in enumerate(workload(size)))
+    lookups = ports(size)
+    return lambda: [list(index.match(port)) for port in lookups]
+
+
+def rules(size, seed=42):
+    """ ACL rules on both ports, some of them matching any protocol or
+    source port.
+    """
+    rand = random.Random(seed)
+    sources = workload(size, seed + 1)
+    return [
+        (rand.choice(('tcp', 'udp', None)),
+         None if rand.random() < 0.7 else source, destination, rule_id)
+        for rule_id, (source, destination) in enumerate(
+            zip(sources, workload(size, seed)))]
+
+
+@benchmark('classifier.build_100k', 100000)
+def classifier_build(size):
+    table = rules(size)
+    return lambda: PortRuleClassifier(table)
+
+
+@benchmark('classifier.first_100k', 100000)
+def classifier_first(size):
+    classifier = PortRuleClassifier(rules(size))
+    flows = list(zip(
+        ['tcp', 'udp', 'icmp'] * size, ports(size), ports(size)[::-1]))
+    return lambda: [
+        classifier.first(protocol, src_port, dst_port)
+        for protocol, src_port, dst_port in flows]
+
+
+@benchmark('memory.classifier_100k', 100000, kind='memory')
+def memory_classifier(size):
+    table = rules(size)
+    return lambda: PortRuleClassifier(table)
+
+
+def sparse_workload(size, seed=42):
+    """ Ports and short ranges on every fourth port, which don't coalesce
+    into a handful of ranges like the mixed workload does.
+    """
+    rand = random.Random(seed)
+    specs = []
+    for _ in range(size):
+        port = rand.randrange(1, 65536, 4)
+        if rand.random() < 0.7:
+            specs.append(str(port))
+        else:
+            specs.append('{}-{}'.format(
+                port, min(port + rand.randint(1, 2), 65535)))
+    return specs
+
+
+@benchmark('packer.multiport_100k', 100000)
+def packer_multiport(size):
+    specs = sparse_workload(size)
+    return lambda: pack_rules(specs, range_cost=2, overcoverage=1000)
+
+
+@benchmark('packer.masks_100k', 100000)
+def packer_masks(size):
+    specs = sparse_workload(size)
+    return lambda: pack_rules(specs, masks=True, overcoverage=1000)
+
+
+def allocator_cycle(occupancy):
+    """ Benchmark of ``release()`` and ``allocate()`` cycles at a fixed
+    occupancy of the Linux ephemeral port pool.
+    """
+    def factory(size):
+        allocator = PortAllocator('32768-60999', seed=42)
+        held = deque(
+            allocator.allocate()
+            for _ in range(allocator.size * occupancy // 100))
+
+        def run():
+            # Release the oldest port, then allocate a random free one.
+            for _ in range(size):
+                allocator.release(held.popleft())
+                held.append(allocator.allocate())
+        return run
+    return factory
+
+
+for occupancy in (90, 95, 99):
+    benchmark('allocator.cycle_{}'.format(occupancy), 100000)(
+        allocator_cycle(occupancy))
+
+
+def parallel_normalize(workers):
+    """ Benchmark of ``normalize_parallel()`` on a number of workers. """
+    def factory(size):
+        specs = workload(size)
+        return lambda: normalize_parallel(
+            specs, workers=workers, shard_size=50000)
+    return factory
+
+
+# Scaling across cores, to compare on hosts with at least 4 CPUs.
+for workers in (1, 2, 4):
+    benchmark('parallel.normalize_{}_workers'.format(workers), 1000000)(
+        parallel_normalize(workers))
+
+
+def measure_time(factory, size, repeat):
+    """ Best time per item, in nanoseconds. """
+    run = factory(size)
+    timer = timeit.Timer(run)
+    return min(timer.repeat(repeat=repeat, number=1)) / size * 1e9
+
+
+def measure_memory(factory, size):
+    """ Traced memory allocated per item, in bytes. """
+    if tracemalloc is None:  # pragma: no cover
+        return None
+    build = factory(size)
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    objects = build()
+    # Don't account for the list holding objects.
+    allocated = tracemalloc.get_traced_memory()[0] - before - sys.getsizeof(
+        objects)
+    tracemalloc.stop()
+    return allocated / size
+
+
+def run(pattern=None, scale=1, repeat=5):
+    """ Run all benchmarks whose name contains the pattern. """
+    results = {}
+    for name, size, kind, factory in BENCHMARKS:
+        if pattern and pattern not in name:
+            continue
+        size = max(int(size * scale), 1)
+        if kind == 'memory':
+            value = measure_memory(factory, size)
+        else:
+            value = measure_time(factory, size, repeat)
+        if value is None:  # pragma: no cover
+            continue
+        results[name] = {'kind': kind, 'size': size, 'value': value}
+        unit = 'B/item' if kind == 'memory' else 'ns/item'
+        print('{:<32} {:>12.1f} {}'.format(name, value, unit))
+    return results
+
+
+def compare(results, baseline, threshold):
+    """ Print changes against a baseline and return regressed benchmarks.
+    """
+    regressions = []
+    cpus = baseline.get('cpus')
+    if cpus is not None and cpus != multiprocessing.cpu_count():
+        print('\nBaseline was measured on {} CPUs, not {}.'.format(
+            cpus, multiprocessing.cpu_count()))
+    print('\n{:<32} {:>12} {:>12} {:>8}'.format(
+        'benchmark', 'baseline', 'current', 'change'))
+    for name, result in sorted(results.items()):
+        reference = baseline['results'].get(name)
+        if reference is None:
+            continue
+        change = result['value'] / reference['value'] - 1
+        flag = ''
+        if change > threshold:
+            regressions.append(name)
+            flag = '  REGRESSION'
+        print('{:<32} {:>12.1f} {:>12.1f} {:>+7.1%}{}'.format(
+            name, reference['value'], result['value'], change, flag))
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument(
+        '-k', '--filter', help="Only run benchmarks containing this string.")
+    parser.add_argument(
+        '--scale', type=float, default=1,
+        help="Scale factor of workload sizes (default: 1).")
+    parser.add_argument(
+        '--repeat', type=int, default=5,
+        help="Number of timed runs per benchmark (default: 5).")
+    parser.add_argument('--save', help="Write results to a JSON baseline.")
+    parser.add_argument(
+        '--compare', help="Compare results against a JSON baseline.")
+    parser.add_argument(
+        '--threshold', type=float, default=0.2,
+        help="Slowdown ratio reported as a regression (default: 0.2).")
+    args = parser.parse_args(argv)
+
+    results = run(args.filter, args.scale, args.repeat)
+    if args.save:
+        with open(args.save, 'w') as baseline:
+            json.dump({
+                'python': platform.python_version(),
+                'implementation': platform.python_implementation(),
+                'machine': platform.machine(),
+                'cpus': multiprocessing.cpu_count(),
+                'results': results,
+            }, baseline, indent=2, sort_keys=True)
+            baseline.write('\n')
+    if args.compare:
+        with open(args.compare) as baseline:
+            regressions = compare(results, json.load(baseline), args.threshold)
+        if regressions:
+            return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -14,7 +14,9 @@
 from __future__ import (absolute_import, division, print_function,
                         unicode_literals)
 
-import math
+import threading
+from collections import OrderedDict, namedtuple
+
 try:
     from collections.abc import Iterable  # noqa
 except ImportError:  # pragma: no cover
@@ -30,20 +32,126 @@ try:
 except NameError:  # pragma: no cover
     basestring = (str, bytes)  # pylint: disable=C0103
 
+try:
+    port_sequence = xrange
+except NameError:  # pragma: no cover
+    port_sequence = range  # pylint: disable=C0103
+
+try:
+    integer_types = (int, long)
+except NameError:  # pragma: no cover
+    integer_types = (int,)  # pylint: disable=C0103
+
 __version__ = '2.2.1'
 
+# Bypass immutability of instances while they are being initialized.
+_setattr = object.__setattr__
+
+
+def _coalesce(bounds):
+    """ Merge a list of ``(port_from, port_to)`` tuples sorted by lower bound.
+
+    Overlapping and adjacent ranges are collapsed into a single one. Returns a
+    new list of non-overlapping, non-adjacent, sorted bounds.
+    """
+    merged = []
+    for port_from, port_to in bounds:
+        if merged and port_from <= merged[-1][1] + 1:
+            if port_to > merged[-1][1]:
+                merged[-1] = (merged[-1][0], port_to)
+        else:
+            merged.append((port_from, port_to))
+    return merged
+
+
+def _chunk_bounds(bounds, size, aligned=False):
+    """ Split ``(port_from, port_to)`` tuples into blocks of ``size`` ports.
+
+    Aligned blocks start and end on multiples of ``size``, which must be a
+    power of two, so that all full blocks are CIDR-like.
+    """
+    if size < 1:
+        raise ValueError("Chunk size must be strictly positive.")
+    if aligned and size & (size - 1):
+        raise ValueError("Aligned chunk size must be a power of two.")
+    return _iter_chunk_bounds(bounds, size, aligned)
+
+
+def _iter_chunk_bounds(bounds, size, aligned):
+    """ Generator behind ``_chunk_bounds``, once arguments are checked. """
+    for port_from, port_to in bounds:
+        while port_from <= port_to:
+            if aligned:
+                chunk_to = port_from | (size - 1)
+            else:
+                chunk_to = port_from + size - 1
+            if chunk_to > port_to:
+                chunk_to = port_to
+            yield port_from, chunk_to
+            port_from = chunk_to + 1
+
+
+def _restore(cls, port_from, port_to, strict):
+    """ Unpickle a range from its normalized bounds, skipping parsing. """
+    return cls._from_bounds(port_from, port_to, strict)
 
-class PortRange(object):
+
+class ParseError(ValueError):
+
+    """ Failure to parse one item of a stream of port ranges. """
+
+    def __init__(self, message, index, port_range):
+        super(ParseError, self).__init__(message)
+        self.index = index
+        self.port_range = port_range
+
+    def __reduce__(self):
+        return self.__class__, (self.args[0], self.index, self.port_range)
+
+    def __str__(self):
+        return 'Item #{} ({!r}): {}'.format(
+            self.index, self.port_range,
+            super(ParseError, self).__str__())
+
+
+class _PortRangeType(type):
+
+    """ Derive the max port of range classes from their port length.
+
+    Subclasses only have to set ``port_length`` to handle other port spaces.
+    """
+
+    def __init__(cls, name, bases, attrs):
+        super(_PortRangeType, cls).__init__(name, bases, attrs)
+        if 'port_length' in attrs and 'port_max' not in attrs:
+            cls.port_max = (1 << cls.port_length) - 1
+
+
+# Python 2 and 3 compatible way of attaching a metaclass.
+_PortRangeBase = _PortRangeType(str('_PortRangeBase'), (object,), {
+    '__slots__': ()})
+
+
+class PortRange(_PortRangeBase):
 
     """ Port range with support of a CIDR-like (binary) notation.
 
     In strict mode (disabled by default) we'll enforce the following rules:
         * port base must be a power of two (offsets not allowed);
-        * port range must be within the 1-65535 inclusive range.
+        * port range must be within the ``port_min``-``port_max`` inclusive
+          range.
 
     This mode can be disabled on object creation.
+
+    Ports are 16-bit integers by default, from 1 to 65535. Subclasses can set
+    another ``port_length``, from which ``port_max`` is derived.
+
+    Instances are immutable: bounds are set once on creation and derived
+    properties are computed from them with integer bit operations.
     """
 
+    __slots__ = ('port_from', 'port_to', 'strict', '_prefix')
+
     # Separators constants for CIDR and range notation.
     CIDR_SEP = '/'
     RANGE_SEP = '-'
@@ -52,26 +160,67 @@ class PortRange(object):
     port_length = 16
     # Max port range integer values
     port_min = 1
-    port_max = (2 ** port_length) - 1
-
-    # Base values on which all other properties are computed.
-    port_from = None
-    port_to = None
+    port_max = (1 << port_length) - 1
 
     def __init__(self, port_range, strict=False):
         """ Set up class with a port_from and port_to integer. """
-        self.strict = strict
-        self.port_from, self.port_to = self.parse(port_range)
+        _setattr(self, 'strict', strict)
+        port_from, port_to = self.parse(port_range)
+        # Base values on which all other properties are computed.
+        _setattr(self, 'port_from', port_from)
+        _setattr(self, 'port_to', port_to)
+        _setattr(self, '_prefix', self._delta_prefix(port_to - port_from + 1))
+
+    @classmethod
+    def _from_bounds(cls, port_from, port_to, strict=False):
+        """ Create a range from already normalized bounds, skipping parsing.
+        """
+        port_range = cls.__new__(cls)
+        _setattr(port_range, 'strict', strict)
+        _setattr(port_range, 'port_from', port_from)
+        _setattr(port_range, 'port_to', port_to)
+        _setattr(port_range, '_prefix', cls._delta_prefix(
+            port_to - port_from + 1))
+        return port_range
+
+    def __setattr__(self, name, value):
+        raise AttributeError(
+            "{} objects are immutable.".format(self.__class__.__name__))
+
+    def __delattr__(self, name):
+        self.__setattr__(name, None)
+
+    def __reduce__(self):
+        return _restore, (
+            self.__class__, self.port_from, self.port_to, self.strict)
 
     def parse(self, port_range):
         """ Parse and normalize a string or iterable into a port range. """
-        # Any string containing a CIDR separator is parsed as a CIDR-like
-        # notation, others as a range or single port.
-        cidr_notation = False
+        # Fast path for strings. Any string containing a CIDR separator is
+        # parsed as a CIDR-like notation, others as a range or single port.
         if isinstance(port_range, basestring):
-            cidr_notation = self.CIDR_SEP in port_range
-            separator = self.CIDR_SEP if cidr_notation else self.RANGE_SEP
-            port_range = port_range.split(separator, 1)
+            if self.CIDR_SEP in port_range:
+                base, _, prefix = port_range.partition(self.CIDR_SEP)
+                # Transform CIDR notation into a port range and validates it.
+                return self._normalize(
+                    *self._cidr_to_range(int(base), int(prefix)))
+            port_from, separator, port_to = port_range.partition(
+                self.RANGE_SEP)
+            return self._normalize(
+                int(port_from), int(port_to) if separator else None)
+
+        # Fast path for single integers, other ranges and short sequences.
+        if type(port_range) is int:
+            return self._normalize(port_range, None)
+        if isinstance(port_range, PortRange):
+            return self._normalize(port_range.port_from, port_range.port_to)
+        if type(port_range) in (tuple, list) and 0 < len(port_range) < 3:
+            try:
+                port_from = int(port_range[0])
+                port_to = int(port_range[1]) if len(port_range) == 2 else None
+            except TypeError:
+                raise ValueError("Can't parse range as a list of integers.")
+            return self._normalize(port_from, port_to)
 
         # We expect here a list of elements castable to integers.
         if not isinstance(port_range, Iterable):
@@ -85,21 +234,15 @@ class PortRange(object):
         if not 0 < len(port_range) < 3:
             raise ValueError("Expecting a list of one or two elements.")
 
-        # Transform CIDR notation into a port range and validates it.
-        if cidr_notation:
-            base, prefix = port_range
-            port_range = self._cidr_to_range(base, prefix)
-
-        # Let the parser fix a reverse-ordered range in non-strict mode.
-        if not self.strict:
-            port_range.sort()
-
-        # Get port range bounds.
-        port_from = port_range[0]
         # Single port gets their upper bound set to None.
-        port_to = port_range[1] if len(port_range) == 2 else None
+        return self._normalize(
+            port_range[0], port_range[1] if len(port_range) == 2 else None)
+
+    def _normalize(self, port_from, port_to):
+        """ Validate, sort and clamp the bounds of a parsed port range.
 
-        # Validate constraints in strict mode.
+        Single ports are expected to have their upper bound set to None.
+        """
         if self.strict:
             # Disallow out-of-bounds values.
             if not (self.port_min <= port_from <= self.port_max) or (
@@ -109,25 +252,219 @@ class PortRange(object):
             # Disallow reversed range.
             if port_to is not None and port_from > port_to:
                 raise ValueError("Invalid reversed port range.")
+        # Let the parser fix a reverse-ordered range in non-strict mode.
+        elif port_to is not None and port_to < port_from:
+            port_from, port_to = port_to, port_from
 
         # Clamp down lower bound, then cap it.
-        port_from = min([max([port_from, self.port_min]), self.port_max])
+        if port_from < self.port_min:
+            port_from = self.port_min
+        elif port_from > self.port_max:
+            port_from = self.port_max
 
         # Single port gets its upper bound aligned to its lower one.
         if port_to is None:
             port_to = port_from
-
         # Cap upper bound.
-        port_to = min([port_to, self.port_max])
+        elif port_to > self.port_max:
+            port_to = self.port_max
 
         return port_from, port_to
 
+    @classmethod
+    def cached(cls, port_range, strict=False):
+        """ Return a shared instance from the module-level ``range_cache``.
+        """
+        return range_cache.get(port_range, strict, cls)
+
+    @classmethod
+    def parse_many(cls, port_ranges, strict=False, on_error='raise',
+                   errors=None, raw=False, start=0):
+        """ Lazily parse an iterable of port range specifications.
+
+        Yields a ``PortRange`` object for each item, or a tuple of its bounds
+        if ``raw`` is set. Items are numbered from ``start``.
+
+        Invalid items are reported as ``ParseError`` exceptions depending on
+        ``on_error``:
+            * ``raise``: raise the error, which stops the parsing;
+            * ``skip``: ignore the item;
+            * ``collect``: ignore the item and append the error to the
+              ``errors`` list.
+        """
+        if on_error not in ('raise', 'skip', 'collect'):
+            raise ValueError("Unknown error policy {!r}.".format(on_error))
+        if on_error == 'collect' and errors is None:
+            raise ValueError("An errors list is required to collect them.")
+        return cls._parse_many(
+            port_ranges, strict, on_error, errors, raw, start)
+
+    @classmethod
+    def _parse_many(cls, port_ranges, strict, on_error, errors, raw, start):
+        """ Generator behind ``parse_many``, once its arguments are checked.
+        """
+        # A single bare instance holds the strict flag used by the parser.
+        parser = cls.__new__(cls)
+        _setattr(parser, 'strict', strict)
+        parse = parser.parse
+        for index, port_range in enumerate(port_ranges, start):
+            try:
+                port_from, port_to = parse(port_range)
+            except ValueError as error:
+                if on_error == 'skip':
+                    continue
+                error = ParseError(str(error), index, port_range)
+                if on_error == 'raise':
+                    raise error
+                errors.append(error)
+                continue
+            if raw:
+                yield port_from, port_to
+            else:
+                yield cls._from_bounds(port_from, port_to, strict)
+
+    def _coerce(self, other):
+        """ Cast an operand to a ``PortRange`` if not already one. """
+        if isinstance(other, PortRange):
+            return other
+        return self.__class__(other, strict=self.strict)
+
     def __eq__(self, other):
         """ Compare two port ranges. """
-        return self.bounds == other.bounds
+        if not isinstance(other, PortRange):
+            return NotImplemented
+        return (self.port_from == other.port_from and
+                self.port_to == other.port_to)
+
+    def __ne__(self, other):
+        if not isinstance(other, PortRange):
+            return NotImplemented
+        return (self.port_from != other.port_from or
+                self.port_to != other.port_to)
+
+    def __lt__(self, other):
+        """ Ranges are ordered by lower bound, then upper bound. """
+        if not isinstance(other, PortRange):
+            return NotImplemented
+        if self.port_from != other.port_from:
+            return self.port_from < other.port_from
+        return self.port_to < other.port_to
+
+    def __le__(self, other):
+        if not isinstance(other, PortRange):
+            return NotImplemented
+        if self.port_from != other.port_from:
+            return self.port_from < other.port_from
+        return self.port_to <= other.port_to
+
+    def __gt__(self, other):
+        if not isinstance(other, PortRange):
+            return NotImplemented
+        if self.port_from != other.port_from:
+            return self.port_from > other.port_from
+        return self.port_to > other.port_to
+
+    def __ge__(self, other):
+        if not isinstance(other, PortRange):
+            return NotImplemented
+        if self.port_from != other.port_from:
+            return self.port_from > other.port_from
+        return self.port_to >= other.port_to
+
+    def __contains__(self, item):
+        """ Check that a port or a whole range is within this range.
+
+        Items are integers, ranges, or strings and sequences of integers
+        parsing cleanly. Anything else, like floats, is not contained.
+        """
+        if isinstance(item, integer_types):
+            return self.port_from <= item <= self.port_to
+        if isinstance(item, basestring) or (
+                isinstance(item, (tuple, list)) and all(
+                    isinstance(bound, integer_types + (basestring,))
+                    for bound in item)):
+            try:
+                item = self._coerce(item)
+            except ValueError:
+                return False
+        elif not isinstance(item, PortRange):
+            return False
+        return self.port_from <= item.port_from and (
+            item.port_to <= self.port_to)
+
+    def issubrange(self, other):
+        """ Is this range entirely within the other? """
+        other = self._coerce(other)
+        return other.port_from <= self.port_from and (
+            self.port_to <= other.port_to)
+
+    def overlaps(self, other):
+        """ Do the two ranges share at least one port? """
+        other = self._coerce(other)
+        return self.port_from <= other.port_to and (
+            other.port_from <= self.port_to)
+
+    def adjacent(self, other):
+        """ Is the other range right before or right after this one? """
+        other = self._coerce(other)
+        return self.port_to + 1 == other.port_from or (
+            other.port_to + 1 == self.port_from)
+
+    def intersection(self, other):
+        """ Return the range of ports shared with the other, if any. """
+        other = self._coerce(other)
+        port_from = max(self.port_from, other.port_from)
+        port_to = min(self.port_to, other.port_to)
+        if port_from > port_to:
+            return None
+        return self._from_bounds(port_from, port_to, self.strict)
 
     def __hash__(self):
-        return self.__str__().__hash__()
+        return hash((self.port_from, self.port_to))
+
+    def __len__(self):
+        """ Number of ports in the range. """
+        return max(self.port_to - self.port_from + 1, 0)
+
+    def __iter__(self):
+        """ Lazily yield all ports of the range, in ascending order. """
+        return iter(port_sequence(self.port_from, self.port_to + 1))
+
+    def __reversed__(self):
+        """ Lazily yield all ports of the range, in descending order. """
+        return reversed(port_sequence(self.port_from, self.port_to + 1))
+
+    def __getitem__(self, index):
+        """ Return the port at a position, or a slice of the range.
+
+        Contiguous slices are returned as a new range. Stepped or empty slices
+        are returned as a lazy sequence of ports.
+        """
+        if isinstance(index, slice):
+            start, stop, step = index.indices(len(self))
+            if step == 1 and start < stop:
+                return self._from_bounds(
+                    self.port_from + start, self.port_from + stop - 1,
+                    self.strict)
+            return port_sequence(
+                self.port_from + start, self.port_from + stop, step)
+        length = len(self)
+        if index < 0:
+            index += length
+        if not 0 <= index < length:
+            raise IndexError("Port range index out of range.")
+        return self.port_from + index
+
+    def iter_chunks(self, size, aligned=False):
+        """ Lazily split the range into sub-ranges of at most size ports.
+
+        If ``aligned`` is set, ``size`` must be a power of two and chunks are
+        cut on multiples of it, making all full chunks CIDR-like.
+        """
+        chunks = _chunk_bounds([self.bounds], size, aligned)
+        return (
+            self._from_bounds(port_from, port_to, self.strict)
+            for port_from, port_to in chunks)
 
     def __repr__(self):
         """ Print all components of the range. """
@@ -163,12 +500,24 @@ class PortRange(object):
     @classmethod
     def _is_power_of_two(cls, value):
         """ Helper to check if a value is a power of 2. """
-        return math.log(value, 2) % 1 == 0
+        # A power of two has a single bit set.
+        return value > 0 and not value & (value - 1)
 
     @classmethod
     def _nearest_power_of_two(cls, value):
-        """ Return nearest power of 2. """
-        return int(2 ** math.floor(math.log(value, 2)))
+        """ Return nearest power of 2 below or equal to value, or 0 if none.
+        """
+        if value < 1:
+            return 0
+        return 1 << (value.bit_length() - 1)
+
+    @classmethod
+    def _delta_prefix(cls, port_delta):
+        """ Return the CIDR-like prefix of a range length, if any. """
+        # A power of two has a single bit set.
+        if port_delta & (port_delta - 1):
+            return None
+        return cls.port_length - port_delta.bit_length() + 1
 
     @classmethod
     def _mask(cls, prefix):
@@ -178,7 +527,7 @@ class PortRange(object):
     @classmethod
     def _raw_upper_bound(cls, base, prefix):
         """ Compute a raw upper bound. """
-        return base + (2 ** cls._mask(prefix)) - 1
+        return base + (1 << cls._mask(prefix)) - 1
 
     def _cidr_to_range(self, base, prefix):
         """ Transform a CIDR-like notation into a port range. """
@@ -197,6 +546,32 @@ class PortRange(object):
         port_to = self._raw_upper_bound(base, prefix)
         return [port_from, port_to]
 
+    @classmethod
+    def _aligned_blocks(cls, port_from, port_to):
+        """ Yield bounds of the minimal aligned CIDR-like blocks of a range.
+
+        Each block spans a power-of-two number of ports and starts on a
+        multiple of its own size, so it can be expressed as a base and mask.
+        """
+        while port_from <= port_to:
+            # Largest block allowed by the alignment of the lower bound...
+            if port_from:
+                bits = (port_from & -port_from).bit_length() - 1
+            else:
+                bits = cls.port_length
+            # ...that still fits within the remaining ports.
+            bits = min(bits, (port_to - port_from + 1).bit_length() - 1)
+            yield port_from, port_from + (1 << bits) - 1
+            port_from += 1 << bits
+
+    def to_cidrs(self):
+        """ Split the range into the minimal list of aligned CIDR-like blocks.
+        """
+        return [
+            self._from_bounds(port_from, port_to, self.strict)
+            for port_from, port_to in self._aligned_blocks(
+                self.port_from, self.port_to)]
+
     @property
     def bounds(self):
         """ Return lower and upper bounds of the port range. """
@@ -210,21 +585,17 @@ class PortRange(object):
     @property
     def offset(self):
         """ Port base offset from its nearest power of two. """
-        return self.base - self._nearest_power_of_two(self.base)
+        return self.port_from - self._nearest_power_of_two(self.port_from)
 
     @property
     def prefix(self):
         """ A power-of-two delta means a valid CIDR-like prefix. """
-        # Check that range delta is a power of 2
-        port_delta = self.port_to - self.port_from + 1
-        if not self._is_power_of_two(port_delta):
-            return None
-        return self.port_length - int(math.log(port_delta, 2))
+        return self._prefix
 
     @property
     def mask(self):
         """ Port range binary mask, based on CIDR-like prefix. """
-        return self._mask(self.prefix) if self.prefix else None
+        return self._mask(self._prefix) if self._prefix else None
 
     @property
     def cidr(self):
@@ -234,9 +605,129 @@ class PortRange(object):
     @property
     def is_single_port(self):
         """ Is the range a single port? """
-        return True if self.port_from == self.port_to else False
+        return self.port_from == self.port_to
 
     @property
     def is_cidr(self):
         """ Is the range can be expressed using a CIDR-like notation? """
-        return True if self.prefix is not None else False
+        return self._prefix is not None
+
+
+def summarize_range(port_from, port_to, strict=False, range_class=PortRange):
+    """ Summarize a range of ports given its bounds.
+
+    Returns an iterator of the minimal list of aligned CIDR-like
+    ``range_class`` blocks covering exactly all ports from ``port_from`` to
+    ``port_to`` inclusive. Bounds are checked upfront.
+    """
+    if port_from > port_to:
+        raise ValueError("Invalid reversed port range.")
+    if port_from < range_class.port_min or port_to > range_class.port_max:
+        raise ValueError("Out of bounds.")
+    # Blocks are already normalized: skip the clamping parser.
+    return (
+        range_class._from_bounds(block_from, block_to, strict)
+        for block_from, block_to in range_class._aligned_blocks(
+            port_from, port_to))
+
+
+def collapse_ranges(ranges, strict=False, range_class=None):
+    """ Collapse a list of port ranges into the fewest equivalent ones.
+
+    Overlapping and adjacent ranges are merged and yielded in ascending order,
+    as ``range_class`` instances. It defaults to the class of the first
+    range, so that subclasses with wider ports are not clamped. This is the
+    reverse operation of ``summarize_range``.
+    """
+    bounds = []
+    for port_range in ranges:
+        if not isinstance(port_range, PortRange):
+            port_range = (range_class or PortRange)(port_range, strict=strict)
+        if range_class is None:
+            range_class = type(port_range)
+        bounds.append(port_range.bounds)
+    bounds.sort()
+    # Merged bounds are already normalized: skip the clamping parser.
+    for port_from, port_to in _coalesce(bounds):
+        yield range_class._from_bounds(port_from, port_to, strict)
+
+
+CacheInfo = namedtuple(
+    'CacheInfo', ['hits', 'misses', 'evictions', 'maxsize', 'currsize'])
+
+
+class PortRangeCache(object):
+
+    """ Thread-safe LRU cache of parsed port ranges.
+
+    Port ranges being immutable, identical specifications can share the same
+    instance. Entries are keyed by the specification, the strict flag and the
+    class of the range. Least recently used entries are evicted once the cache
+    holds ``maxsize`` of them.
+    """
+
+    def __init__(self, maxsize=1024):
+        if maxsize < 1:
+            raise ValueError("Cache size must be strictly positive.")
+        self.maxsize = maxsize
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = self.misses = self.evictions = 0
+
+    @staticmethod
+    def _key(port_range, strict, range_class):
+        """ Hashable key of a specification. """
+        if isinstance(port_range, list):
+            port_range = tuple(port_range)
+        # Tag with the type, to not mix up ``1`` and ``True`` for instance.
+        return range_class, strict, type(port_range), port_range
+
+    def get(self, port_range, strict=False, range_class=PortRange):
+        """ Return the cached range of a specification, parsing it on misses.
+
+        Unhashable specifications are parsed without being cached. Parsing
+        errors are raised and never cached.
+        """
+        key = self._key(port_range, strict, range_class)
+        try:
+            with self._lock:
+                cached = self._entries.pop(key)
+                # Move the entry to the most recently used end.
+                self._entries[key] = cached
+                self.hits += 1
+            return cached
+        except KeyError:
+            pass
+        except TypeError:
+            return range_class(port_range, strict=strict)
+
+        # Parse outside of the lock to not serialize all threads.
+        parsed = range_class(port_range, strict=strict)
+        with self._lock:
+            self.misses += 1
+            # Another thread may have cached the same range in the meantime.
+            parsed = self._entries.setdefault(key, parsed)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+        return parsed
+
+    def __len__(self):
+        return len(self._entries)
+
+    def info(self):
+        """ Return a snapshot of the cache statistics. """
+        with self._lock:
+            return CacheInfo(
+                self.hits, self.misses, self.evictions, self.maxsize,
+                len(self._entries))
+
+    def clear(self):
+        """ Empty the cache and reset its statistics. """
+        with self._lock:
+            self._entries.clear()
+            self.hits = self.misses = self.evictions = 0
+
+
+# Default cache used by ``PortRange.cached``.
+range_cache = PortRangeCache()
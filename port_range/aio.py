@@ -0,0 +1,161 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (c) 2014-2016 Scaleway and Contributors. All Rights Reserved.
+#                         Kevin Deldycke <kdeldycke@scaleway.com>
+#
+# Licensed under the BSD 2-Clause License (the "License"); you may not use this
+# file except in compliance with the License. You may obtain a copy of the
+# License at https://opensource.org/licenses/BSD-2-Clause
+
+""" Parsing of port ranges from streams without blocking an asyncio loop.
+
+Requires Python 3.5 or newer. Older interpreters can't compile this module,
+which is neither imported by the package nor built for them.
+"""
+
+from __future__ import (absolute_import, division, print_function,
+                        unicode_literals)
+
+import asyncio
+import codecs
+import inspect
+from collections import deque
+
+from port_range import ParseError, PortRange
+
+# Only Python 3.7+ tells the running loop apart from the current one.
+_running_loop = getattr(
+    asyncio, 'get_running_loop', asyncio.get_event_loop)
+
+
+def _parse_batch(lines, strict, on_error, raw, range_class):
+    """ Parse a batch of ``(line number, line)``, maybe in another process.
+
+    Returns parsed items, collected errors, and the error which stopped the
+    parsing, if any. Errors are indexed by line number.
+    """
+    results = []
+    errors = []
+    try:
+        results.extend(range_class.parse_many(
+            [line for _, line in lines], strict=strict, on_error=on_error,
+            errors=errors, raw=raw))
+    except ParseError as error:
+        error.index = lines[error.index][0]
+        return results, errors, error
+    for error in errors:
+        error.index = lines[error.index][0]
+    return results, errors, None
+
+
+class _AsyncParser(object):
+
+    """ Asynchronous iterator behind ``aparse()``. """
+
+    def __init__(self, stream, strict, on_error, errors, raw, start,
+                 chunk_size, batch_size, executor, range_class, encoding):
+        self.stream = stream
+        self.strict = strict
+        self.on_error = on_error
+        self.errors = errors
+        self.raw = raw
+        self.chunk_size = chunk_size
+        self.batch_size = batch_size
+        self.executor = executor
+        self.range_class = range_class
+        self._decoder = codecs.getincrementaldecoder(encoding)()
+        self._lineno = start
+        self._remainder = ''
+        self._lines = []
+        self._eof = False
+        self._results = deque()
+        self._error = None
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        while not self._results:
+            if self._error is not None:
+                error, self._error = self._error, None
+                # Stop for good, like the generator of parse_many() does.
+                self._eof = True
+                self._lines = []
+                raise error
+            batch = await self._read_batch()
+            if not batch:
+                raise StopAsyncIteration
+            await self._parse(batch)
+        return self._results.popleft()
+
+    def _split(self, text, final=False):
+        """ Append complete, non-blank lines of a chunk of text, with their
+        line number.
+        """
+        lines = (self._remainder + text).split('\n')
+        self._remainder = '' if final else lines.pop()
+        for line in lines:
+            line = line.strip()
+            if line:
+                self._lines.append((self._lineno, line))
+            self._lineno += 1
+
+    async def _read_batch(self):
+        """ Read chunks until a batch of lines is available. """
+        read = self.stream.read
+        while len(self._lines) < self.batch_size and not self._eof:
+            if inspect.iscoroutinefunction(read):
+                chunk = await read(self.chunk_size)
+            else:
+                # Don't block the loop on reads of plain files.
+                chunk = await _running_loop().run_in_executor(
+                    None, read, self.chunk_size)
+            if not chunk:
+                self._eof = True
+                self._split(self._decoder.decode(b'', final=True), True)
+            elif isinstance(chunk, bytes):
+                self._split(self._decoder.decode(chunk))
+            else:
+                self._split(chunk)
+        batch = self._lines[:self.batch_size]
+        del self._lines[:self.batch_size]
+        return batch
+
+    async def _parse(self, batch):
+        """ Parse a batch inline or in the executor, and queue results. """
+        args = (batch, self.strict, self.on_error, self.raw, self.range_class)
+        if self.executor is None:
+            results, errors, error = _parse_batch(*args)
+            # Let other tasks run between batches.
+            await asyncio.sleep(0)
+        else:
+            results, errors, error = await _running_loop().run_in_executor(
+                self.executor, _parse_batch, *args)
+        self._results.extend(results)
+        if self.on_error == 'collect':
+            self.errors.extend(errors)
+        self._error = error
+
+
+def aparse(stream, strict=False, on_error='raise', errors=None, raw=False,
+           start=0, chunk_size=65536, batch_size=1000, executor=None,
+           range_class=PortRange, encoding='utf-8'):
+    """ Asynchronously parse one port range specification per line.
+
+    Returns an asynchronous iterator to use with ``async for``. ``stream`` is
+    anything with a ``read(size)`` method, either a coroutine like
+    ``asyncio.StreamReader.read()`` or a plain file method, returning bytes
+    decoded with ``encoding``, or text. Plain reads run in the default
+    executor of the loop. Blank lines are ignored, and errors are indexed by
+    line number, from ``start``.
+
+    Lines are parsed in batches of ``batch_size`` with the same rules and
+    arguments as ``PortRange.parse_many()``, yielding to the event loop
+    between batches. Batches can be offloaded to a ``concurrent.futures``
+    ``executor`` to keep the loop responsive during large reloads.
+    """
+    # Check arguments upfront, as parse_many() does.
+    range_class.parse_many((), strict, on_error, errors)
+    return _AsyncParser(
+        stream, strict, on_error, errors, raw, start, chunk_size, batch_size,
+        executor, range_class, encoding)
@@ -0,0 +1,305 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (c) 2014-2016 Scaleway and Contributors. All Rights Reserved.
+#                         Kevin Deldycke <kdeldycke@scaleway.com>
+#
+# Licensed under the BSD 2-Clause License (the "License"); you may not use this
+# file except in compliance with the License. You may obtain a copy of the
+# License at https://opensource.org/licenses/BSD-2-Clause
+
+""" Allocation of free ports from pools of port ranges.
+"""
+
+from __future__ import (absolute_import, division, print_function,
+                        unicode_literals)
+
+import random
+import threading
+
+from port_range import PortRange, integer_types
+from port_range.sets import PortRangeSet
+
+
+class PortsExhausted(LookupError):
+
+    """ No free port, or no free block of the requested size, is left. """
+
+
+class PortAllocator(object):
+
+    """ Thread-safe allocator of ports and blocks of ports from a pool.
+
+    The pool is a ``PortRangeSet``, a ``PortRange`` or anything ``PortRange``
+    can parse.
+
+    Ports are tracked by a segment tree spanning the smallest aligned
+    CIDR-like block containing the whole pool. Each node keeps its count of
+    free ports, the length of its free runs and the size of its largest fully
+    free aligned sub-block. All operations are ``O(log n)``, plus the size of
+    blocks for block operations, whatever the occupancy of the pool.
+    """
+
+    range_class = PortRange
+
+    def __init__(self, pool, strict=False, randomize=True, seed=None):
+        """ Build the tree, with all ports of the pool free. """
+        if not isinstance(pool, PortRangeSet):
+            pool = PortRangeSet([pool], strict=strict)
+        bounds = pool.bounds
+        if not bounds:
+            raise ValueError("Port pool is empty.")
+        self.strict = strict
+        self.randomize = randomize
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self.size = sum(
+            port_to - port_from + 1 for port_from, port_to in bounds)
+
+        # Smallest aligned block containing the whole pool.
+        port_from, port_to = bounds[0][0], bounds[-1][1]
+        bits = (port_from ^ port_to).bit_length()
+        self._origin = port_from >> bits << bits
+        self._leaves = 1 << bits
+
+        nodes = 2 * self._leaves
+        self._free = [0] * nodes
+        self._prefix = [0] * nodes
+        self._suffix = [0] * nodes
+        self._longest = [0] * nodes
+        self._block = [0] * nodes
+        self._pool = pool
+        for port_from, port_to in bounds:
+            for leaf in range(port_from - self._origin + self._leaves,
+                              port_to - self._origin + self._leaves + 1):
+                self._set_leaf(leaf, 1)
+        self._refresh(self._leaves, 2 * self._leaves - 1)
+
+    def _set_leaf(self, leaf, value):
+        self._free[leaf] = self._prefix[leaf] = self._suffix[leaf] = value
+        self._longest[leaf] = self._block[leaf] = value
+
+    def _assign(self, first, last, value):
+        """ Mark offsets from first to last as free (1) or used (0). """
+        first += self._leaves
+        last += self._leaves
+        if first == last:
+            self._assign_leaf(first, value)
+            return
+        for leaf in range(first, last + 1):
+            self._set_leaf(leaf, value)
+        self._refresh(first, last)
+
+    def _refresh(self, first, last):
+        """ Recompute all ancestors of a range of leaves, level by level. """
+        free = self._free
+        prefixes = self._prefix
+        suffixes = self._suffix
+        longest = self._longest
+        blocks = self._block
+        half = 1
+        while first > 1:
+            first //= 2
+            last //= 2
+            for node in range(first, last + 1):
+                left = 2 * node
+                right = left + 1
+                count = free[left] + free[right]
+                free[node] = count
+                prefix = prefixes[left]
+                prefixes[node] = (
+                    prefix if prefix < half else half + prefixes[right])
+                suffix = suffixes[right]
+                suffixes[node] = (
+                    suffix if suffix < half else half + suffixes[left])
+                longest[node] = max(
+                    longest[left], longest[right],
+                    suffixes[left] + prefixes[right])
+                blocks[node] = 2 * half if count == 2 * half else max(
+                    blocks[left], blocks[right])
+            half *= 2
+
+    def _assign_leaf(self, leaf, value):
+        """ Fast path of ``_assign`` for a single leaf.
+
+        Free counts are updated up to the root, but the recomputation of runs
+        stops at the first ancestor left unchanged.
+        """
+        delta = value - self._free[leaf]
+        self._set_leaf(leaf, value)
+        free = self._free
+        node = leaf // 2
+        while node:
+            free[node] += delta
+            node //= 2
+
+        prefixes = self._prefix
+        suffixes = self._suffix
+        longest = self._longest
+        blocks = self._block
+        half = 1
+        node = leaf // 2
+        while node:
+            left = 2 * node
+            right = left + 1
+            prefix = prefixes[left]
+            if prefix == half:
+                prefix += prefixes[right]
+            suffix = suffixes[right]
+            if suffix == half:
+                suffix += suffixes[left]
+            run = suffixes[left] + prefixes[right]
+            if longest[left] > run:
+                run = longest[left]
+            if longest[right] > run:
+                run = longest[right]
+            if free[node] == 2 * half:
+                block = 2 * half
+            else:
+                block = max(blocks[left], blocks[right])
+            if (prefix == prefixes[node] and suffix == suffixes[node] and
+                    run == longest[node] and block == blocks[node]):
+                break
+            prefixes[node] = prefix
+            suffixes[node] = suffix
+            longest[node] = run
+            blocks[node] = block
+            node //= 2
+            half *= 2
+
+    def _count_free(self, first, last):
+        """ Number of free ports between two offsets. """
+        count = 0
+        first += self._leaves
+        last += self._leaves + 1
+        while first < last:
+            if first & 1:
+                count += self._free[first]
+                first += 1
+            if last & 1:
+                last -= 1
+                count += self._free[last]
+            first //= 2
+            last //= 2
+        return count
+
+    @property
+    def free(self):
+        """ Number of free ports. """
+        return self._free[1]
+
+    @property
+    def used(self):
+        """ Number of allocated ports. """
+        return self.size - self._free[1]
+
+    @property
+    def occupancy(self):
+        """ Ratio of allocated ports in the pool. """
+        return self.used / self.size
+
+    def allocate(self):
+        """ Allocate a single free port and return it.
+
+        The port is picked uniformly among all free ones if ``randomize`` is
+        set, or is the lowest free port otherwise.
+        """
+        with self._lock:
+            free = self._free[1]
+            if not free:
+                raise PortsExhausted(
+                    "All {} ports of the pool are allocated.".format(
+                        self.size))
+            rank = self._random.randrange(free) if self.randomize else 0
+            # Descend to the leaf of the free port of that rank.
+            node = 1
+            while node < self._leaves:
+                node *= 2
+                if self._free[node] <= rank:
+                    rank -= self._free[node]
+                    node += 1
+            self._assign(node - self._leaves, node - self._leaves, 0)
+            return node - self._leaves + self._origin
+
+    def allocate_block(self, size, aligned=False):
+        """ Allocate a contiguous block of ports and return it as a range.
+
+        The lowest fitting block is returned. If ``aligned`` is set, the size
+        must be a power of two and the block is a CIDR-like range whose lower
+        bound is a multiple of its size.
+        """
+        if size < 1:
+            raise ValueError("Block size must be strictly positive.")
+        if aligned and size & (size - 1):
+            raise ValueError("Aligned block size must be a power of two.")
+        with self._lock:
+            if aligned:
+                offset = self._find_aligned(size)
+            else:
+                offset = self._find_contiguous(size)
+            if offset is None:
+                raise PortsExhausted(
+                    "No {}block of {} free ports left ({} of {} ports "
+                    "free).".format(
+                        'aligned ' if aligned else '', size, self.free,
+                        self.size))
+            self._assign(offset, offset + size - 1, 0)
+        return self.range_class._from_bounds(
+            offset + self._origin, offset + self._origin + size - 1,
+            self.strict)
+
+    def _find_contiguous(self, size):
+        """ Offset of the lowest run of free ports of at least that size. """
+        if self._longest[1] < size:
+            return None
+        node = 1
+        start = 0
+        while node < self._leaves:
+            half = self._leaves >> node.bit_length()
+            left = 2 * node
+            if self._longest[left] >= size:
+                node = left
+            elif self._suffix[left] + self._prefix[left + 1] >= size:
+                # The run straddles both children.
+                return start + half - self._suffix[left]
+            else:
+                node = left + 1
+                start += half
+        return start
+
+    def _find_aligned(self, size):
+        """ Offset of the lowest fully free aligned block of that size. """
+        if self._block[1] < size:
+            return None
+        # Nodes of that size cover aligned blocks: descend to their level.
+        node = 1
+        start = 0
+        node_size = self._leaves
+        while node_size > size:
+            node_size //= 2
+            node *= 2
+            if self._block[node] < size:
+                node += 1
+                start += node_size
+        return start
+
+    def release(self, ports):
+        """ Give back a port or a range of ports to the pool. """
+        if isinstance(ports, integer_types):
+            port_from = port_to = ports
+        else:
+            if not isinstance(ports, PortRange):
+                ports = self.range_class(ports, strict=self.strict)
+            port_from, port_to = ports.bounds
+        if ports not in self._pool:
+            raise ValueError("Ports are not part of the pool.")
+        first = port_from - self._origin
+        last = port_to - self._origin
+        with self._lock:
+            if self._count_free(first, last):
+                raise ValueError("Ports are not allocated.")
+            self._assign(first, last, 1)
+
+    def is_allocated(self, port):
+        """ Is the port of the pool allocated? """
+        return port in self._pool and not self._free[
+            port - self._origin + self._leaves]
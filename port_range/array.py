@@ -0,0 +1,276 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (c) 2014-2016 Scaleway and Contributors. All Rights Reserved.
+#                         Kevin Deldycke <kdeldycke@scaleway.com>
+#
+# Licensed under the BSD 2-Clause License (the "License"); you may not use this
+# file except in compliance with the License. You may obtain a copy of the
+# License at https://opensource.org/licenses/BSD-2-Clause
+
+""" Columnar arrays of port ranges, backed by NumPy.
+
+NumPy is an optional dependency, available through the ``numpy`` extra.
+"""
+
+from __future__ import (absolute_import, division, print_function,
+                        unicode_literals)
+
+from port_range import PortRange
+
+try:
+    import numpy
+except ImportError:  # pragma: no cover
+    numpy = None
+
+
+class PortRangeArray(object):
+
+    """ Array of port ranges stored as two columns of integers.
+
+    Bulk parsing follows the exact same rules as ``PortRange.parse``, in
+    strict and non-strict mode, and raises the same errors. Properties and
+    predicates are vectorized and return NumPy arrays with one item per range.
+    """
+
+    range_class = PortRange
+
+    def __init__(self, port_from, port_to):
+        """ Wrap two columns of normalized lower and upper bounds. """
+        if numpy is None:  # pragma: no cover
+            raise ImportError("PortRangeArray requires NumPy.")
+        port_from = numpy.asarray(port_from)
+        port_to = numpy.asarray(port_to)
+        if port_from.shape != port_to.shape or port_from.ndim != 1:
+            raise ValueError("Bounds must be two columns of the same length.")
+        dtype = self._dtype(port_from, port_to)
+        self.port_from = port_from.astype(dtype, copy=False)
+        self.port_to = port_to.astype(dtype, copy=False)
+
+    @classmethod
+    def _dtype(cls, *columns):
+        """ Smallest integer type holding the port space and all bounds. """
+        dtype = numpy.min_scalar_type(cls.range_class.port_max)
+        for column in columns:
+            if column.size:
+                dtype = numpy.promote_types(
+                    dtype, numpy.min_scalar_type(column.min()))
+                dtype = numpy.promote_types(
+                    dtype, numpy.min_scalar_type(column.max()))
+        return dtype
+
+    @classmethod
+    def from_ranges(cls, ranges, strict=False):
+        """ Build an array from an iterable of ranges, parsed one by one. """
+        bounds = [
+            port_range.bounds if isinstance(port_range, PortRange)
+            else cls.range_class(port_range, strict=strict).bounds
+            for port_range in ranges]
+        if not bounds:
+            return cls([], [])
+        port_from, port_to = zip(*bounds)
+        return cls(port_from, port_to)
+
+    @classmethod
+    def parse(cls, specs, strict=False):
+        """ Parse and normalize an array of port range specifications.
+
+        Arrays of strings and of integers are parsed in bulk. Any other input
+        falls back to parsing each item with ``PortRange``.
+        """
+        if numpy is None:  # pragma: no cover
+            raise ImportError("PortRangeArray requires NumPy.")
+        # Ranges are sequences of ports: don't let NumPy expand them.
+        if isinstance(specs, (list, tuple)) and specs and isinstance(
+                specs[0], PortRange):
+            return cls.from_ranges(specs, strict)
+        try:
+            array = numpy.asarray(specs)
+        except ValueError:
+            # Sequences of mixed lengths can't be cast to arrays.
+            return cls.from_ranges(specs, strict)
+        if array.ndim != 1 or array.dtype.kind not in 'Uiu':
+            return cls.from_ranges(specs, strict)
+        # Unsigned integers above the int64 range would wrap when cast.
+        if array.dtype.kind == 'u' and array.size and (
+                array.max() > numpy.iinfo(numpy.int64).max):
+            return cls.from_ranges(array.tolist(), strict)
+        try:
+            if array.dtype.kind == 'U':
+                port_from, port_to, invalid = cls._parse_strings(
+                    array, strict)
+            else:
+                port_from, port_to, invalid = cls._normalize(
+                    array.astype(numpy.int64), None, strict)
+        except (ValueError, OverflowError):
+            # Integers not fitting the vectorized path: let the scalar parser
+            # handle them.
+            return cls.from_ranges(array.tolist(), strict)
+        if invalid.any():
+            # Reproduce the exact error the scalar parser raises.
+            cls.range_class(array[invalid.argmax()].item(), strict=strict)
+            return cls.from_ranges(array.tolist(), strict)  # pragma: no cover
+        return cls(port_from, port_to)
+
+    @classmethod
+    def _parse_strings(cls, array, strict):
+        """ Vectorized parsing of an array of strings. """
+        range_class = cls.range_class
+        cidr = numpy.char.find(array, range_class.CIDR_SEP) >= 0
+        range_parts = numpy.char.partition(array, range_class.RANGE_SEP)
+        # Only split on CIDR separators if needed: parts are picked by mask.
+        cidr_parts = range_parts
+        if cidr.any():
+            cidr_parts = numpy.char.partition(array, range_class.CIDR_SEP)
+        single = ~cidr & (range_parts[:, 1] == '')
+
+        first = numpy.where(cidr, cidr_parts[:, 0], range_parts[:, 0])
+        # Single ports have no second member: cast a placeholder instead.
+        second = numpy.where(
+            cidr, cidr_parts[:, 2],
+            numpy.where(single, '0', range_parts[:, 2]))
+        first = cls._str_to_int(first)
+        second = cls._str_to_int(second)
+
+        # Transform CIDR notation into a port range and validates it.
+        invalid = cidr & (
+            (first < range_class.port_min) | (first > range_class.port_max) |
+            (second < 1) | (second > range_class.port_length))
+        if strict:
+            # Disallow offsets in strict mode.
+            invalid |= cidr & (second != range_class.port_length) & (
+                (first & (first - 1)) != 0)
+        shift = numpy.clip(range_class.port_length - second, 0, 62)
+        second = numpy.where(cidr, first + (1 << shift) - 1, second)
+
+        port_from, port_to, normalize_invalid = cls._normalize(
+            first, numpy.ma.masked_array(second, mask=single), strict)
+        return port_from, port_to, invalid | normalize_invalid
+
+    @staticmethod
+    def _str_to_int(strings):
+        """ Cast an array of strings to integers.
+
+        Strings made of ASCII digits only are decoded in bulk from their code
+        points. All others go through ``int()`` for identical semantics.
+        """
+        width = strings.dtype.itemsize // 4
+        # Keep away from 64-bit integer overflows.
+        if not 0 < width < 19:
+            return strings.astype(numpy.int64)
+        strings = numpy.ascontiguousarray(strings)
+        codes = strings.view(numpy.uint32).reshape(len(strings), width)
+        is_digit = (codes >= 48) & (codes <= 57)
+        digits = codes.astype(numpy.int64) - 48
+        values = numpy.zeros(len(strings), dtype=numpy.int64)
+        for position in range(width):
+            values = numpy.where(
+                is_digit[:, position], values * 10 + digits[:, position],
+                values)
+        # Strings are padded with trailing NULs: only digits before them.
+        plain = is_digit.sum(axis=1) == numpy.char.str_len(strings)
+        plain &= is_digit[:, 0]
+        if not plain.all():
+            values[~plain] = strings[~plain].astype(numpy.int64)
+        return values
+
+    @classmethod
+    def _normalize(cls, port_from, port_to, strict):
+        """ Vectorized validation, sorting and clamping of parsed bounds.
+
+        Upper bounds of single ports are expected to be masked, or the whole
+        column set to None.
+        """
+        range_class = cls.range_class
+        if port_to is None:
+            port_to = numpy.ma.masked_array(port_from, mask=True)
+        single = numpy.ma.getmaskarray(port_to)
+        port_to = port_to.filled(0)
+        invalid = numpy.zeros(port_from.shape, dtype=bool)
+        if strict:
+            # Disallow out-of-bounds values.
+            invalid |= (port_from < range_class.port_min) | (
+                port_from > range_class.port_max)
+            invalid |= ~single & (
+                (port_to < range_class.port_min) |
+                (port_to > range_class.port_max))
+            # Disallow reversed range.
+            invalid |= ~single & (port_from > port_to)
+        else:
+            # Let the parser fix a reverse-ordered range in non-strict mode.
+            swap = ~single & (port_to < port_from)
+            port_from, port_to = (
+                numpy.where(swap, port_to, port_from),
+                numpy.where(swap, port_from, port_to))
+
+        # Clamp down lower bound, then cap it.
+        port_from = numpy.clip(
+            port_from, range_class.port_min, range_class.port_max)
+        # Single port gets its upper bound aligned to its lower one, others
+        # are capped.
+        port_to = numpy.where(
+            single, port_from, numpy.minimum(port_to, range_class.port_max))
+        return port_from, port_to, invalid
+
+    def __len__(self):
+        return len(self.port_from)
+
+    def __getitem__(self, key):
+        """ Return a ``PortRange`` for an index, a sub-array otherwise. """
+        port_from = self.port_from[key]
+        port_to = self.port_to[key]
+        if numpy.ndim(port_from) == 0:
+            return self.range_class._from_bounds(int(port_from), int(port_to))
+        return self.__class__(port_from, port_to)
+
+    def __iter__(self):
+        """ Yield all ranges as ``PortRange`` objects. """
+        for port_from, port_to in zip(
+                self.port_from.tolist(), self.port_to.tolist()):
+            yield self.range_class._from_bounds(port_from, port_to)
+
+    def __repr__(self):
+        return '{}({!r})'.format(
+            self.__class__.__name__, [str(port_range) for port_range in self])
+
+    @property
+    def bounds(self):
+        """ Return a two-columns array of lower and upper bounds. """
+        return numpy.column_stack((self.port_from, self.port_to))
+
+    def _delta(self):
+        """ Number of ports of each range, as wide signed integers. """
+        return (
+            self.port_to.astype(numpy.int64) -
+            self.port_from.astype(numpy.int64) + 1)
+
+    @property
+    def is_single_port(self):
+        """ Are the ranges single ports? """
+        return self.port_from == self.port_to
+
+    @property
+    def is_cidr(self):
+        """ Can the ranges be expressed using a CIDR-like notation? """
+        delta = self._delta()
+        return (delta > 0) & ((delta & (delta - 1)) == 0)
+
+    @property
+    def prefix(self):
+        """ CIDR-like prefixes, masked for ranges not expressible as CIDR. """
+        is_cidr = self.is_cidr
+        delta = numpy.where(is_cidr, self._delta(), 1)
+        # Logarithm of powers of two are exact.
+        prefix = self.range_class.port_length - numpy.log2(delta).astype(
+            numpy.int64)
+        return numpy.ma.masked_array(prefix, mask=~is_cidr)
+
+    def contains(self, port):
+        """ Do the ranges contain the port? """
+        return (self.port_from <= port) & (port <= self.port_to)
+
+    def overlaps(self, port_range, strict=False):
+        """ Do the ranges share at least a port with the provided one? """
+        if not isinstance(port_range, PortRange):
+            port_range = self.range_class(port_range, strict=strict)
+        return (self.port_from <= port_range.port_to) & (
+            port_range.port_from <= self.port_to)
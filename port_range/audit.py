@@ -0,0 +1,138 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (c) 2014-2016 Scaleway and Contributors. All Rights Reserved.
+#                         Kevin Deldycke <kdeldycke@scaleway.com>
+#
+# Licensed under the BSD 2-Clause License (the "License"); you may not use this
+# file except in compliance with the License. You may obtain a copy of the
+# License at https://opensource.org/licenses/BSD-2-Clause
+
+""" Detection of overlapping, shadowed and duplicate port range rules.
+
+All functions take an iterable of ``(port_range, label)`` pairs, where ranges
+are ``PortRange`` instances or anything ``PortRange`` can parse, and stream
+their results as ``Rule`` tuples. Rules are sorted once, then swept in a
+single pass: each function runs in ``O(n log n + k)`` for ``k`` results.
+"""
+
+from __future__ import (absolute_import, division, print_function,
+                        unicode_literals)
+
+import heapq
+from collections import namedtuple
+
+from port_range import PortRange
+
+# A rule, with its position in the original list as priority.
+Rule = namedtuple('Rule', ['index', 'port_range', 'label'])
+
+
+def _by_bounds(rule):
+    """ Sort key of rules by bounds, then priority. """
+    return rule.port_range.port_from, rule.port_range.port_to, rule.index
+
+
+def _sorted_rules(rules, strict, key=_by_bounds):
+    """ Normalize rules and sort them, by bounds then priority by default.
+    """
+    normalized = []
+    for index, (port_range, label) in enumerate(rules):
+        if not isinstance(port_range, PortRange):
+            port_range = PortRange(port_range, strict=strict)
+        normalized.append(Rule(index, port_range, label))
+    normalized.sort(key=key)
+    return normalized
+
+
+def overlapping_pairs(rules, strict=False):
+    """ Yield all pairs of rules sharing at least a port.
+
+    In each pair, the first rule is the one with the lowest bounds.
+    """
+    # Min-heap of active rules, by upper bound.
+    active = []
+    for rule in _sorted_rules(rules, strict):
+        port_from, port_to = rule.port_range.bounds
+        while active and active[0][0] < port_from:
+            heapq.heappop(active)
+        for _, _, other in active:
+            yield other, rule
+        heapq.heappush(active, (port_to, rule.index, rule))
+
+
+def overlapping_groups(rules, strict=False):
+    """ Yield maximal groups of rules chained by overlaps.
+
+    Each group is a list of at least two rules, sorted by bounds, covering a
+    contiguous span of ports no other group intersects.
+    """
+    group = []
+    group_end = None
+    for rule in _sorted_rules(rules, strict):
+        port_from, port_to = rule.port_range.bounds
+        if group and port_from > group_end:
+            if len(group) > 1:
+                yield group
+            group = []
+        if not group or port_to > group_end:
+            group_end = port_to
+        group.append(rule)
+    if len(group) > 1:
+        yield group
+
+
+def duplicates(rules, strict=False):
+    """ Yield groups of rules having the exact same bounds.
+
+    Rules of each group are sorted by priority.
+    """
+    group = []
+    for rule in _sorted_rules(rules, strict):
+        if group and group[0].port_range.bounds != rule.port_range.bounds:
+            if len(group) > 1:
+                yield group
+            group = []
+        group.append(rule)
+    if len(group) > 1:
+        yield group
+
+
+def shadowed_rules(rules, strict=False):
+    """ Yield ``(rule, shadowing_rule)`` pairs of fully shadowed rules.
+
+    A rule is shadowed if a rule of higher priority, i.e. coming first in the
+    original list, covers all of its ports. The shadowing rule reported is
+    the one extending the furthest.
+    """
+    # Process rules by lower bound, widest first, so that all potential
+    # shadowing rules are seen before the ones they cover.
+    ordered = _sorted_rules(rules, strict, key=lambda rule: (
+        rule.port_range.port_from, -rule.port_range.port_to, rule.index))
+
+    # Fenwick tree over priorities, keeping the rule with the highest upper
+    # bound among all processed rules of lower index.
+    size = len(ordered)
+    tree = [None] * (size + 1)
+    for rule in ordered:
+        port_to = rule.port_range.port_to
+
+        # Query rules of strictly higher priority.
+        best = None
+        position = rule.index
+        while position > 0:
+            candidate = tree[position]
+            if candidate is not None and (
+                    best is None or
+                    candidate.port_range.port_to > best.port_range.port_to):
+                best = candidate
+            position &= position - 1
+        if best is not None and best.port_range.port_to >= port_to:
+            yield rule, best
+
+        # Register the rule.
+        position = rule.index + 1
+        while position <= size:
+            current = tree[position]
+            if current is None or port_to > current.port_range.port_to:
+                tree[position] = rule
+            position += position & -position
@@ -0,0 +1,181 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (c) 2014-2016 Scaleway and Contributors. All Rights Reserved.
+#                         Kevin Deldycke <kdeldycke@scaleway.com>
+#
+# Licensed under the BSD 2-Clause License (the "License"); you may not use this
+# file except in compliance with the License. You may obtain a copy of the
+# License at https://opensource.org/licenses/BSD-2-Clause
+
+""" Compact binary serialization of lists of port ranges.
+
+The format is a fixed header followed by the normalized bounds of each range,
+packed as little-endian unsigned integers::
+
+    magic (4 bytes) | version (uint16) | bound size (uint16) | count (uint32)
+    port_from | port_to | port_from | port_to | ...
+
+Bounds take 2, 4 or 8 bytes each, the smallest size holding any port of the
+port space. Ports wider than 64 bits are not supported.
+"""
+
+from __future__ import (absolute_import, division, print_function,
+                        unicode_literals)
+
+import io
+import mmap
+import struct
+
+from port_range import PortRange
+
+MAGIC = b'PRNG'
+VERSION = 1
+
+_HEADER = struct.Struct(str('<4sHHI'))
+_FORMATS = {2: 'H', 4: 'I', 8: 'Q'}
+
+
+def _bound_size(range_class):
+    """ Smallest supported number of bytes able to hold any port. """
+    for size in sorted(_FORMATS):
+        if range_class.port_length <= size * 8:
+            return size
+    raise ValueError("Ports wider than 64 bits can't be serialized.")
+
+
+def dumps(ranges, strict=False, range_class=PortRange):
+    """ Serialize an iterable of ranges to bytes.
+
+    Items are ``PortRange`` instances or anything ``PortRange`` can parse.
+    """
+    bounds = []
+    for port_range in ranges:
+        if not isinstance(port_range, PortRange):
+            port_range = range_class(port_range, strict=strict)
+        bounds.extend(port_range.bounds)
+    size = _bound_size(range_class)
+    # Ranges of wider subclasses don't fit the bounds of range_class.
+    if bounds and (min(bounds) < 0 or max(bounds) > range_class.port_max):
+        raise ValueError("Ports out of the {} port space.".format(
+            range_class.__name__))
+    count = len(bounds) // 2
+    return _HEADER.pack(MAGIC, VERSION, size, count) + struct.pack(
+        str('<{}{}').format(len(bounds), _FORMATS[size]), *bounds)
+
+
+def dump(ranges, fp, strict=False, range_class=PortRange):
+    """ Serialize an iterable of ranges to a binary file object. """
+    fp.write(dumps(ranges, strict, range_class))
+
+
+def load(source, strict=False, range_class=PortRange):
+    """ Load serialized ranges from bytes, a buffer or a binary file.
+
+    No data is copied: buffers like ``bytes``, ``memoryview`` or ``mmap`` are
+    read in place, and files backed by a file descriptor are memory-mapped.
+    Ranges are only built on access.
+
+    Files are read from their current position, and left at their end.
+    """
+    mapping = None
+    offset = 0
+    if hasattr(source, 'read'):
+        try:
+            mapping = mmap.mmap(source.fileno(), 0, access=mmap.ACCESS_READ)
+        except (AttributeError, IOError, OSError, ValueError):
+            # In-memory files, pipes, sockets and empty files can't be mapped.
+            source = source.read()
+        else:
+            # Mappings must start on a page boundary: map the whole file, and
+            # skip what precedes the current position.
+            offset = source.tell()
+            source.seek(0, io.SEEK_END)
+            source = mapping
+    try:
+        packed = PackedRanges(source, strict, range_class, offset)
+    except ValueError:
+        if mapping is not None:
+            mapping.close()
+        raise
+    packed._mapping = mapping
+    return packed
+
+
+class PackedRanges(object):
+
+    """ Read-only sequence of ranges backed by a serialized buffer.
+
+    Bounds are trusted to have been normalized on serialization: ranges are
+    instantiated straight from them, without parsing. Serialized data starts
+    at ``offset`` in the buffer.
+    """
+
+    def __init__(self, buffer, strict=False, range_class=PortRange,
+                 offset=0):
+        """ Check the header of a buffer, without copying it. """
+        self.strict = strict
+        self.range_class = range_class
+        self._buffer = buffer
+        self._offset = offset
+        # Memory map owned by the instance, if opened by ``load()``.
+        self._mapping = None
+        if len(self._buffer) < offset + _HEADER.size:
+            raise ValueError("Truncated header.")
+        magic, version, size, count = _HEADER.unpack_from(
+            self._buffer, offset)
+        if magic != MAGIC:
+            raise ValueError("Not a serialized list of port ranges.")
+        if version != VERSION:
+            raise ValueError(
+                "Unsupported format version {}.".format(version))
+        if size not in _FORMATS:
+            raise ValueError("Unsupported bound size {}.".format(size))
+        if len(self._buffer) < offset + _HEADER.size + 2 * size * count:
+            raise ValueError("Truncated data.")
+        self._count = count
+        self._item = struct.Struct(str('<2{}').format(_FORMATS[size]))
+
+    def __len__(self):
+        return self._count
+
+    def _bounds_at(self, index):
+        """ Bounds of the range at a non-negative position. """
+        return self._item.unpack_from(
+            self._buffer,
+            self._offset + _HEADER.size + index * self._item.size)
+
+    def __getitem__(self, index):
+        """ Return the range at a position, or a list of ranges for slices.
+        """
+        if isinstance(index, slice):
+            return [self[position] for position in
+                    range(*index.indices(self._count))]
+        if index < 0:
+            index += self._count
+        if not 0 <= index < self._count:
+            raise IndexError("Packed ranges index out of range.")
+        port_from, port_to = self._bounds_at(index)
+        return self.range_class._from_bounds(port_from, port_to, self.strict)
+
+    def iter_bounds(self):
+        """ Yield ``(port_from, port_to)`` tuples of all ranges. """
+        for index in range(self._count):
+            yield self._bounds_at(index)
+
+    def __iter__(self):
+        """ Lazily yield all ranges. """
+        from_bounds = self.range_class._from_bounds
+        strict = self.strict
+        for port_from, port_to in self.iter_bounds():
+            yield from_bounds(port_from, port_to, strict)
+
+    def close(self):
+        """ Unmap the buffer if it was memory-mapped by ``load()``. """
+        if self._mapping is not None:
+            self._mapping.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
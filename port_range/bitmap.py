@@ -0,0 +1,247 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (c) 2014-2016 Scaleway and Contributors. All Rights Reserved.
+#                         Kevin Deldycke <kdeldycke@scaleway.com>
+#
+# Licensed under the BSD 2-Clause License (the "License"); you may not use this
+# file except in compliance with the License. You may obtain a copy of the
+# License at https://opensource.org/licenses/BSD-2-Clause
+
+""" Bitmap representation of sets of ports.
+"""
+
+from __future__ import (absolute_import, division, print_function,
+                        unicode_literals)
+
+from numbers import Integral
+
+from port_range import (
+    PortRange, _chunk_bounds, basestring, integer_types, port_sequence)
+
+if hasattr(int, 'bit_count'):
+    def _popcount(value):
+        """ Number of bits set in an integer. """
+        return value.bit_count()
+else:  # pragma: no cover
+    def _popcount(value):
+        """ Number of bits set in an integer. """
+        return bin(value).count('1')
+
+
+class PortBitmap(object):
+
+    """ Immutable set of ports stored as a bitmap over the whole port space.
+
+    Bit ``n`` of an arbitrary-precision integer is set if port ``n`` belongs
+    to the set. The whole 16-bit port space fits in 8 KiB, and set algebra is
+    done in bulk by integer bitwise operations, whatever the fragmentation of
+    the set.
+
+    Accepts an iterable of ``PortRange`` instances or of anything
+    ``PortRange`` itself can parse, and yields ``PortRange`` objects back.
+    """
+
+    __slots__ = ('_bits', 'strict')
+
+    range_class = PortRange
+
+    def __init__(self, ranges=None, strict=False):
+        """ Set bits of all ports of all provided ranges. """
+        if isinstance(ranges, basestring):
+            raise TypeError(
+                "Expecting an iterable of port ranges, not a string.")
+        self.strict = strict
+        bits = 0
+        if ranges is not None:
+            for port_range in ranges:
+                if not isinstance(port_range, PortRange):
+                    port_range = self.range_class(port_range, strict=strict)
+                port_from, port_to = port_range.bounds
+                bits |= ((1 << (port_to - port_from + 1)) - 1) << port_from
+        self._bits = bits
+
+    @classmethod
+    def from_int(cls, bits, strict=False):
+        """ Build a bitmap from its raw integer representation. """
+        if bits < 0 or bits & ~cls._full():
+            raise ValueError("Bitmap out of bounds.")
+        bitmap = cls.__new__(cls)
+        bitmap.strict = strict
+        bitmap._bits = bits
+        return bitmap
+
+    def __int__(self):
+        """ Raw integer representation of the bitmap. """
+        return self._bits
+
+    __index__ = __int__
+
+    @classmethod
+    def _full(cls):
+        """ Bitmap integer of all valid ports. """
+        port_min = cls.range_class.port_min
+        port_max = cls.range_class.port_max
+        return ((1 << (port_max - port_min + 1)) - 1) << port_min
+
+    def popcount(self):
+        """ Number of ports in the set. """
+        return _popcount(self._bits)
+
+    def iter_bounds(self):
+        """ Yield ``(port_from, port_to)`` tuples of all contiguous runs. """
+        # Walk runs of set bits on the binary string, lowest port first.
+        binary = bin(self._bits)[:1:-1]
+        port_from = binary.find('1')
+        while port_from != -1:
+            port_to = binary.find('0', port_from)
+            if port_to == -1:
+                port_to = len(binary)
+            yield port_from, port_to - 1
+            port_from = binary.find('1', port_to)
+
+    def __iter__(self):
+        """ Yield the fewest ``PortRange`` objects covering the set. """
+        range_class = self.range_class
+        for port_from, port_to in self.iter_bounds():
+            yield range_class._from_bounds(port_from, port_to, self.strict)
+
+    def to_ranges(self):
+        """ Return the fewest ``PortRange`` objects covering the set. """
+        return list(self)
+
+    def iter_ports(self, reverse=False):
+        """ Lazily yield all ports of the set, highest first if reverse. """
+        if reverse:
+            for port_from, port_to in reversed(list(self.iter_bounds())):
+                for port in reversed(port_sequence(port_from, port_to + 1)):
+                    yield port
+        else:
+            for port_from, port_to in self.iter_bounds():
+                for port in port_sequence(port_from, port_to + 1):
+                    yield port
+
+    def iter_chunks(self, size, aligned=False):
+        """ Lazily split the set into ranges of at most size ports.
+
+        Chunks never span a gap in the set. See ``PortRange.iter_chunks()``
+        for the meaning of ``aligned``.
+        """
+        range_class = self.range_class
+        chunks = _chunk_bounds(self.iter_bounds(), size, aligned)
+        return (
+            range_class._from_bounds(port_from, port_to, self.strict)
+            for port_from, port_to in chunks)
+
+    def __contains__(self, item):
+        """ Check that a port or a whole range is included in the set. """
+        if isinstance(item, Integral):
+            range_class = self.range_class
+            if not range_class.port_min <= item <= range_class.port_max:
+                return False
+            return bool(self._bits >> item & 1)
+        return not PortBitmap([item], self.strict)._bits & ~self._bits
+
+    def __bool__(self):
+        return bool(self._bits)
+
+    __nonzero__ = __bool__
+
+    def __eq__(self, other):
+        if not isinstance(other, PortBitmap):
+            return NotImplemented
+        return self._bits == other._bits
+
+    def __ne__(self, other):
+        result = self.__eq__(other)
+        if result is NotImplemented:
+            return result
+        return not result
+
+    def __hash__(self):
+        return hash(self._bits)
+
+    def __repr__(self):
+        return '{}([{}])'.format(
+            self.__class__.__name__,
+            ', '.join(repr(str(port_range)) for port_range in self))
+
+    def __str__(self):
+        return ','.join(str(port_range) for port_range in self)
+
+    def __or__(self, other):
+        if not isinstance(other, PortBitmap):
+            return NotImplemented
+        return self.from_int(self._bits | other._bits, self.strict)
+
+    def __and__(self, other):
+        if not isinstance(other, PortBitmap):
+            return NotImplemented
+        return self.from_int(self._bits & other._bits, self.strict)
+
+    def __sub__(self, other):
+        if not isinstance(other, PortBitmap):
+            return NotImplemented
+        return self.from_int(self._bits & ~other._bits, self.strict)
+
+    def __xor__(self, other):
+        if not isinstance(other, PortBitmap):
+            return NotImplemented
+        return self.from_int(self._bits ^ other._bits, self.strict)
+
+    def __invert__(self):
+        """ Complement of the set within the range of valid ports. """
+        return self.from_int(self._bits ^ self._full(), self.strict)
+
+    def __le__(self, other):
+        if not isinstance(other, PortBitmap):
+            return NotImplemented
+        return not self._bits & ~other._bits
+
+    def __ge__(self, other):
+        if not isinstance(other, PortBitmap):
+            return NotImplemented
+        return not other._bits & ~self._bits
+
+    def __lt__(self, other):
+        if not isinstance(other, PortBitmap):
+            return NotImplemented
+        return self <= other and self._bits != other._bits
+
+    def __gt__(self, other):
+        if not isinstance(other, PortBitmap):
+            return NotImplemented
+        return self >= other and self._bits != other._bits
+
+    def union(self, *others):
+        """ Return the union of this set and all others. """
+        bits = self._bits
+        for other in others:
+            bits |= self._coerce(other)._bits
+        return self.from_int(bits, self.strict)
+
+    def intersection(self, *others):
+        """ Return the ports shared by this set and all others. """
+        bits = self._bits
+        for other in others:
+            bits &= self._coerce(other)._bits
+        return self.from_int(bits, self.strict)
+
+    def difference(self, *others):
+        """ Return the ports of this set not in any of the others. """
+        bits = self._bits
+        for other in others:
+            bits &= ~self._coerce(other)._bits
+        return self.from_int(bits, self.strict)
+
+    def complement(self):
+        """ Return all valid ports not in this set. """
+        return ~self
+
+    def _coerce(self, other):
+        """ Cast the operand of a set operation to a ``PortBitmap``. """
+        if isinstance(other, PortBitmap):
+            return other
+        # A single range specification is not an iterable of ranges.
+        if isinstance(other, (PortRange, basestring) + integer_types):
+            other = [other]
+        return self.__class__(other, strict=self.strict)
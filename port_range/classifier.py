@@ -0,0 +1,229 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (c) 2014-2016 Scaleway and Contributors. All Rights Reserved.
+#                         Kevin Deldycke <kdeldycke@scaleway.com>
+#
+# Licensed under the BSD 2-Clause License (the "License"); you may not use this
+# file except in compliance with the License. You may obtain a copy of the
+# License at https://opensource.org/licenses/BSD-2-Clause
+
+""" Classifier of flows against protocol, source and destination port rules.
+"""
+
+from __future__ import (absolute_import, division, print_function,
+                        unicode_literals)
+
+import sys
+from bisect import bisect_right
+
+from port_range import PortRange
+
+try:
+    from time import perf_counter as _clock
+except ImportError:  # pragma: no cover
+    from time import time as _clock
+
+
+def _paint(rules):
+    """ Find the first rule covering each segment between rule boundaries.
+
+    ``rules`` are ``(rule_id, port_from, port_to)`` tuples sorted by rule ID.
+    Returns the sorted lower bounds of segments, and the ID of the first rule
+    covering each segment, or ``None``. Consecutive segments of the same rule
+    are merged.
+    """
+    boundaries = set()
+    for _, port_from, port_to in rules:
+        boundaries.add(port_from)
+        boundaries.add(port_to + 1)
+    boundaries = sorted(boundaries)
+    positions = dict(
+        (boundary, position) for position, boundary in enumerate(boundaries))
+
+    # Rules are applied by priority, each one only painting segments left
+    # unpainted. Skip painted segments in near constant time with pointers to
+    # the next unpainted one, compressed along the way.
+    firsts = [None] * len(boundaries)
+    unpainted = list(range(len(boundaries)))
+    for rule_id, port_from, port_to in rules:
+        position = positions[port_from]
+        end = positions[port_to + 1]
+        while True:
+            root = position
+            while unpainted[root] != root:
+                root = unpainted[root]
+            while unpainted[position] != root:
+                unpainted[position], position = root, unpainted[position]
+            position = root
+            if position >= end:
+                break
+            firsts[position] = rule_id
+            unpainted[position] = position + 1
+            position += 1
+
+    starts = []
+    merged = []
+    for boundary, first in zip(boundaries, firsts):
+        if not merged or merged[-1] != first:
+            starts.append(boundary)
+            merged.append(first)
+    return starts, merged
+
+
+class _PlaneIndex(object):
+
+    """ First-match index of rules over the source and destination ports.
+
+    A segment tree over source segments holds, in each node, the destination
+    segments of rules canonically covering that node, painted with their
+    first rule. A lookup visits ``O(log n)`` nodes, with a binary search in
+    each of them.
+    """
+
+    def __init__(self, rules):
+        """ Index ``(rule_id, src_bounds, dst_bounds)`` tuples sorted by ID.
+        """
+        boundaries = set()
+        for _, (src_from, src_to), _ in rules:
+            boundaries.add(src_from)
+            boundaries.add(src_to + 1)
+        self._segments = sorted(boundaries)
+        positions = dict(
+            (boundary, position)
+            for position, boundary in enumerate(self._segments))
+
+        self._leaves = 1
+        while self._leaves < len(self._segments):
+            self._leaves *= 2
+        nodes = [[] for _ in range(2 * self._leaves)]
+        for rule_id, (src_from, src_to), (dst_from, dst_to) in rules:
+            entry = (rule_id, dst_from, dst_to)
+            left = positions[src_from] + self._leaves
+            right = positions[src_to + 1] + self._leaves
+            while left < right:
+                if left & 1:
+                    nodes[left].append(entry)
+                    left += 1
+                if right & 1:
+                    right -= 1
+                    nodes[right].append(entry)
+                left //= 2
+                right //= 2
+
+        self._starts = [None] * len(nodes)
+        self._firsts = [None] * len(nodes)
+        for node, entries in enumerate(nodes):
+            if entries:
+                self._starts[node], self._firsts[node] = _paint(entries)
+
+    def first(self, src_port, dst_port):
+        """ ID of the first rule matching both ports, or ``None``. """
+        segment = bisect_right(self._segments, src_port) - 1
+        if segment < 0:
+            return None
+        best = None
+        node = segment + self._leaves
+        starts = self._starts
+        while node:
+            node_starts = starts[node]
+            if node_starts is not None:
+                position = bisect_right(node_starts, dst_port) - 1
+                if position >= 0:
+                    rule_id = self._firsts[node][position]
+                    if rule_id is not None and (
+                            best is None or rule_id < best):
+                        best = rule_id
+            node //= 2
+        return best
+
+    def sizes(self):
+        """ Number of stored segments, and bytes used by lookup lists. """
+        segments = 0
+        memory = sys.getsizeof(self._segments) + sys.getsizeof(
+            self._starts) + sys.getsizeof(self._firsts)
+        for starts, firsts in zip(self._starts, self._firsts):
+            if starts is not None:
+                segments += len(starts)
+                memory += sys.getsizeof(starts) + sys.getsizeof(firsts)
+        return segments, memory
+
+
+class PortRuleClassifier(object):
+
+    """ Static first-match classifier of flows against port rules.
+
+    Built once from an iterable of ``(protocol, src_range, dst_range,
+    payload)`` rules. Ranges are ``PortRange`` instances, anything
+    ``PortRange`` can parse, or ``None`` to match any port. A ``None``
+    protocol matches any protocol. Rules keep their insertion order, which is
+    used as priority.
+
+    Rules are split by protocol, then indexed on both port dimensions by a
+    segment tree of painted segment lists. Lookups take ``O(log² n)`` and
+    memory grows in ``O(n log n)``.
+    """
+
+    range_class = PortRange
+
+    def __init__(self, rules=None, strict=False):
+        """ Parse rules and build the per-protocol indexes. """
+        started = _clock()
+        self.strict = strict
+        full = (self.range_class.port_min, self.range_class.port_max)
+        by_protocol = {}
+        self._payloads = []
+        for rule_id, (protocol, src, dst, payload) in enumerate(rules or []):
+            by_protocol.setdefault(protocol, []).append(
+                (rule_id, self._to_bounds(src, full),
+                 self._to_bounds(dst, full)))
+            self._payloads.append(payload)
+        self._planes = dict(
+            (protocol, _PlaneIndex(protocol_rules))
+            for protocol, protocol_rules in by_protocol.items())
+        self._any = self._planes.pop(None, None)
+        self.build_time = _clock() - started
+
+    def _to_bounds(self, port_range, full):
+        """ Bounds of a range specification, ``None`` standing for any port.
+        """
+        if port_range is None:
+            return full
+        if not isinstance(port_range, PortRange):
+            port_range = self.range_class(port_range, strict=self.strict)
+        return port_range.bounds
+
+    def __len__(self):
+        """ Number of indexed rules. """
+        return len(self._payloads)
+
+    def first(self, protocol, src_port, dst_port, default=None):
+        """ Return payload of the first rule matching the flow. """
+        best = None
+        plane = self._planes.get(protocol)
+        if plane is not None:
+            best = plane.first(src_port, dst_port)
+        if self._any is not None:
+            rule_id = self._any.first(src_port, dst_port)
+            if rule_id is not None and (best is None or rule_id < best):
+                best = rule_id
+        if best is None:
+            return default
+        return self._payloads[best]
+
+    def stats(self):
+        """ Return size and build time metrics of the classifier. """
+        planes = list(self._planes.values())
+        if self._any is not None:
+            planes.append(self._any)
+        segments = memory = 0
+        for plane in planes:
+            plane_segments, plane_memory = plane.sizes()
+            segments += plane_segments
+            memory += plane_memory
+        return {
+            'rules': len(self._payloads),
+            'protocols': len(planes),
+            'segments': segments,
+            'memory': memory,
+            'build_time': self.build_time,
+        }
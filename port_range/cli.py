@@ -0,0 +1,249 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (c) 2014-2016 Scaleway and Contributors. All Rights Reserved.
+#                         Kevin Deldycke <kdeldycke@scaleway.com>
+#
+# Licensed under the BSD 2-Clause License (the "License"); you may not use this
+# file except in compliance with the License. You may obtain a copy of the
+# License at https://opensource.org/licenses/BSD-2-Clause
+
+""" ``port-range`` command line tool.
+
+Reads one port range specification per line from files or the standard input
+and streams results to the standard output. Blank lines are ignored.
+"""
+
+from __future__ import (absolute_import, division, print_function,
+                        unicode_literals)
+
+import argparse
+import sys
+
+from port_range import ParseError, PortRange, __version__
+
+# Exit codes.
+SUCCESS = 0
+INVALID_INPUT = 1
+
+
+class _LineReader(object):
+
+    """ Non-blank, stripped lines of all files, in order.
+
+    Keeps track of the file and line number of the last line read, to locate
+    parsing errors of items consumed one at a time.
+    """
+
+    def __init__(self, paths, stdin):
+        self.paths = paths or ['-']
+        self.stdin = stdin
+        self.path = None
+        self.lineno = 0
+
+    def __iter__(self):
+        for path in self.paths:
+            if path == '-':
+                self.path = '<stdin>'
+                lines = self.stdin
+            else:
+                self.path = path
+                lines = open(path)
+            try:
+                for self.lineno, line in enumerate(lines, 1):
+                    line = line.strip()
+                    if line:
+                        yield line
+            finally:
+                if lines is not self.stdin:
+                    lines.close()
+
+    def locate(self, error):
+        """ Describe a parsing error of the last line read. """
+        return '{}:{}: {!r}: {}'.format(
+            self.path, self.lineno, error.port_range, error.args[0])
+
+
+class _ErrorReporter(object):
+
+    """ Sink of parsing errors, counting them and optionally printing them.
+
+    Stands for the ``errors`` list of ``PortRange.parse_many()``, so that
+    memory stays constant whatever the number of invalid items.
+    """
+
+    def __init__(self, reader, stream=None):
+        self.reader = reader
+        self.stream = stream
+        self.count = 0
+
+    def append(self, error):
+        self.count += 1
+        if self.stream is not None:
+            print(self.reader.locate(error), file=self.stream)
+
+
+def _coverage_bounds(port_ranges, range_class):
+    """ Yield coalesced bounds of ranges in any order, in constant memory.
+
+    A difference array over the whole port space counts ranges starting and
+    ending at each port, and a final prefix sum finds covered runs.
+    """
+    deltas = [0] * (range_class.port_max + 2)
+    for port_from, port_to in port_ranges:
+        deltas[port_from] += 1
+        deltas[port_to + 1] -= 1
+    depth = 0
+    start = None
+    for port, delta in enumerate(deltas):
+        depth += delta
+        if depth and start is None:
+            start = port
+        elif not depth and start is not None:
+            yield start, port - 1
+            start = None
+
+
+def _format_blocks(bounds, split, range_class):
+    """ Yield lines of ranges, optionally split into CIDR-like blocks. """
+    cidr_line = '{}' + range_class.CIDR_SEP + '{}\n'
+    for port_from, port_to in bounds:
+        if split:
+            # Blocks are CIDR-like by construction: skip range objects.
+            for block_from, block_to in range_class._aligned_blocks(
+                    port_from, port_to):
+                if block_from == block_to:
+                    yield '{}\n'.format(block_from)
+                else:
+                    yield cidr_line.format(
+                        block_from,
+                        range_class._delta_prefix(block_to - block_from + 1))
+        else:
+            yield '{}\n'.format(range_class._from_bounds(port_from, port_to))
+
+
+def normalize(port_ranges, args, range_class):
+    """ Print the normalized notation of each range. """
+    args.stdout.writelines(
+        '{}\n'.format(range_class._from_bounds(*bounds))
+        for bounds in port_ranges)
+
+
+def cidr(port_ranges, args, range_class):
+    """ Print each range as aligned CIDR-like blocks. """
+    args.stdout.writelines(_format_blocks(port_ranges, True, range_class))
+
+
+def merge(port_ranges, args, range_class):
+    """ Print the sorted union of all ranges. """
+    args.stdout.writelines(_format_blocks(
+        _coverage_bounds(port_ranges, range_class), args.cidr, range_class))
+
+
+def validate(port_ranges, args, range_class):
+    """ Only report invalid items, parsed in strict mode. """
+    for _ in port_ranges:
+        pass
+
+
+def stats(port_ranges, args, range_class):
+    """ Print statistics about ranges. """
+    counts = {'single ports': 0, 'CIDR-like ranges': 0, 'other ranges': 0}
+
+    def count(port_ranges):
+        for port_from, port_to in port_ranges:
+            if port_from == port_to:
+                counts['single ports'] += 1
+            elif range_class._delta_prefix(port_to - port_from + 1):
+                counts['CIDR-like ranges'] += 1
+            else:
+                counts['other ranges'] += 1
+            yield port_from, port_to
+
+    merged = list(_coverage_bounds(count(port_ranges), range_class))
+    valid = sum(counts.values())
+    args.stdout.writelines('{}: {}\n'.format(*item) for item in [
+        ('items', valid + args.errors.count),
+        ('valid', valid),
+        ('invalid', args.errors.count),
+        ('single ports', counts['single ports']),
+        ('CIDR-like ranges', counts['CIDR-like ranges']),
+        ('other ranges', counts['other ranges']),
+        ('merged ranges', len(merged)),
+        ('ports covered', sum(
+            port_to - port_from + 1 for port_from, port_to in merged)),
+    ])
+
+
+def _parser():
+    """ Build the parser of command line arguments. """
+    parser = argparse.ArgumentParser(
+        prog='port-range',
+        description="Normalize, merge and check port range specifications.")
+    parser.add_argument(
+        '--version', action='version', version='%(prog)s ' + __version__)
+    commands = parser.add_subparsers(dest='command', metavar='COMMAND')
+    commands.required = True
+
+    for function in (normalize, merge, cidr, validate, stats):
+        command = commands.add_parser(
+            function.__name__, help=function.__doc__.strip(),
+            description=function.__doc__.strip())
+        command.set_defaults(function=function)
+        command.add_argument(
+            'paths', nargs='*', metavar='FILE',
+            help="Files to read, or - for the standard input (default).")
+        if function is validate:
+            continue
+        command.add_argument(
+            '--strict', action='store_true',
+            help="Reject out of bounds, reversed or unaligned ranges.")
+        if function is stats:
+            continue
+        command.add_argument(
+            '--skip-invalid', action='store_true',
+            help="Report invalid items and go on, instead of stopping.")
+        if function is merge:
+            command.add_argument(
+                '--cidr', action='store_true',
+                help="Split merged ranges into CIDR-like blocks.")
+    return parser
+
+
+def main(argv=None, stdin=None, stdout=None, stderr=None,
+         range_class=PortRange):
+    """ Run the tool and return its exit code. """
+    stdin = sys.stdin if stdin is None else stdin
+    stdout = sys.stdout if stdout is None else stdout
+    stderr = sys.stderr if stderr is None else stderr
+    args = _parser().parse_args(argv)
+    args.stdout = stdout
+
+    if args.function is validate:
+        args.strict = args.skip_invalid = True
+    elif args.function is stats:
+        args.skip_invalid = True
+    reader = _LineReader(args.paths, stdin)
+    # Stats only count errors, others report them.
+    args.errors = _ErrorReporter(
+        reader, None if args.function is stats else stderr)
+
+    port_ranges = range_class.parse_many(
+        reader, strict=args.strict,
+        on_error='collect' if args.skip_invalid else 'raise',
+        errors=args.errors, raw=True)
+    try:
+        args.function(port_ranges, args, range_class)
+    except ParseError as error:
+        print(reader.locate(error), file=stderr)
+        return INVALID_INPUT
+    except (IOError, OSError) as error:
+        print(error, file=stderr)
+        return INVALID_INPUT
+    # Stats account for invalid items instead of failing on them.
+    if args.errors.count and args.function is not stats:
+        return INVALID_INPUT
+    return SUCCESS
+
+
+if __name__ == '__main__':  # pragma: no cover
+    sys.exit(main())
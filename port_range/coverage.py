@@ -0,0 +1,138 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (c) 2014-2016 Scaleway and Contributors. All Rights Reserved.
+#                         Kevin Deldycke <kdeldycke@scaleway.com>
+#
+# Licensed under the BSD 2-Clause License (the "License"); you may not use this
+# file except in compliance with the License. You may obtain a copy of the
+# License at https://opensource.org/licenses/BSD-2-Clause
+
+""" Histogram of the number of ranges covering each port.
+
+Vectorized with NumPy when available, see the ``numpy`` extra.
+"""
+
+from __future__ import (absolute_import, division, print_function,
+                        unicode_literals)
+
+import heapq
+
+from port_range import PortRange
+
+try:
+    import numpy
+except ImportError:  # pragma: no cover
+    numpy = None
+
+
+class PortCoverage(object):
+
+    """ Number of ranges covering each port of the port space.
+
+    Counts are computed in ``O(n + port_max)`` by a difference array: each
+    range adds one at its lower bound and removes one right after its upper
+    bound, and a prefix sum gives the count of every port. Accepts an
+    iterable of ``PortRange`` instances or of anything ``PortRange`` itself
+    can parse.
+    """
+
+    range_class = PortRange
+
+    def __init__(self, ranges=None, strict=False, use_numpy=None):
+        """ Count ranges covering each port.
+
+        NumPy is used if installed, unless ``use_numpy`` is ``False``.
+        """
+        self.strict = strict
+        if use_numpy is None:
+            use_numpy = numpy is not None
+        elif use_numpy and numpy is None:  # pragma: no cover
+            raise ImportError("NumPy is not installed.")
+        bounds = []
+        for port_range in ranges or []:
+            if not isinstance(port_range, PortRange):
+                port_range = self.range_class(port_range, strict=strict)
+            bounds.append(port_range.bounds)
+        if use_numpy:
+            self._counts = self._numpy_counts(bounds)
+        else:
+            self._counts = self._python_counts(bounds)
+        self.use_numpy = use_numpy
+
+    def _python_counts(self, bounds):
+        """ Per-port counts as a list. """
+        deltas = [0] * (self.range_class.port_max + 2)
+        for port_from, port_to in bounds:
+            deltas[port_from] += 1
+            deltas[port_to + 1] -= 1
+        counts = []
+        append = counts.append
+        depth = 0
+        for delta in deltas[:-1]:
+            depth += delta
+            append(depth)
+        return counts
+
+    def _numpy_counts(self, bounds):
+        """ Per-port counts as a NumPy array. """
+        size = self.range_class.port_max + 2
+        port_from, port_to = zip(*bounds) if bounds else ((), ())
+        # Columns of integers convert much faster than a list of pairs.
+        port_from = numpy.array(port_from, dtype=numpy.int64)
+        port_to = numpy.array(port_to, dtype=numpy.int64)
+        deltas = numpy.bincount(port_from, minlength=size) - numpy.bincount(
+            port_to + 1, minlength=size)
+        return numpy.cumsum(deltas[:-1])
+
+    def counts(self):
+        """ Counts indexed by port, as a NumPy array or a list. """
+        return self._counts
+
+    def __getitem__(self, port):
+        """ Number of ranges covering a port. """
+        if not self.range_class.port_min <= port <= self.range_class.port_max:
+            raise IndexError("Port out of range.")
+        return int(self._counts[port])
+
+    def runs(self, uncovered=False):
+        """ Yield ``(PortRange, count)`` of maximal runs of equal counts.
+
+        Runs of uncovered ports are skipped, unless ``uncovered`` is set.
+        """
+        port_min = self.range_class.port_min
+        counts = self._counts
+        if self.use_numpy:
+            changes = numpy.flatnonzero(
+                numpy.diff(counts[port_min:])) + port_min + 1
+            starts = [port_min] + changes.tolist()
+            values = counts[starts].tolist()
+        else:
+            starts = [port_min] + [
+                port for port in range(port_min + 1, len(counts))
+                if counts[port] != counts[port - 1]]
+            values = [counts[port] for port in starts]
+        ends = starts[1:] + [len(counts)]
+        for port_from, port_next, count in zip(starts, ends, values):
+            if count or uncovered:
+                yield self.range_class._from_bounds(
+                    port_from, port_next - 1, self.strict), count
+
+    def top(self, n):
+        """ Return ``(port, count)`` of the n most covered ports.
+
+        Ports are sorted by decreasing count, then by increasing port.
+        Uncovered ports are not reported.
+        """
+        port_min = self.range_class.port_min
+        counts = self._counts
+        if self.use_numpy:
+            # Stable sort keeps lower ports first among equal counts.
+            ports = numpy.argsort(
+                -counts[port_min:], kind='stable')[:n] + port_min
+            top = zip(ports.tolist(), counts[ports].tolist())
+        else:
+            top = heapq.nlargest(
+                n, ((port, counts[port])
+                    for port in range(port_min, len(counts))),
+                key=lambda item: item[1])
+        return [(port, count) for port, count in top if count]
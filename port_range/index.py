@@ -0,0 +1,116 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (c) 2014-2016 Scaleway and Contributors. All Rights Reserved.
+#                         Kevin Deldycke <kdeldycke@scaleway.com>
+#
+# Licensed under the BSD 2-Clause License (the "License"); you may not use this
+# file except in compliance with the License. You may obtain a copy of the
+# License at https://opensource.org/licenses/BSD-2-Clause
+
+""" Lookup index matching ports against port range rules.
+"""
+
+from __future__ import (absolute_import, division, print_function,
+                        unicode_literals)
+
+from bisect import bisect_right
+
+from port_range import PortRange
+
+
+class PortRangeIndex(object):
+
+    """ Static index of rules keyed by port ranges.
+
+    Built once from an iterable of ``(port_range, payload)`` pairs, where
+    ranges are ``PortRange`` instances or anything ``PortRange`` can parse.
+    Rules keep their insertion order, which is used as priority.
+
+    The port space is cut into elementary segments at each rule boundary. The
+    first rule covering each segment is precomputed, so ``first()`` is a
+    single binary search. All matching rules are found by ``match()`` through
+    a segment tree, in ``O(log n + k)`` for ``k`` matches.
+    """
+
+    range_class = PortRange
+
+    def __init__(self, rules=None, strict=False):
+        """ Parse rules and build lookup structures. """
+        self.strict = strict
+        bounds = []
+        self._payloads = []
+        if rules is not None:
+            for port_range, payload in rules:
+                if not isinstance(port_range, PortRange):
+                    port_range = self.range_class(port_range, strict=strict)
+                bounds.append(port_range.bounds)
+                self._payloads.append(payload)
+
+        # Segments start at each lower bound and right after each upper one.
+        boundaries = set()
+        for port_from, port_to in bounds:
+            boundaries.add(port_from)
+            boundaries.add(port_to + 1)
+        self._segments = sorted(boundaries)
+        positions = dict(
+            (boundary, position)
+            for position, boundary in enumerate(self._segments))
+
+        # Register each rule in the canonical nodes of the segment tree
+        # covering its segments. Rules are added by priority, so all node
+        # lists are kept sorted.
+        self._leaves = 1
+        while self._leaves < len(self._segments):
+            self._leaves *= 2
+        self._tree = [[] for _ in range(2 * self._leaves)]
+        for rule_id, (port_from, port_to) in enumerate(bounds):
+            left = positions[port_from] + self._leaves
+            right = positions[port_to + 1] + self._leaves
+            while left < right:
+                if left & 1:
+                    self._tree[left].append(rule_id)
+                    left += 1
+                if right & 1:
+                    right -= 1
+                    self._tree[right].append(rule_id)
+                left //= 2
+                right //= 2
+
+        # Precompute the highest priority rule of each segment.
+        self._firsts = []
+        for leaf in range(self._leaves, self._leaves + len(self._segments)):
+            first = None
+            while leaf:
+                rules_ids = self._tree[leaf]
+                if rules_ids and (first is None or rules_ids[0] < first):
+                    first = rules_ids[0]
+                leaf //= 2
+            self._firsts.append(first)
+
+    def __len__(self):
+        """ Number of indexed rules. """
+        return len(self._payloads)
+
+    def match(self, port):
+        """ Return payloads of all rules matching the port, in rule order. """
+        segment = bisect_right(self._segments, port) - 1
+        if segment < 0 or self._firsts[segment] is None:
+            return ()
+        rule_ids = []
+        node = segment + self._leaves
+        while node:
+            rule_ids.extend(self._tree[node])
+            node //= 2
+        rule_ids.sort()
+        payloads = self._payloads
+        return tuple(payloads[rule_id] for rule_id in rule_ids)
+
+    def first(self, port, default=None):
+        """ Return payload of the first rule matching the port. """
+        segment = bisect_right(self._segments, port) - 1
+        if segment < 0:
+            return default
+        rule_id = self._firsts[segment]
+        if rule_id is None:
+            return default
+        return self._payloads[rule_id]
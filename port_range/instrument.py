@@ -0,0 +1,210 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (c) 2014-2016 Scaleway and Contributors. All Rights Reserved.
+#                         Kevin Deldycke <kdeldycke@scaleway.com>
+#
+# Licensed under the BSD 2-Clause License (the "License"); you may not use this
+# file except in compliance with the License. You may obtain a copy of the
+# License at https://opensource.org/licenses/BSD-2-Clause
+
+""" Opt-in counters and timers of parsing, conversion, formatting and
+matching hot paths.
+"""
+
+from __future__ import (absolute_import, division, print_function,
+                        unicode_literals)
+
+import functools
+import threading
+
+from port_range import PortRange, basestring, integer_types
+from port_range.index import PortRangeIndex
+
+try:
+    from time import perf_counter as _clock
+except ImportError:  # pragma: no cover
+    from time import time as _clock
+
+# Timed operations, as (name, class attribute, method or property name).
+TIMERS = [
+    ('parse', 'range_class', 'parse'),
+    ('cidr_to_range', 'range_class', '_cidr_to_range'),
+    ('to_cidrs', 'range_class', 'to_cidrs'),
+    ('format', 'range_class', '__str__'),
+    ('cidr_string', 'range_class', 'cidr_string'),
+    ('range_string', 'range_class', 'range_string'),
+    ('contains', 'range_class', '__contains__'),
+    ('match', 'index_class', 'match'),
+    ('first', 'index_class', 'first'),
+]
+
+# Kinds of inputs of the parser.
+INPUT_KINDS = ['int', 'range_string', 'cidr_string', 'port_range', 'iterable']
+
+# Classes currently instrumented, to not wrap methods twice.
+_instrumented = set()
+
+
+class Instrumentation(object):
+
+    """ Counters and timers of ``PortRange`` and ``PortRangeIndex`` methods.
+
+    Methods are only wrapped between ``enable()`` and ``disable()``, or
+    within a ``with`` block, so there is no overhead at all while disabled.
+    Timers are cumulative and nested: parsing time includes conversion of
+    CIDR-like strings, timed on its own as ``cidr_to_range``, and formatting
+    time includes rendering of both notations, timed as ``cidr_string`` and
+    ``range_string``.
+    """
+
+    range_class = PortRange
+    index_class = PortRangeIndex
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._originals = None
+        self.reset()
+
+    @property
+    def enabled(self):
+        return self._originals is not None
+
+    def reset(self):
+        """ Set all counters and timers back to zero. """
+        counters = {}
+        for name, _, _ in TIMERS:
+            counters[name + '.calls'] = 0
+            counters[name + '.seconds'] = 0.0
+        for kind in INPUT_KINDS:
+            counters['parse.kind.' + kind] = 0
+        counters['parse.rejected'] = 0
+        counters['normalize.sorted'] = 0
+        counters['normalize.clamped'] = 0
+        with self._lock:
+            self._counters = counters
+
+    def snapshot(self):
+        """ Return a flat dict of all counters and cumulative seconds. """
+        with self._lock:
+            return dict(self._counters)
+
+    def _record(self, name, started, *events):
+        """ Account for a call of a timed method, and some events. """
+        elapsed = _clock() - started
+        with self._lock:
+            counters = self._counters
+            counters[name + '.calls'] += 1
+            counters[name + '.seconds'] += elapsed
+            for event in events:
+                counters[event] += 1
+
+    def _timed(self, name, method):
+        """ Wrap a method to time its calls. """
+        record = self._record
+
+        @functools.wraps(method)
+        def wrapper(*args, **kwargs):
+            started = _clock()
+            try:
+                return method(*args, **kwargs)
+            finally:
+                record(name, started)
+        return wrapper
+
+    def _timed_parse(self, method):
+        """ Wrap the parser to also count input kinds and rejections. """
+        record = self._record
+
+        @functools.wraps(method)
+        def parse(range_self, port_range):
+            if isinstance(port_range, basestring):
+                if range_self.CIDR_SEP in port_range:
+                    kind = 'parse.kind.cidr_string'
+                else:
+                    kind = 'parse.kind.range_string'
+            elif isinstance(port_range, integer_types):
+                kind = 'parse.kind.int'
+            elif isinstance(port_range, PortRange):
+                kind = 'parse.kind.port_range'
+            else:
+                kind = 'parse.kind.iterable'
+            started = _clock()
+            try:
+                bounds = method(range_self, port_range)
+            except ValueError:
+                record('parse', started, kind, 'parse.rejected')
+                raise
+            record('parse', started, kind)
+            return bounds
+        return parse
+
+    def _counted_normalize(self, method):
+        """ Wrap the normalization to count sorted and clamped bounds. """
+        lock = self._lock
+
+        @functools.wraps(method)
+        def _normalize(range_self, port_from, port_to):
+            bounds = method(range_self, port_from, port_to)
+            events = []
+            if port_to is None:
+                port_to = port_from
+            elif port_to < port_from:
+                events.append('normalize.sorted')
+                port_from, port_to = port_to, port_from
+            if tuple(bounds) != (port_from, port_to):
+                events.append('normalize.clamped')
+            if events:
+                with lock:
+                    for event in events:
+                        self._counters[event] += 1
+            return bounds
+        return _normalize
+
+    def _wrappers(self):
+        """ Yield ``(class, method name, wrapper)`` of all hooks. """
+        for name, class_attribute, method_name in TIMERS:
+            cls = getattr(self, class_attribute)
+            method = getattr(cls, method_name)
+            if name == 'parse':
+                yield cls, method_name, self._timed_parse(method)
+            elif isinstance(method, property):
+                yield cls, method_name, property(
+                    self._timed(name, method.fget), doc=method.__doc__)
+            else:
+                yield cls, method_name, self._timed(name, method)
+        yield self.range_class, '_normalize', self._counted_normalize(
+            self.range_class._normalize)
+
+    def enable(self):
+        """ Start recording, by wrapping instrumented methods. """
+        if self.enabled:
+            return
+        classes = set([self.range_class, self.index_class])
+        if classes & _instrumented:
+            raise RuntimeError("Classes are already instrumented.")
+        _instrumented.update(classes)
+        self._originals = []
+        for cls, method_name, wrapper in list(self._wrappers()):
+            # Remember methods defined on the class itself, to restore them.
+            self._originals.append(
+                (cls, method_name, cls.__dict__.get(method_name)))
+            setattr(cls, method_name, wrapper)
+
+    def disable(self):
+        """ Stop recording and restore original methods. Keeps counters. """
+        if not self.enabled:
+            return
+        for cls, method_name, original in reversed(self._originals):
+            if original is None:
+                delattr(cls, method_name)
+            else:
+                setattr(cls, method_name, original)
+        _instrumented.difference_update([self.range_class, self.index_class])
+        self._originals = None
+
+    def __enter__(self):
+        self.enable()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.disable()
@@ -0,0 +1,171 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (c) 2014-2016 Scaleway and Contributors. All Rights Reserved.
+#                         Kevin Deldycke <kdeldycke@scaleway.com>
+#
+# Licensed under the BSD 2-Clause License (the "License"); you may not use this
+# file except in compliance with the License. You may obtain a copy of the
+# License at https://opensource.org/licenses/BSD-2-Clause
+
+""" Compilation of port ranges into the fewest firewall backend rules.
+"""
+
+from __future__ import (absolute_import, division, print_function,
+                        unicode_literals)
+
+import heapq
+from collections import namedtuple
+
+from port_range import PortRange, _coalesce
+
+try:
+    from time import perf_counter as _clock
+except ImportError:  # pragma: no cover
+    from time import time as _clock
+
+PackedRules = namedtuple('PackedRules', [
+    'rules', 'entries', 'input_count', 'extra_ports', 'compression_ratio',
+    'compile_time'])
+
+
+def _merge_gaps(bounds, budget, cost):
+    """ Merge neighbouring ranges across gaps, smallest gaps first.
+
+    Only merges lowering the total cost of entries are done, until the
+    budget of extra ports is spent. Returns the merged bounds and the number
+    of extra ports they cover.
+    """
+    count = len(bounds)
+    starts = [port_from for port_from, _ in bounds]
+    ends = [port_to for _, port_to in bounds]
+    costs = [cost(port_from, port_to) for port_from, port_to in bounds]
+    following = list(range(1, count + 1))
+    previous = list(range(-1, count - 1))
+    alive = [True] * count
+
+    def gain(left, right):
+        return costs[left] + costs[right] - cost(starts[left], ends[right])
+
+    # Heap of (gap size, left range, right range) candidate merges.
+    heap = [
+        (starts[index + 1] - ends[index] - 1, index, index + 1)
+        for index in range(count - 1) if gain(index, index + 1) > 0]
+    heapq.heapify(heap)
+    extra = 0
+    while heap:
+        gap, left, right = heapq.heappop(heap)
+        # Skip merges made obsolete or useless by previous ones.
+        if not alive[left] or following[left] != right or gain(
+                left, right) <= 0:
+            continue
+        if gap > budget - extra:
+            break
+        ends[left] = ends[right]
+        costs[left] = cost(starts[left], ends[left])
+        alive[right] = False
+        following[left] = following[right]
+        if following[right] < count:
+            previous[following[right]] = left
+        extra += gap
+        # Costs changed: reconsider merges with both neighbours.
+        for neighbour_left in (previous[left], left):
+            neighbour_right = following[neighbour_left]
+            if neighbour_left >= 0 and neighbour_right < count and gain(
+                    neighbour_left, neighbour_right) > 0:
+                heapq.heappush(heap, (
+                    starts[neighbour_right] - ends[neighbour_left] - 1,
+                    neighbour_left, neighbour_right))
+    merged = [
+        (starts[index], ends[index]) for index in range(count)
+        if alive[index]]
+    return merged, extra
+
+
+def _bin_pack(entries, weights, capacity):
+    """ Split weighted entries into the fewest rules of bounded weight.
+
+    Weights are 1 or a single heavier value. Heavy entries are packed
+    first, then light ones fill the room left before opening new rules,
+    which is optimal with only two distinct weights, one of them 1.
+    """
+    heavy = [
+        entry for entry, weight in zip(entries, weights) if weight > 1]
+    light = [
+        entry for entry, weight in zip(entries, weights) if weight == 1]
+    rules = []
+    if heavy:
+        weight = max(weights)
+        per_rule = capacity // weight
+        for index in range(0, len(heavy), per_rule):
+            rule = heavy[index:index + per_rule]
+            room = capacity - len(rule) * weight
+            rule.extend(light[:room])
+            del light[:room]
+            rules.append(sorted(rule))
+    rules.extend(
+        light[index:index + capacity]
+        for index in range(0, len(light), capacity))
+    return rules
+
+
+def pack_rules(ranges, max_entries=15, masks=False, range_cost=1,
+               overcoverage=0, strict=False, range_class=PortRange):
+    """ Compile port ranges into the fewest rules of a firewall backend.
+
+    Ranges are merged and split into rules of at most ``max_entries``
+    entries each. A range entry weighs ``range_cost``, a single port 1: use
+    2 for iptables ``multiport``, which counts ranges as two ports. Backends
+    only accepting CIDR-like masks get aligned blocks, if ``masks`` is set.
+
+    Up to ``overcoverage`` ports not in the input can be covered to save
+    entries, by merging ranges across the smallest gaps first. This is
+    optimal for ranges weighing a single entry, and a greedy heuristic
+    otherwise.
+
+    Returns a ``PackedRules`` tuple with rules as lists of strings, using
+    ``cidr_string`` for masks and ``range_string`` for ranges. Subclass
+    ``range_class`` to change separators, like ``:`` for iptables.
+    """
+    started = _clock()
+    if range_cost < 1 or max_entries < range_cost:
+        raise ValueError("Rules must hold at least one entry of any kind.")
+    bounds = []
+    for port_range in ranges:
+        if not isinstance(port_range, PortRange):
+            port_range = range_class(port_range, strict=strict)
+        bounds.append(port_range.bounds)
+    input_count = len(bounds)
+    bounds.sort()
+    bounds = _coalesce(bounds)
+
+    if masks:
+        def cost(port_from, port_to):
+            return sum(1 for _ in range_class._aligned_blocks(
+                port_from, port_to))
+    else:
+        def cost(port_from, port_to):
+            return 1 if port_from == port_to else range_cost
+
+    bounds, extra_ports = _merge_gaps(bounds, overcoverage, cost)
+    if masks:
+        bounds = [
+            block for port_from, port_to in bounds
+            for block in range_class._aligned_blocks(port_from, port_to)]
+        weights = [1] * len(bounds)
+    else:
+        weights = [cost(port_from, port_to) for port_from, port_to in bounds]
+
+    entries = [
+        range_class._from_bounds(port_from, port_to, strict)
+        for port_from, port_to in bounds]
+    rules = []
+    for rule in _bin_pack(entries, weights, max_entries):
+        if masks:
+            rules.append([entry.cidr_string for entry in rule])
+        else:
+            rules.append([
+                str(entry.port_from) if entry.is_single_port
+                else entry.range_string for entry in rule])
+    return PackedRules(
+        rules, entries, input_count, extra_ports,
+        input_count / len(rules) if rules else 1.0, _clock() - started)
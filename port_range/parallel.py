@@ -0,0 +1,111 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (c) 2014-2016 Scaleway and Contributors. All Rights Reserved.
+#                         Kevin Deldycke <kdeldycke@scaleway.com>
+#
+# Licensed under the BSD 2-Clause License (the "License"); you may not use this
+# file except in compliance with the License. You may obtain a copy of the
+# License at https://opensource.org/licenses/BSD-2-Clause
+
+""" Normalization of huge streams of port ranges on a pool of processes.
+"""
+
+from __future__ import (absolute_import, division, print_function,
+                        unicode_literals)
+
+import heapq
+import multiprocessing
+from collections import deque
+from itertools import islice
+
+from port_range import PortRange, _coalesce
+from port_range.sets import PortRangeSet
+
+try:
+    from concurrent.futures import ProcessPoolExecutor
+except ImportError:  # pragma: no cover
+    ProcessPoolExecutor = None
+
+
+def _normalize_shard(specs, strict, start, range_class):
+    """ Parse a shard of specifications into sorted, coalesced bounds. """
+    bounds = list(range_class.parse_many(
+        specs, strict=strict, raw=True, start=start))
+    bounds.sort()
+    return _coalesce(bounds)
+
+
+def _shards(specs, shard_size):
+    """ Yield ``(start, shard)`` lists of consecutive specifications. """
+    specs = iter(specs)
+    start = 0
+    while True:
+        shard = list(islice(specs, shard_size))
+        if not shard:
+            return
+        yield start, shard
+        start += len(shard)
+
+
+def _set_class(range_class):
+    """ Class of sets yielding instances of ``range_class``. """
+    if range_class is PortRangeSet.range_class:
+        return PortRangeSet
+    return type(
+        str('PortRangeSet'), (PortRangeSet,), {'range_class': range_class})
+
+
+def normalize_parallel(specs, workers=None, strict=False, shard_size=100000,
+                       executor=None, range_class=PortRange):
+    """ Parse and merge an iterable of port range specifications.
+
+    Returns the same ``PortRangeSet`` as serial processing. The input is
+    consumed lazily in shards of ``shard_size`` items, each parsed and
+    coalesced by a worker process. Only a couple of shards per worker are in
+    flight at any time, then the sorted partial results are reduced by a
+    k-way merge.
+
+    ``workers`` defaults to the number of CPUs. With a single worker, shards
+    are processed in the current process. An existing ``executor`` can be
+    provided instead, and is left running.
+
+    Invalid items raise a ``ParseError`` numbered after their position in the
+    whole input.
+    """
+    if shard_size < 1:
+        raise ValueError("Shard size must be strictly positive.")
+    if workers is None:
+        workers = multiprocessing.cpu_count()
+    if workers < 1:
+        raise ValueError("Number of workers must be strictly positive.")
+
+    shards = _shards(specs, shard_size)
+    if executor is None and workers == 1:
+        partials = [
+            _normalize_shard(shard, strict, start, range_class)
+            for start, shard in shards]
+    else:
+        partials = _map_shards(shards, strict, range_class, workers, executor)
+    bounds = _coalesce(list(heapq.merge(*partials)))
+    return _set_class(range_class)._from_bounds(bounds, strict)
+
+
+def _map_shards(shards, strict, range_class, workers, executor):
+    """ Normalize shards on a pool, with a bounded number of pending ones.
+    """
+    if executor is None:
+        if ProcessPoolExecutor is None:  # pragma: no cover
+            raise ImportError(
+                "Parallel normalization requires the futures backport.")
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            return _map_shards(shards, strict, range_class, workers, pool)
+    partials = []
+    pending = deque()
+    for start, shard in shards:
+        if len(pending) >= 2 * workers:
+            partials.append(pending.popleft().result())
+        pending.append(executor.submit(
+            _normalize_shard, shard, strict, start, range_class))
+    while pending:
+        partials.append(pending.popleft().result())
+    return partials
@@ -0,0 +1,382 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (c) 2014-2016 Scaleway and Contributors. All Rights Reserved.
+#                         Kevin Deldycke <kdeldycke@scaleway.com>
+#
+# Licensed under the BSD 2-Clause License (the "License"); you may not use this
+# file except in compliance with the License. You may obtain a copy of the
+# License at https://opensource.org/licenses/BSD-2-Clause
+
+""" Normalized sets of port ranges.
+"""
+
+from __future__ import (absolute_import, division, print_function,
+                        unicode_literals)
+
+from bisect import bisect_right
+from collections import namedtuple
+from numbers import Integral
+
+from port_range import (
+    PortRange, _chunk_bounds, _coalesce, basestring, integer_types,
+    port_sequence)
+
+
+def _merge_sorted(left, right):
+    """ Linear merge of two lists of bounds already sorted by lower bound. """
+    merged = []
+    i = j = 0
+    left_len, right_len = len(left), len(right)
+    while i < left_len and j < right_len:
+        if left[i] <= right[j]:
+            merged.append(left[i])
+            i += 1
+        else:
+            merged.append(right[j])
+            j += 1
+    merged.extend(left[i:])
+    merged.extend(right[j:])
+    return merged
+
+
+def _intersect(left, right):
+    """ Intersection of two normalized lists of bounds. """
+    result = []
+    i = j = 0
+    left_len, right_len = len(left), len(right)
+    while i < left_len and j < right_len:
+        left_from, left_to = left[i]
+        right_from, right_to = right[j]
+        port_from = max(left_from, right_from)
+        port_to = min(left_to, right_to)
+        if port_from <= port_to:
+            result.append((port_from, port_to))
+        # Advance whichever range ends first.
+        if left_to < right_to:
+            i += 1
+        else:
+            j += 1
+    return result
+
+
+def _subtract(left, right):
+    """ Remove from a normalized list of bounds all ports of another one. """
+    result = []
+    j = 0
+    right_len = len(right)
+    for port_from, port_to in left:
+        # Skip subtracted ranges lying entirely before the current one.
+        while j < right_len and right[j][1] < port_from:
+            j += 1
+        k = j
+        while k < right_len and right[k][0] <= port_to:
+            cut_from, cut_to = right[k]
+            if cut_from > port_from:
+                result.append((port_from, cut_from - 1))
+            port_from = cut_to + 1
+            if port_from > port_to:
+                break
+            k += 1
+        if port_from <= port_to:
+            result.append((port_from, port_to))
+    return result
+
+
+# Ranges of ports to add and to remove to turn a set into another.
+PortRangeDelta = namedtuple('PortRangeDelta', ['added', 'removed'])
+
+
+class PortRangeSet(object):
+
+    """ Set of ports stored as sorted, coalesced and non-overlapping ranges.
+
+    Accepts an iterable of ``PortRange`` instances or of anything
+    ``PortRange`` itself can parse, and always yields ``PortRange`` objects
+    back. Set operations are computed by linear merge passes over the sorted
+    bounds, and membership tests are binary searches.
+    """
+
+    range_class = PortRange
+
+    def __init__(self, ranges=None, strict=False):
+        """ Parse, sort and coalesce all provided ranges. """
+        if isinstance(ranges, basestring):
+            raise TypeError(
+                "Expecting an iterable of port ranges, not a string.")
+        self.strict = strict
+        bounds = []
+        if ranges is not None:
+            for port_range in ranges:
+                bounds.append(self._to_bounds(port_range))
+        bounds.sort()
+        self._set_bounds(_coalesce(bounds))
+
+    @classmethod
+    def _from_bounds(cls, bounds, strict=False):
+        """ Build a new set from already normalized bounds. """
+        port_set = cls.__new__(cls)
+        port_set.strict = strict
+        port_set._set_bounds(bounds)
+        return port_set
+
+    def _set_bounds(self, bounds):
+        """ Replace content with normalized bounds and refresh lookup index.
+        """
+        self._bounds = bounds
+        self._starts = [port_from for port_from, _ in bounds]
+        self._popcount = sum(
+            port_to - port_from + 1 for port_from, port_to in bounds)
+
+    def _to_bounds(self, port_range):
+        """ Normalize any range specification to a tuple of bounds. """
+        if not isinstance(port_range, PortRange):
+            port_range = self.range_class(port_range, strict=self.strict)
+        return port_range.bounds
+
+    def _coerce(self, other):
+        """ Cast the operand of a set operation to a ``PortRangeSet``. """
+        if isinstance(other, PortRangeSet):
+            return other
+        # A single range specification is not an iterable of ranges.
+        if isinstance(other, (PortRange, basestring) + integer_types):
+            other = [other]
+        return self.__class__(other, strict=self.strict)
+
+    @property
+    def bounds(self):
+        """ Return the normalized list of ``(port_from, port_to)`` tuples. """
+        return list(self._bounds)
+
+    @property
+    def ranges(self):
+        """ Return the normalized list of ``PortRange`` objects. """
+        return list(self)
+
+    def __iter__(self):
+        """ Yield normalized ranges as ``PortRange`` objects. """
+        # Bounds are already normalized: skip the parser.
+        from_bounds = self.range_class._from_bounds
+        for port_from, port_to in self._bounds:
+            yield from_bounds(port_from, port_to, self.strict)
+
+    def __len__(self):
+        """ Number of normalized ranges in the set. """
+        return len(self._bounds)
+
+    def __bool__(self):
+        return bool(self._bounds)
+
+    def popcount(self):
+        """ Number of ports in the set. """
+        return self._popcount
+
+    def iter_ports(self, reverse=False):
+        """ Lazily yield all ports of the set, highest first if reverse. """
+        if reverse:
+            for port_from, port_to in reversed(self._bounds):
+                for port in reversed(port_sequence(port_from, port_to + 1)):
+                    yield port
+        else:
+            for port_from, port_to in self._bounds:
+                for port in port_sequence(port_from, port_to + 1):
+                    yield port
+
+    def iter_chunks(self, size, aligned=False):
+        """ Lazily split the set into ranges of at most size ports.
+
+        Chunks never span the gap between two ranges of the set. See
+        ``PortRange.iter_chunks()`` for the meaning of ``aligned``.
+        """
+        range_class = self.range_class
+        chunks = _chunk_bounds(self._bounds, size, aligned)
+        return (
+            range_class._from_bounds(port_from, port_to, self.strict)
+            for port_from, port_to in chunks)
+
+    __nonzero__ = __bool__
+
+    def __contains__(self, item):
+        """ Check that a port or a whole range is included in the set. """
+        if isinstance(item, Integral):
+            port_from = port_to = item
+        else:
+            port_from, port_to = self._to_bounds(item)
+        index = bisect_right(self._starts, port_from) - 1
+        return index >= 0 and port_to <= self._bounds[index][1]
+
+    def __eq__(self, other):
+        """ Compare two sets of ports. """
+        if not isinstance(other, PortRangeSet):
+            return NotImplemented
+        return self._bounds == other._bounds
+
+    def __ne__(self, other):
+        result = self.__eq__(other)
+        if result is NotImplemented:
+            return result
+        return not result
+
+    # Sets are mutable containers and are not hashable.
+    __hash__ = None
+
+    def __repr__(self):
+        return '{}([{}])'.format(
+            self.__class__.__name__,
+            ', '.join(repr(str(port_range)) for port_range in self))
+
+    def __str__(self):
+        return ','.join(str(port_range) for port_range in self)
+
+    def union(self, *others):
+        """ Return the union of this set and all others. """
+        bounds = self._bounds[:]
+        for other in others:
+            bounds = _coalesce(
+                _merge_sorted(bounds, self._coerce(other)._bounds))
+        return self._from_bounds(bounds, self.strict)
+
+    def intersection(self, *others):
+        """ Return the ports shared by this set and all others. """
+        bounds = self._bounds[:]
+        for other in others:
+            bounds = _intersect(bounds, self._coerce(other)._bounds)
+        return self._from_bounds(bounds, self.strict)
+
+    def difference(self, *others):
+        """ Return the ports of this set not in any of the others. """
+        bounds = self._bounds[:]
+        for other in others:
+            bounds = _subtract(bounds, self._coerce(other)._bounds)
+        return self._from_bounds(bounds, self.strict)
+
+    def symmetric_difference(self, other):
+        """ Return the ports in either this set or the other, not both. """
+        other_bounds = self._coerce(other)._bounds
+        bounds = _coalesce(_merge_sorted(
+            _subtract(self._bounds, other_bounds),
+            _subtract(other_bounds, self._bounds)))
+        return self._from_bounds(bounds, self.strict)
+
+    def update(self, *others):
+        """ Add all ports of the others to this set, in place. """
+        self._set_bounds(self.union(*others)._bounds)
+
+    def intersection_update(self, *others):
+        """ Keep only ports shared with all others, in place. """
+        self._set_bounds(self.intersection(*others)._bounds)
+
+    def difference_update(self, *others):
+        """ Remove all ports of the others from this set, in place. """
+        self._set_bounds(self.difference(*others)._bounds)
+
+    def symmetric_difference_update(self, other):
+        """ Keep ports in either this set or the other, not both, in place.
+        """
+        self._set_bounds(self.symmetric_difference(other)._bounds)
+
+    def diff(self, other, cidr=False):
+        """ Return the ranges to add and remove to turn this set into other.
+
+        Both lists of the returned ``PortRangeDelta`` are sorted and minimal.
+        If ``cidr`` is set, ranges are split into aligned CIDR-like blocks.
+        """
+        other_bounds = self._coerce(other)._bounds
+        added = _subtract(other_bounds, self._bounds)
+        removed = _subtract(self._bounds, other_bounds)
+        if cidr:
+            split = self.range_class._aligned_blocks
+            added = [block for bounds in added for block in split(*bounds)]
+            removed = [
+                block for bounds in removed for block in split(*bounds)]
+        from_bounds = self.range_class._from_bounds
+        return PortRangeDelta(
+            [from_bounds(port_from, port_to, self.strict)
+             for port_from, port_to in added],
+            [from_bounds(port_from, port_to, self.strict)
+             for port_from, port_to in removed])
+
+    def apply(self, delta):
+        """ Remove then add ranges of a ``PortRangeDelta``, in place. """
+        added, removed = delta
+        self.difference_update(removed)
+        self.update(added)
+
+    def issubset(self, other):
+        """ Are all ports of this set included in the other? """
+        return not _subtract(self._bounds, self._coerce(other)._bounds)
+
+    def issuperset(self, other):
+        """ Are all ports of the other set included in this one? """
+        return self._coerce(other).issubset(self)
+
+    def isdisjoint(self, other):
+        """ Do this set and the other share no port at all? """
+        return not _intersect(self._bounds, self._coerce(other)._bounds)
+
+    def _operand(self, other):
+        """ Only allow set operators between sets, as ``set`` does. """
+        return isinstance(other, PortRangeSet)
+
+    def __or__(self, other):
+        if not self._operand(other):
+            return NotImplemented
+        return self.union(other)
+
+    def __and__(self, other):
+        if not self._operand(other):
+            return NotImplemented
+        return self.intersection(other)
+
+    def __sub__(self, other):
+        if not self._operand(other):
+            return NotImplemented
+        return self.difference(other)
+
+    def __xor__(self, other):
+        if not self._operand(other):
+            return NotImplemented
+        return self.symmetric_difference(other)
+
+    def __ior__(self, other):
+        if not self._operand(other):
+            return NotImplemented
+        self.update(other)
+        return self
+
+    def __iand__(self, other):
+        if not self._operand(other):
+            return NotImplemented
+        self.intersection_update(other)
+        return self
+
+    def __isub__(self, other):
+        if not self._operand(other):
+            return NotImplemented
+        self.difference_update(other)
+        return self
+
+    def __ixor__(self, other):
+        if not self._operand(other):
+            return NotImplemented
+        self.symmetric_difference_update(other)
+        return self
+
+    def __le__(self, other):
+        if not self._operand(other):
+            return NotImplemented
+        return self.issubset(other)
+
+    def __ge__(self, other):
+        if not self._operand(other):
+            return NotImplemented
+        return self.issuperset(other)
+
+    def __lt__(self, other):
+        if not self._operand(other):
+            return NotImplemented
+        return self.issubset(other) and self != other
+
+    def __gt__(self, other):
+        if not self._operand(other):
+            return NotImplemented
+        return self.issuperset(other) and self != other
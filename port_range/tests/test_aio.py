@@ -0,0 +1,132 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (c) 2014-2016 Scaleway and Contributors. All Rights Reserved.
+#                         Kevin Deldycke <kdeldycke@scaleway.com>
+#
+# Licensed under the BSD 2-Clause License (the "License"); you may not use this
+# file except in compliance with the License. You may obtain a copy of the
+# License at https://opensource.org/licenses/BSD-2-Clause
+
+from __future__ import (
+    absolute_import,
+    division,
+    print_function,
+    unicode_literals
+)
+
+import io
+import sys
+import unittest
+
+from port_range import ParseError, PortRange
+
+if sys.version_info >= (3, 5):
+    import asyncio
+    from concurrent.futures import ThreadPoolExecutor
+    from port_range.aio import aparse
+
+INPUT = '80\n4242-42\n\n1024/6\n  443  \n1-3'
+
+
+@unittest.skipIf(sys.version_info < (3, 5), "Requires Python 3.5+.")
+class TestAsyncParse(unittest.TestCase):
+
+    def setUp(self):
+        self.loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self.loop)
+
+    def tearDown(self):
+        asyncio.set_event_loop(None)
+        self.loop.close()
+
+    def collect(self, iterator):
+        """ Consume an asynchronous iterator as ``async for`` does. """
+        results = []
+        while True:
+            try:
+                results.append(
+                    self.loop.run_until_complete(iterator.__anext__()))
+            except StopAsyncIteration:
+                return results
+
+    def test_text_file(self):
+        parser = aparse(io.StringIO(INPUT), chunk_size=3, batch_size=2)
+        self.assertIs(parser.__aiter__(), parser)
+        self.assertEqual(
+            [str(port_range) for port_range in self.collect(parser)],
+            ['80', '42-4242', '1024/6', '443', '1-3'])
+
+    def test_binary_file(self):
+        # Multi-byte characters split across chunks are decoded.
+        stream = io.BytesIO('80\n 443\n'.encode('utf-8'))
+        self.assertEqual(
+            self.collect(aparse(stream, raw=True, chunk_size=4)),
+            [(80, 80), (443, 443)])
+
+    def test_stream_reader(self):
+        reader = asyncio.StreamReader()
+        reader.feed_data(INPUT.encode('ascii'))
+        reader.feed_eof()
+        self.assertEqual(
+            self.collect(aparse(reader, raw=True, batch_size=1)),
+            [(80, 80), (42, 4242), (1024, 2047), (443, 443), (1, 3)])
+
+    def test_errors(self):
+        parser = aparse(io.StringIO(INPUT), strict=True, start=1)
+        self.assertEqual(
+            self.loop.run_until_complete(parser.__anext__()),
+            PortRange('80'))
+        with self.assertRaises(ParseError) as context:
+            self.loop.run_until_complete(parser.__anext__())
+        self.assertEqual(context.exception.index, 2)
+        self.assertEqual(self.collect(parser), [])
+
+        errors = []
+        self.assertEqual(
+            len(self.collect(aparse(
+                io.StringIO(INPUT), strict=True, on_error='collect',
+                errors=errors))), 4)
+        self.assertEqual(
+            [(error.index, error.port_range) for error in errors],
+            [(1, '4242-42')])
+        self.assertEqual(
+            len(self.collect(aparse(
+                io.StringIO(INPUT), strict=True, on_error='skip'))), 4)
+        self.assertRaises(
+            ValueError, aparse, io.StringIO(INPUT), on_error='collect')
+
+    def test_error_lines(self):
+        # Blank lines are accounted for in error indexes.
+        errors = []
+        self.collect(aparse(
+            io.StringIO('80\n\n90-80\n\n\n70-60\n'), strict=True,
+            on_error='collect', errors=errors, start=1, batch_size=1))
+        self.assertEqual(
+            [(error.index, error.port_range) for error in errors],
+            [(3, '90-80'), (6, '70-60')])
+        parser = aparse(io.StringIO('\n\n90-80\n'), strict=True)
+        with self.assertRaises(ParseError) as context:
+            self.loop.run_until_complete(parser.__anext__())
+        self.assertEqual(context.exception.index, 2)
+
+    def test_executor(self):
+        specs = '\n'.join(str(port) for port in range(1, 5001))
+        with ThreadPoolExecutor(2) as executor:
+            results = self.collect(aparse(
+                io.StringIO(specs), raw=True, batch_size=100,
+                executor=executor))
+        self.assertEqual(results, [(port, port) for port in range(1, 5001)])
+
+    def test_yields_to_loop(self):
+        ticks = []
+
+        def tick():
+            ticks.append(None)
+            self.loop.call_soon(tick)
+
+        self.loop.call_soon(tick)
+        parser = aparse(io.StringIO('80\n' * 1000), batch_size=100)
+        # Parse a whole batch in a single step of the iterator. Callbacks
+        # run twice around the task, and once more when it yields.
+        self.loop.run_until_complete(parser.__anext__())
+        self.assertGreater(len(ticks), 2)
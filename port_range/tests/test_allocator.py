@@ -0,0 +1,190 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (c) 2014-2016 Scaleway and Contributors. All Rights Reserved.
+#                         Kevin Deldycke <kdeldycke@scaleway.com>
+#
+# Licensed under the BSD 2-Clause License (the "License"); you may not use this
+# file except in compliance with the License. You may obtain a copy of the
+# License at https://opensource.org/licenses/BSD-2-Clause
+
+from __future__ import (
+    absolute_import,
+    division,
+    print_function,
+    unicode_literals
+)
+
+import random
+import threading
+import unittest
+
+from port_range import PortRange
+from port_range.allocator import PortAllocator, PortsExhausted
+from port_range.sets import PortRangeSet
+
+
+class TestPortAllocator(unittest.TestCase):
+
+    def test_sequential_allocation(self):
+        allocator = PortAllocator('1000-1003', randomize=False)
+        self.assertEqual(allocator.size, 4)
+        self.assertEqual(
+            [allocator.allocate() for _ in range(4)], [1000, 1001, 1002, 1003])
+        self.assertEqual(allocator.free, 0)
+        self.assertEqual(allocator.used, 4)
+        self.assertEqual(allocator.occupancy, 1)
+        with self.assertRaises(PortsExhausted):
+            allocator.allocate()
+
+        allocator.release(1002)
+        self.assertFalse(allocator.is_allocated(1002))
+        self.assertTrue(allocator.is_allocated(1001))
+        self.assertFalse(allocator.is_allocated(999))
+        self.assertEqual(allocator.allocate(), 1002)
+
+    def test_random_allocation(self):
+        allocator = PortAllocator(PortRange('32768-60999'), seed=42)
+        ports = set(allocator.allocate() for _ in range(1000))
+        self.assertEqual(len(ports), 1000)
+        self.assertTrue(all(32768 <= port <= 60999 for port in ports))
+        # Ports are not handed out in order.
+        self.assertNotEqual(sorted(ports), list(range(32768, 33768)))
+
+        # Fill the pool up to exhaustion.
+        while allocator.free:
+            ports.add(allocator.allocate())
+        self.assertEqual(ports, set(range(32768, 61000)))
+        self.assertRaises(PortsExhausted, allocator.allocate)
+
+    def test_fragmented_pool(self):
+        pool = PortRangeSet(['10-12', '20', '30-31'])
+        allocator = PortAllocator(pool, randomize=False)
+        self.assertEqual(allocator.size, 6)
+        self.assertEqual(
+            [allocator.allocate() for _ in range(6)],
+            [10, 11, 12, 20, 30, 31])
+        self.assertFalse(allocator.is_allocated(15))
+        self.assertRaises(ValueError, allocator.release, 15)
+        self.assertRaises(ValueError, allocator.release, '12-20')
+        allocator.release('10-12')
+        self.assertEqual(allocator.free, 3)
+
+    def test_single_port_pool(self):
+        allocator = PortAllocator(443)
+        self.assertEqual(allocator.allocate(), 443)
+        self.assertRaises(PortsExhausted, allocator.allocate)
+        allocator.release(443)
+        self.assertEqual(allocator.allocate_block(1), PortRange('443'))
+
+    def test_block_allocation(self):
+        allocator = PortAllocator('1000-1100', randomize=False)
+        self.assertEqual(allocator.allocate_block(10), PortRange('1000-1009'))
+        self.assertEqual(allocator.allocate_block(5), PortRange('1010-1014'))
+        allocator.release('1003-1006')
+        # Lowest fitting block.
+        self.assertEqual(allocator.allocate_block(3), PortRange('1003-1005'))
+        self.assertEqual(allocator.allocate_block(2), PortRange('1015-1016'))
+        self.assertEqual(allocator.allocate(), 1006)
+        # Blocks straddling the middle of the tree.
+        self.assertEqual(
+            allocator.allocate_block(40), PortRange('1017-1056'))
+        self.assertRaises(PortsExhausted, allocator.allocate_block, 45)
+        self.assertEqual(
+            allocator.allocate_block(44), PortRange('1057-1100'))
+        self.assertRaises(PortsExhausted, allocator.allocate_block, 1)
+
+        self.assertRaises(ValueError, allocator.allocate_block, 0)
+        self.assertRaises(ValueError, allocator.allocate_block, 3, True)
+
+    def test_aligned_block_allocation(self):
+        allocator = PortAllocator('1000-1100', randomize=False)
+        block = allocator.allocate_block(16, aligned=True)
+        self.assertEqual(block, PortRange('1008/12'))
+        self.assertTrue(block.is_cidr)
+        self.assertEqual(
+            allocator.allocate_block(64, aligned=True), PortRange('1024/10'))
+        self.assertEqual(
+            allocator.allocate_block(4, aligned=True), PortRange('1000/14'))
+        self.assertRaises(
+            PortsExhausted, allocator.allocate_block, 64, aligned=True)
+        self.assertEqual(
+            allocator.allocate_block(1, aligned=True), PortRange('1004'))
+        self.assertEqual(
+            allocator.allocate_block(8, aligned=True), PortRange('1088/13'))
+        # Ports 1096 to 1100 are free, but 1101 to 1103 are out of the pool.
+        self.assertRaises(
+            PortsExhausted, allocator.allocate_block, 8, aligned=True)
+        self.assertEqual(
+            allocator.allocate_block(4, aligned=True), PortRange('1096/14'))
+
+    def test_release_errors(self):
+        allocator = PortAllocator('1000-1100')
+        allocator.allocate_block(10)
+        self.assertRaises(ValueError, allocator.release, 2000)
+        self.assertRaises(ValueError, allocator.release, '1000-1010')
+        self.assertRaises(ValueError, allocator.release, '1050')
+        allocator.release(PortRange('1000-1009'))
+        self.assertEqual(allocator.free, 101)
+        self.assertRaises(ValueError, allocator.release, 1000)
+
+    def test_invalid_pools(self):
+        self.assertRaises(ValueError, PortAllocator, PortRangeSet())
+        self.assertRaises(ValueError, PortAllocator, '90-80', strict=True)
+
+    def test_consistency(self):
+        rand = random.Random(7)
+        allocator = PortAllocator(
+            PortRangeSet(['1-300', '400-700', '1000-1010']), seed=7)
+        pool = set(range(1, 301)) | set(range(400, 701)) | set(
+            range(1000, 1011))
+        used = set()
+        for _ in range(3000):
+            action = rand.random()
+            if action < 0.5:
+                if len(used) == len(pool):
+                    self.assertRaises(PortsExhausted, allocator.allocate)
+                    continue
+                port = allocator.allocate()
+                self.assertIn(port, pool)
+                self.assertNotIn(port, used)
+                used.add(port)
+            elif action < 0.6:
+                size = rand.randint(1, 8)
+                try:
+                    block = allocator.allocate_block(size)
+                except PortsExhausted:
+                    continue
+                ports = set(range(block.port_from, block.port_to + 1))
+                self.assertTrue(ports <= pool)
+                self.assertFalse(ports & used)
+                used |= ports
+            elif used:
+                port = rand.choice(sorted(used))
+                allocator.release(port)
+                used.discard(port)
+            self.assertEqual(allocator.used, len(used))
+
+        # Incremental updates match a full rebuild of the tree.
+        nodes = [list(values) for values in (
+            allocator._free, allocator._prefix, allocator._suffix,
+            allocator._longest, allocator._block)]
+        allocator._refresh(allocator._leaves, 2 * allocator._leaves - 1)
+        self.assertEqual(nodes, [
+            allocator._free, allocator._prefix, allocator._suffix,
+            allocator._longest, allocator._block])
+
+    def test_thread_safety(self):
+        allocator = PortAllocator('1-4000')
+        allocated = []
+
+        def worker():
+            ports = [allocator.allocate() for _ in range(500)]
+            allocated.extend(ports)
+
+        threads = [threading.Thread(target=worker) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(len(set(allocated)), 4000)
+        self.assertEqual(allocator.free, 0)
@@ -0,0 +1,162 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (c) 2014-2016 Scaleway and Contributors. All Rights Reserved.
+#                         Kevin Deldycke <kdeldycke@scaleway.com>
+#
+# Licensed under the BSD 2-Clause License (the "License"); you may not use this
+# file except in compliance with the License. You may obtain a copy of the
+# License at https://opensource.org/licenses/BSD-2-Clause
+
+from __future__ import (
+    absolute_import,
+    division,
+    print_function,
+    unicode_literals
+)
+
+import unittest
+
+from port_range import PortRange
+from port_range.array import PortRangeArray, numpy
+
+
+def scalar_parse(spec, strict):
+    """ Result of the scalar parser, or the error it raises. """
+    try:
+        return PortRange(spec, strict=strict).bounds
+    except ValueError as error:
+        return str(error)
+
+
+def array_parse(spec, strict):
+    """ Result of the bulk parser on a single item, or the error it raises.
+    """
+    try:
+        return PortRangeArray.parse([spec], strict=strict)[0].bounds
+    except ValueError as error:
+        return str(error)
+
+
+@unittest.skipIf(numpy is None, "NumPy is not installed.")
+class TestPortRangeArray(unittest.TestCase):
+
+    def test_parsing(self):
+        array = PortRangeArray.parse(
+            ['80', ' 4242-42 ', '1027/15', '0001234', '64666/3', '0', '66666'])
+        self.assertEqual(len(array), 7)
+        self.assertEqual(array.port_from.dtype, numpy.uint16)
+        self.assertEqual(
+            array.port_from.tolist(), [80, 42, 1027, 1234, 64666, 1, 65535])
+        self.assertEqual(
+            array.port_to.tolist(), [80, 4242, 1028, 1234, 65535, 1, 65535])
+        self.assertEqual(
+            array.bounds.tolist(),
+            [[80, 80], [42, 4242], [1027, 1028], [1234, 1234],
+             [64666, 65535], [1, 1], [65535, 65535]])
+
+        # Integers, sequences and empty inputs.
+        self.assertEqual(
+            PortRangeArray.parse([80, 0, 70000]).bounds.tolist(),
+            [[80, 80], [1, 1], [65535, 65535]])
+        self.assertEqual(
+            PortRangeArray.parse([(4242, 42), [80]]).bounds.tolist(),
+            [[42, 4242], [80, 80]])
+        self.assertEqual(len(PortRangeArray.parse([])), 0)
+
+        # Ranges are not expanded to their ports.
+        self.assertEqual(
+            PortRangeArray.parse(
+                [PortRange('1-60000'), PortRange('2-60001')]).bounds.tolist(),
+            [[1, 60000], [2, 60001]])
+
+    def test_scalar_equivalence(self):
+        values = ['0', '1', '42', ' 42 ', '65535', '65536', '', 'a', '+5',
+                  '99999999999999999999']
+        specs = []
+        for first in values:
+            specs.append(first)
+            for second in values:
+                specs.extend([
+                    first + '-' + second, first + '/' + second,
+                    first + ' / ' + second, first + '-' + second + '-1'])
+        for strict in (False, True):
+            for spec in specs:
+                self.assertEqual(
+                    array_parse(spec, strict), scalar_parse(spec, strict))
+            for spec in (-5, 0, 1, 80, 65535, 70000):
+                self.assertEqual(
+                    array_parse(spec, strict), scalar_parse(spec, strict))
+
+            # Bulk parsing of all valid specs at once.
+            valid = [
+                spec for spec in specs
+                if isinstance(scalar_parse(spec, strict), tuple)]
+            self.assertEqual(
+                [port_range.bounds
+                 for port_range in PortRangeArray.parse(valid, strict)],
+                [scalar_parse(spec, strict) for spec in valid])
+
+    def test_errors(self):
+        self.assertRaises(
+            ValueError, PortRangeArray.parse, ['80', '90-80'], True)
+        self.assertRaises(ValueError, PortRangeArray.parse, ['80', 'abc'])
+        self.assertRaises(ValueError, PortRangeArray.parse, ['1024/17'])
+        self.assertRaises(ValueError, PortRangeArray, [1, 2], [3])
+        self.assertRaises(ValueError, PortRangeArray, [[1]], [[3]])
+
+    def test_wide_dtype(self):
+        # Odd bounds of non-strict mode are kept as-is.
+        array = PortRangeArray.parse([(-5, -3)])
+        self.assertEqual(array.bounds.tolist(), [[1, -3]])
+        self.assertEqual(array[0].bounds, PortRange((-5, -3)).bounds)
+
+    def test_unsigned_overflow(self):
+        ports = numpy.array([80, 2 ** 64 - 1], dtype=numpy.uint64)
+        array = PortRangeArray.parse(ports)
+        self.assertEqual(
+            [tuple(bounds) for bounds in array.bounds.tolist()],
+            [PortRange(80).bounds, PortRange(2 ** 64 - 1).bounds])
+        self.assertRaises(ValueError, PortRangeArray.parse, ports, True)
+        # Unsigned integers fitting in int64 are parsed in bulk.
+        array = PortRangeArray.parse(numpy.array([70000], dtype=numpy.uint64))
+        self.assertEqual(array.bounds.tolist(), [[65535, 65535]])
+
+    def test_access(self):
+        array = PortRangeArray.from_ranges(
+            [PortRange('80'), '1000-2000', (443, 443)])
+        self.assertEqual(array[1], PortRange('1000-2000'))
+        self.assertEqual(array[-1], PortRange('443'))
+        self.assertEqual(
+            list(array[:2]), [PortRange('80'), PortRange('1000-2000')])
+        self.assertEqual(
+            repr(array), "PortRangeArray(['80', '1000-2000', '443'])")
+        self.assertEqual(len(PortRangeArray.from_ranges([])), 0)
+
+    def test_vectorized_properties(self):
+        specs = ['80', '42-4242', '1027/15', '1024/6', '1-65535']
+        array = PortRangeArray.parse(specs)
+        ranges = [PortRange(spec) for spec in specs]
+        self.assertEqual(
+            array.is_single_port.tolist(),
+            [port_range.is_single_port for port_range in ranges])
+        self.assertEqual(
+            array.is_cidr.tolist(),
+            [port_range.is_cidr for port_range in ranges])
+        self.assertEqual(
+            array.prefix.tolist(),
+            [port_range.prefix for port_range in ranges])
+
+    def test_vectorized_predicates(self):
+        array = PortRangeArray.parse(['80', '42-4242', '1024/6', '5000'])
+        self.assertEqual(
+            array.contains(80).tolist(), [True, True, False, False])
+        self.assertEqual(
+            array.contains(2000).tolist(), [False, True, True, False])
+        self.assertEqual(
+            array.contains(70000).tolist(), [False, False, False, False])
+        self.assertEqual(
+            array.overlaps('4000-5000').tolist(), [False, True, False, True])
+        self.assertEqual(
+            array.overlaps(PortRange('81')).tolist(),
+            [False, True, False, False])
+        self.assertRaises(ValueError, array.overlaps, '90-80', True)
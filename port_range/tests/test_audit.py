@@ -0,0 +1,140 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (c) 2014-2016 Scaleway and Contributors. All Rights Reserved.
+#                         Kevin Deldycke <kdeldycke@scaleway.com>
+#
+# Licensed under the BSD 2-Clause License (the "License"); you may not use this
+# file except in compliance with the License. You may obtain a copy of the
+# License at https://opensource.org/licenses/BSD-2-Clause
+
+from __future__ import (
+    absolute_import,
+    division,
+    print_function,
+    unicode_literals
+)
+
+import random
+import unittest
+
+from port_range import PortRange
+from port_range.audit import (
+    Rule,
+    duplicates,
+    overlapping_groups,
+    overlapping_pairs,
+    shadowed_rules
+)
+
+RULES = [
+    ('1000-2000', 'wide'),
+    ('80', 'http'),
+    (PortRange('1024/6'), 'cidr'),
+    ('443', 'https'),
+    ('1500', 'single'),
+    ('80', 'http-again'),
+    ('3000-4000', 'alone'),
+    ('2000-2100', 'tail'),
+]
+
+
+def labels(rules):
+    return [rule.label for rule in rules]
+
+
+class TestAudit(unittest.TestCase):
+
+    def test_overlapping_pairs(self):
+        pairs = sorted(
+            (first.label, second.label)
+            for first, second in overlapping_pairs(RULES))
+        self.assertEqual(pairs, [
+            ('cidr', 'single'),
+            ('cidr', 'tail'),
+            ('http', 'http-again'),
+            ('wide', 'cidr'),
+            ('wide', 'single'),
+            ('wide', 'tail'),
+        ])
+        self.assertEqual(list(overlapping_pairs([])), [])
+
+    def test_overlapping_groups(self):
+        self.assertEqual(
+            [labels(group) for group in overlapping_groups(RULES)],
+            [['http', 'http-again'], ['wide', 'cidr', 'single', 'tail']])
+        # Adjacent ranges do not overlap.
+        self.assertEqual(
+            list(overlapping_groups([('1-10', 'a'), ('11-20', 'b')])), [])
+        # Groups are chained by overlaps, even if their ends are disjoint.
+        self.assertEqual(
+            [labels(group) for group in overlapping_groups(
+                [('1-10', 'a'), ('5-15', 'b'), ('15-20', 'c'),
+                 ('21-30', 'd')])],
+            [['a', 'b', 'c']])
+        self.assertEqual(
+            [labels(group) for group in overlapping_groups(
+                [('1-100', 'a'), ('5-6', 'b'), ('50-60', 'c')])],
+            [['a', 'b', 'c']])
+
+    def test_duplicates(self):
+        groups = list(duplicates(RULES + [('1000-2000', 'wide-again')]))
+        self.assertEqual(
+            [labels(group) for group in groups],
+            [['http', 'http-again'], ['wide', 'wide-again']])
+        self.assertEqual(groups[0][0], Rule(1, PortRange('80'), 'http'))
+        self.assertEqual(list(duplicates([('80', 'a'), ('81', 'b')])), [])
+        self.assertEqual(
+            [labels(group) for group in duplicates([('80', 'a'), (80, 'b')])],
+            [['a', 'b']])
+
+    def test_shadowed_rules(self):
+        self.assertEqual(
+            sorted((rule.label, shadowing.label)
+                   for rule, shadowing in shadowed_rules(RULES)),
+            [('http-again', 'http'), ('single', 'cidr')])
+        # Only rules of higher priority can shadow others.
+        self.assertEqual(
+            list(shadowed_rules([('1500', 'single'), ('1-65535', 'all')])),
+            [])
+        # Best shadowing rule is the one extending the furthest.
+        self.assertEqual(
+            [(rule.label, shadowing.label) for rule, shadowing in
+             shadowed_rules([('1-100', 'b'), ('1-10', 'a'), ('5', 'c')])],
+            [('a', 'b'), ('c', 'b')])
+
+    def test_strict_mode(self):
+        self.assertRaises(
+            ValueError, list, overlapping_pairs([('90-80', 'a')], True))
+
+    def test_brute_force_equivalence(self):
+        rand = random.Random(42)
+        rules = []
+        for index in range(300):
+            port_from = rand.randint(1, 3000)
+            rules.append(
+                (PortRange([port_from, port_from + rand.randint(0, 100)]),
+                 index))
+
+        def overlap(first, second):
+            return first[0].overlaps(second[0])
+
+        def covers(first, second):
+            return second[0] in first[0]
+
+        expected_pairs = set(
+            frozenset([i, j]) for i in range(len(rules))
+            for j in range(i + 1, len(rules)) if overlap(rules[i], rules[j]))
+        self.assertEqual(
+            set(frozenset([first.index, second.index])
+                for first, second in overlapping_pairs(rules)),
+            expected_pairs)
+
+        expected_shadowed = set(
+            j for j in range(len(rules))
+            if any(covers(rules[i], rules[j]) for i in range(j)))
+        shadowed = list(shadowed_rules(rules))
+        self.assertEqual(
+            set(rule.index for rule, _ in shadowed), expected_shadowed)
+        for rule, shadowing in shadowed:
+            self.assertLess(shadowing.index, rule.index)
+            self.assertIn(rule.port_range, shadowing.port_range)
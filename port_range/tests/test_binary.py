@@ -0,0 +1,154 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (c) 2014-2016 Scaleway and Contributors. All Rights Reserved.
+#                         Kevin Deldycke <kdeldycke@scaleway.com>
+#
+# Licensed under the BSD 2-Clause License (the "License"); you may not use this
+# file except in compliance with the License. You may obtain a copy of the
+# License at https://opensource.org/licenses/BSD-2-Clause
+
+from __future__ import (
+    absolute_import,
+    division,
+    print_function,
+    unicode_literals
+)
+
+import io
+import mmap
+import os
+import tempfile
+import unittest
+
+from port_range import PortRange
+from port_range.binary import PackedRanges, dump, dumps, load
+
+SPECS = ['80', '4242-42', '1024/6', '65535', '1-65535']
+
+
+class TestBinary(unittest.TestCase):
+
+    def test_round_trip(self):
+        data = dumps(SPECS)
+        # Header plus two 16-bit bounds per range.
+        self.assertEqual(len(data), 12 + 4 * len(SPECS))
+        self.assertEqual(data[:4], b'PRNG')
+
+        packed = load(data)
+        self.assertEqual(len(packed), 5)
+        self.assertEqual(list(packed), [PortRange(spec) for spec in SPECS])
+        self.assertEqual(
+            list(packed.iter_bounds()),
+            [(80, 80), (42, 4242), (1024, 2047), (65535, 65535), (1, 65535)])
+        self.assertEqual(len(load(dumps([]))), 0)
+
+    def test_access(self):
+        packed = load(memoryview(dumps(SPECS)), strict=True)
+        self.assertEqual(packed[0], PortRange('80'))
+        self.assertEqual(packed[-1], PortRange('1-65535'))
+        self.assertTrue(packed[2].strict)
+        self.assertTrue(packed[2].is_cidr)
+        self.assertEqual(packed[1:3], [PortRange('42-4242'),
+                                       PortRange('1024/6')])
+        self.assertEqual(packed[::-2], [PortRange('1-65535'),
+                                        PortRange('1024/6'),
+                                        PortRange('80')])
+        self.assertRaises(IndexError, lambda: packed[5])
+        self.assertRaises(IndexError, lambda: packed[-6])
+
+    def test_files(self):
+        handle, path = tempfile.mkstemp()
+        os.close(handle)
+        try:
+            with open(path, 'wb') as fp:
+                dump(SPECS, fp)
+            with open(path, 'rb') as fp:
+                with load(fp) as packed:
+                    self.assertIsInstance(packed._buffer, mmap.mmap)
+                    self.assertEqual(packed[2], PortRange('1024/6'))
+                self.assertTrue(packed._buffer.closed)
+
+            # Buffers mapped by callers are left open.
+            with open(path, 'rb') as fp:
+                mapping = mmap.mmap(fp.fileno(), 0, access=mmap.ACCESS_READ)
+                with PackedRanges(mapping) as packed:
+                    self.assertEqual(len(packed), 5)
+                self.assertFalse(mapping.closed)
+                mapping.close()
+
+            # Both mapped and read files honour the current position.
+            with open(path, 'wb') as fp:
+                fp.write(b'JUNK')
+                dump(['22', '80-90'], fp)
+            with open(path, 'rb') as fp:
+                fp.seek(4)
+                with load(fp) as packed:
+                    self.assertIsInstance(packed._buffer, mmap.mmap)
+                    self.assertEqual(
+                        list(packed.iter_bounds()), [(22, 22), (80, 90)])
+                    self.assertEqual(fp.read(), b'')
+            stream = io.BytesIO(b'JUNK' + dumps(['22', '80-90']))
+            stream.seek(4)
+            self.assertEqual(
+                list(load(stream).iter_bounds()), [(22, 22), (80, 90)])
+            self.assertEqual(stream.read(), b'')
+
+            with open(path, 'wb') as fp:
+                fp.write(b'JUNK' * 10)
+            with open(path, 'rb') as fp:
+                self.assertRaises(ValueError, load, fp)
+
+            # Empty files can't be mapped.
+            with open(path, 'wb') as fp:
+                pass
+            with open(path, 'rb') as fp:
+                self.assertRaises(ValueError, load, fp)
+        finally:
+            os.remove(path)
+
+        # In-memory file objects are read.
+        self.assertEqual(
+            list(load(io.BytesIO(dumps(SPECS))).iter_bounds())[0], (80, 80))
+
+    def test_invalid_data(self):
+        data = dumps(SPECS)
+        self.assertRaises(ValueError, load, data[:8])
+        self.assertRaises(ValueError, load, b'JUNK' + data[4:])
+        self.assertRaises(ValueError, load, data[:4] + b'\x02' + data[5:])
+        self.assertRaises(ValueError, load, data[:6] + b'\x03' + data[7:])
+        self.assertRaises(ValueError, load, data[:-1])
+        self.assertRaises(ValueError, dumps, ['90-80'], True)
+
+    def test_wide_ports(self):
+        class WidePortRange(PortRange):
+            port_length = 32
+
+        data = dumps([WidePortRange([1, 2])], range_class=WidePortRange)
+        self.assertEqual(len(data), 12 + 8)
+        self.assertEqual(
+            load(data, range_class=WidePortRange)[0].bounds, (1, 2))
+        # Wide ranges fitting 16 bits are dumped with the default class.
+        self.assertEqual(
+            dumps([WidePortRange([1, 2])]), dumps([PortRange([1, 2])]))
+        with self.assertRaises(ValueError) as context:
+            dumps([WidePortRange('100000-200000')])
+        self.assertIn('PortRange port space', str(context.exception))
+        # Odd bounds of non-strict mode can't be serialized either.
+        self.assertRaises(ValueError, dumps, [(-5, -3)])
+
+        class HugePortRange(PortRange):
+            port_length = 64
+
+        data = dumps(
+            [HugePortRange([1, (1 << 64) - 1])], range_class=HugePortRange)
+        self.assertEqual(len(data), 12 + 16)
+        self.assertEqual(
+            load(data, range_class=HugePortRange)[0].bounds,
+            (1, (1 << 64) - 1))
+
+        class TooWidePortRange(PortRange):
+            port_length = 65
+
+        self.assertRaises(
+            ValueError, dumps, [TooWidePortRange(1)],
+            range_class=TooWidePortRange)
@@ -0,0 +1,161 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (c) 2014-2016 Scaleway and Contributors. All Rights Reserved.
+#                         Kevin Deldycke <kdeldycke@scaleway.com>
+#
+# Licensed under the BSD 2-Clause License (the "License"); you may not use this
+# file except in compliance with the License. You may obtain a copy of the
+# License at https://opensource.org/licenses/BSD-2-Clause
+
+from __future__ import (
+    absolute_import,
+    division,
+    print_function,
+    unicode_literals
+)
+
+import random
+import unittest
+
+from port_range import PortRange
+from port_range.bitmap import PortBitmap
+from port_range.sets import PortRangeSet
+
+
+class TestPortBitmap(unittest.TestCase):
+
+    def test_conversion(self):
+        bitmap = PortBitmap(['80', '1000-2000', '1500-2500', '81', '79'])
+        self.assertEqual(list(bitmap.iter_bounds()), [(79, 81), (1000, 2500)])
+        self.assertEqual(
+            bitmap.to_ranges(), [PortRange('79-81'), PortRange('1000-2500')])
+        self.assertEqual(bitmap.popcount(), 3 + 1501)
+        self.assertEqual(str(bitmap), '79-81,1000-2500')
+        self.assertEqual(repr(bitmap), "PortBitmap(['79-81', '1000-2500'])")
+        self.assertEqual(int(bitmap), PortBitmap.from_int(int(bitmap))._bits)
+
+        # Upper bound of the port space.
+        bitmap = PortBitmap(['65530-65535', '1'])
+        self.assertEqual(list(bitmap.iter_bounds()), [(1, 1), (65530, 65535)])
+
+        # Round-trip with sets of ranges.
+        port_set = PortRangeSet(['1-10', '12', '100-200', '65535'])
+        self.assertEqual(PortRangeSet(PortBitmap(port_set)), port_set)
+
+        # Empty bitmaps.
+        self.assertFalse(PortBitmap())
+        self.assertEqual(PortBitmap().to_ranges(), [])
+        self.assertEqual(PortBitmap().popcount(), 0)
+
+        # Ranges keep the strict flag of the bitmap.
+        self.assertEqual(
+            [port_range.strict for port_range in PortBitmap(['80'], True)],
+            [True])
+
+    def test_validation(self):
+        self.assertRaises(ValueError, PortBitmap, ['90-80'], True)
+        self.assertRaises(ValueError, PortBitmap.from_int, -1)
+        self.assertRaises(ValueError, PortBitmap.from_int, 1 << 65536)
+        # Port 0 is below the port space.
+        self.assertRaises(ValueError, PortBitmap.from_int, 1)
+        self.assertRaises(ValueError, PortBitmap.from_int, 0b111)
+        self.assertEqual(str(PortBitmap.from_int(0b10)), '1')
+
+    def test_membership(self):
+        bitmap = PortBitmap(['80-90', '443'])
+        self.assertIn(80, bitmap)
+        self.assertIn(443, bitmap)
+        self.assertNotIn(79, bitmap)
+        self.assertNotIn(65535, bitmap)
+        # Ports out of the port space are never members.
+        full = ~PortBitmap()
+        self.assertIn(1, full)
+        self.assertNotIn(0, full)
+        self.assertNotIn(-1, full)
+        self.assertNotIn(65536, full)
+        self.assertIn('82-88', bitmap)
+        self.assertIn(PortRange('443'), bitmap)
+        self.assertNotIn('85-443', bitmap)
+
+    def test_ports(self):
+        bitmap = PortBitmap(['80-82', '443', '1000-1100'])
+        self.assertEqual(
+            list(bitmap.iter_ports())[:5], [80, 81, 82, 443, 1000])
+        self.assertEqual(
+            list(bitmap.iter_ports(reverse=True))[-5:],
+            [1000, 443, 82, 81, 80])
+        self.assertEqual(len(list(bitmap.iter_ports())), bitmap.popcount())
+        self.assertEqual(
+            list(bitmap.iter_chunks(64, aligned=True)),
+            list(PortRangeSet(bitmap).iter_chunks(64, aligned=True)))
+        self.assertRaises(ValueError, bitmap.iter_chunks, 0)
+
+    def test_algebra(self):
+        left = PortBitmap(['1-100', '200-300'])
+        right = PortBitmap(['10-20', '90-210'])
+        self.assertEqual((left | right).to_ranges(), [PortRange('1-300')])
+        self.assertEqual(
+            [str(r) for r in left & right], ['10-20', '90-100', '200-210'])
+        self.assertEqual(
+            [str(r) for r in left - right],
+            ['1-9', '21-89', '211-300'])
+        self.assertEqual(
+            [str(r) for r in left ^ right],
+            ['1-9', '21-89', '101-199', '211-300'])
+        self.assertEqual(
+            [str(r) for r in ~left], ['101-199', '301-65535'])
+        self.assertEqual(left.complement(), ~left)
+        self.assertEqual((~PortBitmap()).to_ranges(), [PortRange('1-65535')])
+
+        self.assertEqual(left.union(['400'], ['500']).popcount(), 203)
+        self.assertEqual(left.intersection(right, ['1-15']).popcount(), 6)
+        self.assertEqual(
+            left.difference(right, ['1-5']).popcount(), 4 + 69 + 90)
+
+    def test_comparison(self):
+        small = PortBitmap(['10-20'])
+        large = PortBitmap(['1-100'])
+        self.assertTrue(small <= large)
+        self.assertTrue(small < large)
+        self.assertTrue(large >= small)
+        self.assertTrue(large > small)
+        self.assertFalse(large < large)
+        self.assertFalse(large > large)
+        self.assertEqual(PortBitmap(['1-5', '6-10']), PortBitmap(['1-10']))
+        self.assertNotEqual(small, large)
+        self.assertNotEqual(small, ['10-20'])
+        self.assertEqual(len(set([small, large, PortBitmap(['10-20'])])), 2)
+
+    def test_operand_types(self):
+        bitmap = PortBitmap(['80'])
+        for operator in ('__or__', '__and__', '__sub__', '__xor__',
+                         '__le__', '__ge__', '__lt__', '__gt__'):
+            self.assertIs(getattr(bitmap, operator)(['80']), NotImplemented)
+
+    def test_single_range_operands(self):
+        bitmap = PortBitmap(['1-100'])
+        self.assertEqual(str(bitmap.union('443')), '1-100,443')
+        self.assertEqual(str(bitmap.union(443)), '1-100,443')
+        self.assertEqual(str(bitmap.difference('50')), '1-49,51-100')
+        self.assertEqual(
+            str(bitmap.intersection(PortRange('90-200'))), '90-100')
+        with self.assertRaises(TypeError):
+            PortBitmap('443')
+
+    def test_set_equivalence(self):
+        rand = random.Random(42)
+
+        def random_ranges():
+            ranges = []
+            for _ in range(300):
+                port_from = rand.randint(1, 65000)
+                ranges.append([port_from, port_from + rand.randint(0, 50)])
+            return ranges
+
+        left, right = random_ranges(), random_ranges()
+        for operator in ('__or__', '__and__', '__sub__', '__xor__'):
+            self.assertEqual(
+                getattr(PortBitmap(left), operator)(PortBitmap(right))
+                .to_ranges(),
+                getattr(PortRangeSet(left), operator)(PortRangeSet(right))
+                .ranges)
@@ -0,0 +1,106 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (c) 2014-2016 Scaleway and Contributors. All Rights Reserved.
+#                         Kevin Deldycke <kdeldycke@scaleway.com>
+#
+# Licensed under the BSD 2-Clause License (the "License"); you may not use this
+# file except in compliance with the License. You may obtain a copy of the
+# License at https://opensource.org/licenses/BSD-2-Clause
+
+from __future__ import (
+    absolute_import,
+    division,
+    print_function,
+    unicode_literals
+)
+
+import threading
+import unittest
+
+from port_range import CacheInfo, PortRange, PortRangeCache, range_cache
+
+
+class TestPortRangeCache(unittest.TestCase):
+
+    def test_sharing(self):
+        cache = PortRangeCache()
+        port = cache.get('443')
+        self.assertIs(cache.get('443'), port)
+        self.assertEqual(port, PortRange('443'))
+        self.assertFalse(port.strict)
+
+        # Strict flag and input types are part of the key.
+        self.assertIsNot(cache.get('443', strict=True), port)
+        self.assertTrue(cache.get('443', strict=True).strict)
+        self.assertIsNot(cache.get(443), port)
+        self.assertIs(cache.get([42, 4242]), cache.get((42, 4242)))
+        self.assertEqual(cache.get([42, 4242]), PortRange('42-4242'))
+        self.assertIs(cache.get(1), cache.get(1))
+        self.assertIsNot(cache.get(1), cache.get(True))
+
+        # Unhashable inputs are not cached.
+        self.assertEqual(cache.get(set([42, 4242])), PortRange('42-4242'))
+        self.assertEqual(len(cache), 6)
+
+    def test_subclasses(self):
+        class CustomRange(PortRange):
+            __slots__ = ()
+
+        cache = PortRangeCache()
+        self.assertIsInstance(cache.get('80', range_class=CustomRange),
+                              CustomRange)
+        self.assertNotIsInstance(cache.get('80'), CustomRange)
+        self.assertIsInstance(CustomRange.cached('80'), CustomRange)
+
+    def test_errors(self):
+        cache = PortRangeCache()
+        self.assertRaises(ValueError, cache.get, 'abc')
+        self.assertRaises(ValueError, cache.get, '4242-42', True)
+        self.assertEqual(len(cache), 0)
+        self.assertEqual(cache.info(), CacheInfo(0, 0, 0, 1024, 0))
+        self.assertRaises(ValueError, PortRangeCache, 0)
+
+    def test_eviction_and_stats(self):
+        cache = PortRangeCache(maxsize=2)
+        cache.get('80')
+        cache.get('443')
+        cache.get('80')
+        # Least recently used entry is 443.
+        cache.get('22')
+        self.assertEqual(cache.info(), CacheInfo(1, 3, 1, 2, 2))
+        cache.get('80')
+        cache.get('443')
+        self.assertEqual(cache.info(), CacheInfo(2, 4, 2, 2, 2))
+
+        # Shrinking takes effect on next insertion.
+        cache.maxsize = 1
+        cache.get('8080')
+        self.assertEqual(cache.info(), CacheInfo(2, 5, 4, 1, 1))
+
+        cache.clear()
+        self.assertEqual(cache.info(), CacheInfo(0, 0, 0, 1, 0))
+
+    def test_default_cache(self):
+        range_cache.clear()
+        self.assertIs(PortRange.cached('1024-65535'),
+                      PortRange.cached('1024-65535'))
+        self.assertEqual(range_cache.info().hits, 1)
+        range_cache.clear()
+
+    def test_thread_safety(self):
+        cache = PortRangeCache(maxsize=50)
+        specs = [str(port) for port in range(1, 101)]
+
+        def worker():
+            for _ in range(20):
+                for spec in specs:
+                    self.assertEqual(cache.get(spec).port_from, int(spec))
+
+        threads = [threading.Thread(target=worker) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        info = cache.info()
+        self.assertEqual(info.hits + info.misses, 8 * 20 * 100)
+        self.assertEqual(info.currsize, 50)
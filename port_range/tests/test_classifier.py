@@ -0,0 +1,105 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (c) 2014-2016 Scaleway and Contributors. All Rights Reserved.
+#                         Kevin Deldycke <kdeldycke@scaleway.com>
+#
+# Licensed under the BSD 2-Clause License (the "License"); you may not use this
+# file except in compliance with the License. You may obtain a copy of the
+# License at https://opensource.org/licenses/BSD-2-Clause
+
+from __future__ import (
+    absolute_import,
+    division,
+    print_function,
+    unicode_literals
+)
+
+import random
+import unittest
+
+from port_range import PortRange
+from port_range.classifier import PortRuleClassifier
+
+
+class TestPortRuleClassifier(unittest.TestCase):
+
+    def test_first_match(self):
+        classifier = PortRuleClassifier([
+            ('tcp', None, '22', 'ssh'),
+            ('tcp', '1024-65535', '80', 'http'),
+            ('tcp', None, '80-443', 'web'),
+            ('udp', '53', None, 'dns-reply'),
+            (None, '1-1023', '1-1023', 'privileged'),
+            ('tcp', None, None, 'tcp-default'),
+        ])
+        self.assertEqual(len(classifier), 6)
+        self.assertEqual(classifier.first('tcp', 40000, 22), 'ssh')
+        self.assertEqual(classifier.first('tcp', 40000, 80), 'http')
+        self.assertEqual(classifier.first('tcp', 80, 80), 'web')
+        self.assertEqual(classifier.first('tcp', 40000, 443), 'web')
+        self.assertEqual(classifier.first('tcp', 40000, 8080), 'tcp-default')
+        # Wildcard protocol rules interleave with protocol-specific ones.
+        self.assertEqual(classifier.first('tcp', 25, 25), 'privileged')
+        self.assertEqual(classifier.first('udp', 53, 4000), 'dns-reply')
+        self.assertEqual(classifier.first('udp', 123, 123), 'privileged')
+        self.assertEqual(classifier.first('sctp', 123, 123), 'privileged')
+        self.assertIsNone(classifier.first('udp', 4000, 53))
+        self.assertEqual(classifier.first('udp', 4000, 53, 'drop'), 'drop')
+
+    def test_empty(self):
+        classifier = PortRuleClassifier()
+        self.assertEqual(len(classifier), 0)
+        self.assertIsNone(classifier.first('tcp', 80, 80))
+        self.assertEqual(classifier.stats()['segments'], 0)
+
+    def test_parsing(self):
+        classifier = PortRuleClassifier(
+            [('tcp', PortRange('1024/6'), (90, 80), 'a')])
+        self.assertEqual(classifier.first('tcp', 2047, 85), 'a')
+        self.assertIsNone(classifier.first('tcp', 1023, 85))
+        self.assertIsNone(classifier.first('tcp', 0, 85))
+        self.assertRaises(
+            ValueError, PortRuleClassifier, [('tcp', '90-80', None, 'a')],
+            True)
+
+    def test_stats(self):
+        classifier = PortRuleClassifier([
+            ('tcp', '1-100', '1-100', 'a'),
+            ('udp', '50-150', None, 'b'),
+            (None, None, '10', 'c'),
+        ])
+        stats = classifier.stats()
+        self.assertEqual(stats['rules'], 3)
+        self.assertEqual(stats['protocols'], 3)
+        self.assertGreater(stats['segments'], 0)
+        self.assertGreater(stats['memory'], 0)
+        self.assertGreaterEqual(stats['build_time'], 0)
+
+    def test_brute_force_equivalence(self):
+        rand = random.Random(42)
+
+        def random_range():
+            if rand.random() < 0.1:
+                return None
+            port_from = rand.randint(1, 2000)
+            return PortRange([port_from, port_from + rand.randint(0, 300)])
+
+        rules = [
+            (rand.choice(['tcp', 'udp', None]), random_range(),
+             random_range(), index)
+            for index in range(400)]
+        classifier = PortRuleClassifier(rules)
+
+        def matches(port_range, port):
+            return port_range is None or port in port_range
+
+        for _ in range(2000):
+            protocol = rand.choice(['tcp', 'udp', 'icmp'])
+            src_port = rand.randint(1, 2400)
+            dst_port = rand.randint(1, 2400)
+            expected = next((
+                payload for rule_protocol, src, dst, payload in rules
+                if rule_protocol in (None, protocol) and
+                matches(src, src_port) and matches(dst, dst_port)), None)
+            self.assertEqual(
+                classifier.first(protocol, src_port, dst_port), expected)
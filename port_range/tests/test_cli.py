@@ -0,0 +1,115 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (c) 2014-2016 Scaleway and Contributors. All Rights Reserved.
+#                         Kevin Deldycke <kdeldycke@scaleway.com>
+#
+# Licensed under the BSD 2-Clause License (the "License"); you may not use this
+# file except in compliance with the License. You may obtain a copy of the
+# License at https://opensource.org/licenses/BSD-2-Clause
+
+from __future__ import (
+    absolute_import,
+    division,
+    print_function,
+    unicode_literals
+)
+
+import io
+import os
+import tempfile
+import unittest
+
+from port_range.cli import main
+
+INPUT = '80\n4242-42\n\n1024/6\n  443  \n1-3\n'
+
+
+class TestCLI(unittest.TestCase):
+
+    def run_cli(self, *argv, **kwargs):
+        stdout = io.StringIO()
+        stderr = io.StringIO()
+        code = main(
+            list(argv), stdin=io.StringIO(kwargs.get('stdin', INPUT)),
+            stdout=stdout, stderr=stderr)
+        return code, stdout.getvalue(), stderr.getvalue()
+
+    def test_normalize(self):
+        self.assertEqual(
+            self.run_cli('normalize'),
+            (0, '80\n42-4242\n1024/6\n443\n1-3\n', ''))
+        code, stdout, stderr = self.run_cli('normalize', '--strict')
+        self.assertEqual(code, 1)
+        self.assertEqual(stdout, '80\n')
+        self.assertEqual(
+            stderr, "<stdin>:2: '4242-42': Invalid reversed port range.\n")
+        self.assertEqual(
+            self.run_cli('normalize', '--strict', '--skip-invalid'),
+            (1, '80\n1024/6\n443\n1-3\n',
+             "<stdin>:2: '4242-42': Invalid reversed port range.\n"))
+
+    def test_error_location(self):
+        # Blank lines still count.
+        self.assertEqual(
+            self.run_cli('validate', stdin='80\n\n90-80\n'),
+            (1, '', "<stdin>:3: '90-80': Invalid reversed port range.\n"))
+
+    def test_cidr(self):
+        code, stdout, _ = self.run_cli('cidr', stdin='1-3\n1000-1023\n')
+        self.assertEqual(code, 0)
+        self.assertEqual(stdout, '1\n2/15\n1000/13\n1008/12\n')
+
+    def test_merge(self):
+        self.assertEqual(
+            self.run_cli('merge', stdin='443\n80-90\n85-100\n444\n65535\n'),
+            (0, '80-100\n443/15\n65535\n', ''))
+        self.assertEqual(
+            self.run_cli('merge', '--cidr', stdin='3\n1-2\n'),
+            (0, '1\n2/15\n', ''))
+        self.assertEqual(self.run_cli('merge', stdin=''), (0, '', ''))
+
+    def test_validate(self):
+        code, stdout, stderr = self.run_cli('validate')
+        self.assertEqual(code, 1)
+        self.assertEqual(stdout, '')
+        self.assertEqual(
+            stderr, "<stdin>:2: '4242-42': Invalid reversed port range.\n")
+        self.assertEqual(self.run_cli('validate', stdin='80\n'), (0, '', ''))
+
+    def test_stats(self):
+        code, stdout, stderr = self.run_cli('stats', '--strict')
+        self.assertEqual(code, 0)
+        self.assertEqual(stderr, '')
+        self.assertEqual(stdout.splitlines(), [
+            'items: 5',
+            'valid: 4',
+            'invalid: 1',
+            'single ports: 2',
+            'CIDR-like ranges: 1',
+            'other ranges: 1',
+            'merged ranges: 4',
+            'ports covered: 1029',
+        ])
+
+    def test_files(self):
+        handle, path = tempfile.mkstemp()
+        with os.fdopen(handle, 'w') as fp:
+            fp.write('80\n\n81-80\n')
+        try:
+            self.assertEqual(
+                self.run_cli('merge', path, '-', stdin='82\n'),
+                (0, '80-82\n', ''))
+            # Line numbers restart in each file, which is reported.
+            self.assertEqual(
+                self.run_cli('validate', '-', path, stdin='80\n'),
+                (1, '', "{}:3: '81-80': Invalid reversed port range.\n".format(
+                    path)))
+            code, _, stderr = self.run_cli('merge', path + '.missing')
+            self.assertEqual(code, 1)
+            self.assertIn('No such file', stderr)
+        finally:
+            os.remove(path)
+
+    def test_usage(self):
+        with self.assertRaises(SystemExit):
+            main([], stderr=io.StringIO())
@@ -0,0 +1,99 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (c) 2014-2016 Scaleway and Contributors. All Rights Reserved.
+#                         Kevin Deldycke <kdeldycke@scaleway.com>
+#
+# Licensed under the BSD 2-Clause License (the "License"); you may not use this
+# file except in compliance with the License. You may obtain a copy of the
+# License at https://opensource.org/licenses/BSD-2-Clause
+
+from __future__ import (
+    absolute_import,
+    division,
+    print_function,
+    unicode_literals
+)
+
+import random
+import unittest
+
+from port_range import PortRange
+from port_range.coverage import PortCoverage, numpy
+
+
+class TestPortCoverage(unittest.TestCase):
+
+    use_numpy = False
+
+    def coverage(self, ranges, **kwargs):
+        return PortCoverage(ranges, use_numpy=self.use_numpy, **kwargs)
+
+    def test_counts(self):
+        coverage = self.coverage(['80-90', PortRange('85-100'), 85, '1-65535'])
+        self.assertEqual(coverage.use_numpy, self.use_numpy)
+        counts = coverage.counts()
+        self.assertEqual(len(counts), 65536)
+        self.assertEqual(counts[0], 0)
+        self.assertEqual(coverage[1], 1)
+        self.assertEqual(coverage[79], 1)
+        self.assertEqual(coverage[80], 2)
+        self.assertEqual(coverage[85], 4)
+        self.assertEqual(coverage[91], 2)
+        self.assertEqual(coverage[65535], 1)
+        self.assertRaises(IndexError, coverage.__getitem__, 0)
+        self.assertRaises(IndexError, coverage.__getitem__, 65536)
+        self.assertRaises(
+            ValueError, self.coverage, ['90-80'], strict=True)
+
+    def test_runs(self):
+        coverage = self.coverage(['80-90', '85-100', '443', '65535'])
+        self.assertEqual(
+            [(str(port_range), count)
+             for port_range, count in coverage.runs()],
+            [('80-84', 1), ('85-90', 2), ('91-100', 1), ('443', 1),
+             ('65535', 1)])
+        runs = list(coverage.runs(uncovered=True))
+        self.assertEqual(
+            [(str(port_range), count) for port_range, count in runs[:3]],
+            [('1-79', 0), ('80-84', 1), ('85-90', 2)])
+        self.assertEqual(
+            sum(len(port_range) for port_range, _ in runs), 65535)
+        self.assertEqual(list(self.coverage([]).runs()), [])
+
+    def test_top(self):
+        coverage = self.coverage(['80-90', '85-100', '88', '443'])
+        self.assertEqual(
+            coverage.top(4), [(88, 3), (85, 2), (86, 2), (87, 2)])
+        self.assertEqual(len(coverage.top(100)), 22)
+        self.assertEqual(self.coverage([]).top(3), [])
+
+    def test_brute_force(self):
+        rand = random.Random(42)
+        ranges = []
+        for _ in range(200):
+            port_from = rand.randint(1, 65535)
+            ranges.append(PortRange(
+                [port_from, min(65535, port_from + rand.randint(0, 5000))]))
+        expected = [0] * 65536
+        for port_range in ranges:
+            for port in port_range:
+                expected[port] += 1
+        coverage = self.coverage(ranges)
+        self.assertEqual(list(coverage.counts()), expected)
+        for port_range, count in coverage.runs():
+            self.assertEqual(
+                set(expected[port_range.port_from:port_range.port_to + 1]),
+                set([count]))
+        top = coverage.top(10)
+        self.assertEqual(top, sorted(
+            ((port, count) for port, count in enumerate(expected)),
+            key=lambda item: (-item[1], item[0]))[:10])
+
+
+@unittest.skipIf(numpy is None, "NumPy is not installed.")
+class TestPortCoverageNumpy(TestPortCoverage):
+
+    use_numpy = True
+
+    def test_default(self):
+        self.assertTrue(PortCoverage(['80']).use_numpy)
@@ -0,0 +1,81 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (c) 2014-2016 Scaleway and Contributors. All Rights Reserved.
+#                         Kevin Deldycke <kdeldycke@scaleway.com>
+#
+# Licensed under the BSD 2-Clause License (the "License"); you may not use this
+# file except in compliance with the License. You may obtain a copy of the
+# License at https://opensource.org/licenses/BSD-2-Clause
+
+from __future__ import (
+    absolute_import,
+    division,
+    print_function,
+    unicode_literals
+)
+
+import random
+import unittest
+
+from port_range import PortRange
+from port_range.index import PortRangeIndex
+
+
+class TestPortRangeIndex(unittest.TestCase):
+
+    def test_lookup(self):
+        index = PortRangeIndex([
+            ('1000-2000', 'wide'),
+            (PortRange('1024/6'), 'cidr'),
+            ('80', 'http'),
+            ('443', 'https'),
+            ('1500', 'single'),
+        ])
+        self.assertEqual(len(index), 5)
+        self.assertEqual(index.match(80), ('http',))
+        self.assertEqual(index.match(81), ())
+        self.assertEqual(index.match(1), ())
+        self.assertEqual(index.match(65535), ())
+        self.assertEqual(index.match(1000), ('wide',))
+        self.assertEqual(index.match(1500), ('wide', 'cidr', 'single'))
+        self.assertEqual(index.match(2000), ('wide', 'cidr'))
+        self.assertEqual(index.match(2047), ('cidr',))
+        self.assertEqual(index.match(2048), ())
+
+        self.assertEqual(index.first(1500), 'wide')
+        self.assertEqual(index.first(2047), 'cidr')
+        self.assertEqual(index.first(81), None)
+        self.assertEqual(index.first(81, default='deny'), 'deny')
+        self.assertEqual(index.first(1, default='deny'), 'deny')
+
+    def test_empty(self):
+        for index in (PortRangeIndex(), PortRangeIndex([])):
+            self.assertEqual(len(index), 0)
+            self.assertEqual(index.match(80), ())
+            self.assertEqual(index.first(80), None)
+
+    def test_falsy_payloads(self):
+        index = PortRangeIndex([('80', None), ('80-90', 0)])
+        self.assertEqual(index.match(80), (None, 0))
+        self.assertEqual(index.first(80, default='deny'), None)
+        self.assertEqual(index.first(85, default='deny'), 0)
+
+    def test_strict_mode(self):
+        self.assertRaises(ValueError, PortRangeIndex, [('90-80', 1)], True)
+
+    def test_linear_scan_equivalence(self):
+        rand = random.Random(42)
+        rules = []
+        for rule_id in range(200):
+            port_from = rand.randint(1, 2000)
+            rules.append(
+                (PortRange([port_from, port_from + rand.randint(0, 300)]),
+                 rule_id))
+        index = PortRangeIndex(rules)
+        for port in range(1, 2400):
+            expected = tuple(
+                rule_id for port_range, rule_id in rules
+                if port_range.port_from <= port <= port_range.port_to)
+            self.assertEqual(index.match(port), expected)
+            self.assertEqual(
+                index.first(port), expected[0] if expected else None)
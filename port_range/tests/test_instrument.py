@@ -0,0 +1,110 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (c) 2014-2016 Scaleway and Contributors. All Rights Reserved.
+#                         Kevin Deldycke <kdeldycke@scaleway.com>
+#
+# Licensed under the BSD 2-Clause License (the "License"); you may not use this
+# file except in compliance with the License. You may obtain a copy of the
+# License at https://opensource.org/licenses/BSD-2-Clause
+
+from __future__ import (
+    absolute_import,
+    division,
+    print_function,
+    unicode_literals
+)
+
+import unittest
+
+from port_range import PortRange
+from port_range.index import PortRangeIndex
+from port_range.instrument import Instrumentation
+
+
+class TestInstrumentation(unittest.TestCase):
+
+    def test_disabled(self):
+        parse = PortRange.__dict__['parse']
+        metrics = Instrumentation()
+        self.assertFalse(metrics.enabled)
+        PortRange('80')
+        self.assertIs(PortRange.__dict__['parse'], parse)
+        self.assertEqual(metrics.snapshot()['parse.calls'], 0)
+        # Disabling twice is harmless.
+        metrics.disable()
+
+    def test_parse(self):
+        parse = PortRange.__dict__['parse']
+        with Instrumentation() as metrics:
+            self.assertTrue(metrics.enabled)
+            PortRange(80)
+            PortRange('80-90')
+            PortRange('90-80')
+            PortRange('1024/6')
+            PortRange([0, 70000])
+            PortRange(PortRange('22'))
+            self.assertRaises(ValueError, PortRange, '90-80', strict=True)
+            self.assertRaises(ValueError, PortRange, 'a')
+            # Enabling again is harmless.
+            metrics.enable()
+        self.assertFalse(metrics.enabled)
+        self.assertIs(PortRange.__dict__['parse'], parse)
+        PortRange('80')
+
+        snapshot = metrics.snapshot()
+        self.assertEqual(snapshot['parse.calls'], 9)
+        self.assertGreater(snapshot['parse.seconds'], 0)
+        self.assertEqual(snapshot['parse.kind.int'], 1)
+        self.assertEqual(snapshot['parse.kind.range_string'], 5)
+        self.assertEqual(snapshot['parse.kind.cidr_string'], 1)
+        self.assertEqual(snapshot['parse.kind.iterable'], 1)
+        self.assertEqual(snapshot['parse.kind.port_range'], 1)
+        self.assertEqual(snapshot['cidr_to_range.calls'], 1)
+        self.assertLess(
+            snapshot['cidr_to_range.seconds'], snapshot['parse.seconds'])
+        self.assertEqual(snapshot['parse.rejected'], 2)
+        self.assertEqual(snapshot['normalize.sorted'], 1)
+        self.assertEqual(snapshot['normalize.clamped'], 1)
+
+        metrics.reset()
+        self.assertEqual(metrics.snapshot()['parse.calls'], 0)
+
+    def test_conversion_and_matching(self):
+        index = PortRangeIndex([('80-90', 'http'), ('22', 'ssh')])
+        port_range = PortRange('1-3')
+        cidr_string = PortRange.__dict__['cidr_string']
+        with Instrumentation() as metrics:
+            str(port_range)
+            str(PortRange('1024/6'))
+            port_range.to_cidrs()
+            self.assertIn(2, port_range)
+            self.assertEqual(index.first(85), 'http')
+            self.assertEqual(list(index.match(22)), ['ssh'])
+        snapshot = metrics.snapshot()
+        self.assertIs(PortRange.__dict__['cidr_string'], cidr_string)
+        self.assertEqual(snapshot['format.calls'], 2)
+        # Non CIDR-like ranges try the CIDR notation first.
+        self.assertEqual(snapshot['cidr_string.calls'], 2)
+        self.assertEqual(snapshot['range_string.calls'], 1)
+        self.assertEqual(snapshot['to_cidrs.calls'], 1)
+        self.assertEqual(snapshot['contains.calls'], 1)
+        self.assertEqual(snapshot['first.calls'], 1)
+        self.assertEqual(snapshot['match.calls'], 1)
+        # Blocks of to_cidrs() are built from their bounds, without parsing.
+        self.assertEqual(snapshot['parse.calls'], 1)
+        self.assertEqual(snapshot['parse.kind.iterable'], 0)
+
+    def test_subclass(self):
+        class SubPortRange(PortRange):
+            pass
+
+        class SubInstrumentation(Instrumentation):
+            range_class = SubPortRange
+
+        metrics = SubInstrumentation()
+        with metrics:
+            self.assertRaises(RuntimeError, Instrumentation().enable)
+            SubPortRange('80')
+            PortRange('80')
+        self.assertNotIn('parse', SubPortRange.__dict__)
+        self.assertEqual(metrics.snapshot()['parse.calls'], 1)
@@ -0,0 +1,121 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (c) 2014-2016 Scaleway and Contributors. All Rights Reserved.
+#                         Kevin Deldycke <kdeldycke@scaleway.com>
+#
+# Licensed under the BSD 2-Clause License (the "License"); you may not use this
+# file except in compliance with the License. You may obtain a copy of the
+# License at https://opensource.org/licenses/BSD-2-Clause
+
+from __future__ import (
+    absolute_import,
+    division,
+    print_function,
+    unicode_literals
+)
+
+import random
+import unittest
+
+from port_range import PortRange
+from port_range.packer import pack_rules
+
+
+def covered(entries):
+    """ Set of all ports covered by packed entries. """
+    return set(port for entry in entries for port in entry)
+
+
+class TestPackRules(unittest.TestCase):
+
+    def test_ranges(self):
+        packed = pack_rules(
+            ['22', '80-90', PortRange('85-100'), '101', '443', '8080'],
+            max_entries=2)
+        self.assertEqual(
+            packed.rules, [['22', '80-101'], ['443', '8080']])
+        self.assertEqual(
+            [str(entry) for entry in packed.entries],
+            ['22', '80-101', '443', '8080'])
+        self.assertEqual(packed.input_count, 6)
+        self.assertEqual(packed.extra_ports, 0)
+        self.assertEqual(packed.compression_ratio, 3)
+        self.assertGreaterEqual(packed.compile_time, 0)
+
+    def test_empty(self):
+        packed = pack_rules([])
+        self.assertEqual(packed.rules, [])
+        self.assertEqual(packed.compression_ratio, 1)
+
+    def test_range_cost(self):
+        packed = pack_rules(
+            ['1', '3', '5', '10-11', '20-21', '30-31', '40-41'],
+            max_entries=5, range_cost=2)
+        # Two ranges per rule, with a single port in the remaining room.
+        self.assertEqual(packed.rules, [
+            ['1', '10-11', '20-21'], ['3', '30-31', '40-41'], ['5']])
+        self.assertRaises(ValueError, pack_rules, ['1'], 1, range_cost=2)
+        self.assertRaises(ValueError, pack_rules, ['1'], range_cost=0)
+
+    def test_overcoverage(self):
+        ranges = ['10', '12', '20', '40', '41-50']
+        self.assertEqual(
+            pack_rules(ranges, overcoverage=1).rules,
+            [['10-12', '20', '40-50']])
+        packed = pack_rules(ranges, overcoverage=10)
+        self.assertEqual(packed.rules, [['10-20', '40-50']])
+        self.assertEqual(packed.extra_ports, 8)
+        self.assertEqual(
+            pack_rules(ranges, overcoverage=100).rules, [['10-50']])
+        # Merging two single ports into a range saves nothing.
+        self.assertEqual(
+            pack_rules(['10', '12'], range_cost=2, overcoverage=10).rules,
+            [['10', '12']])
+        self.assertEqual(
+            pack_rules(
+                ['10', '12', '14-15'], range_cost=2, overcoverage=10).rules,
+            [['10-15']])
+
+    def test_masks(self):
+        packed = pack_rules(['1-3', '1000-1023'], masks=True, max_entries=3)
+        self.assertEqual(
+            packed.rules, [['1/16', '2/15', '1000/13'], ['1008/12']])
+        # Adjacent ranges merge into a single mask.
+        packed = pack_rules(
+            ['992-999', '1000-1023'], masks=True)
+        self.assertEqual(packed.rules, [['992/11']])
+        packed = pack_rules(
+            ['990-999', '1001-1023'], masks=True, overcoverage=1)
+        self.assertEqual(packed.extra_ports, 1)
+        self.assertEqual(
+            packed.rules, [['990/15', '992/11']])
+
+    def test_separators(self):
+        class IptablesRange(PortRange):
+            RANGE_SEP = ':'
+
+        self.assertEqual(
+            pack_rules(['80:90', '22'], range_class=IptablesRange).rules,
+            [['22', '80:90']])
+        self.assertRaises(
+            ValueError, pack_rules, ['90-80'], strict=True)
+
+    def test_coverage(self):
+        rand = random.Random(42)
+        ranges = []
+        for _ in range(300):
+            port_from = rand.randint(1, 60000)
+            ranges.append(PortRange(
+                [port_from, port_from + rand.randint(0, 50)]))
+        expected = covered(ranges)
+        for masks in (False, True):
+            for range_cost in (1, 2):
+                packed = pack_rules(
+                    ranges, max_entries=15, masks=masks,
+                    range_cost=range_cost, overcoverage=2000)
+                ports = covered(packed.entries)
+                self.assertTrue(expected <= ports)
+                self.assertEqual(len(ports - expected), packed.extra_ports)
+                self.assertLessEqual(packed.extra_ports, 2000)
+                self.assertTrue(all(
+                    len(rule) <= 15 for rule in packed.rules))
@@ -0,0 +1,95 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (c) 2014-2016 Scaleway and Contributors. All Rights Reserved.
+#                         Kevin Deldycke <kdeldycke@scaleway.com>
+#
+# Licensed under the BSD 2-Clause License (the "License"); you may not use this
+# file except in compliance with the License. You may obtain a copy of the
+# License at https://opensource.org/licenses/BSD-2-Clause
+
+from __future__ import (
+    absolute_import,
+    division,
+    print_function,
+    unicode_literals
+)
+
+import random
+import unittest
+
+from port_range import ParseError, PortRange
+from port_range.parallel import normalize_parallel
+from port_range.sets import PortRangeSet
+
+try:
+    from concurrent.futures import ThreadPoolExecutor
+except ImportError:  # pragma: no cover
+    ThreadPoolExecutor = None
+
+
+def random_specs(count, seed=42):
+    rand = random.Random(seed)
+    specs = []
+    for _ in range(count):
+        port = rand.randint(1, 60000)
+        kind = rand.random()
+        if kind < 0.4:
+            specs.append(str(port))
+        elif kind < 0.7:
+            specs.append('{}-{}'.format(port, port + rand.randint(0, 50)))
+        elif kind < 0.9:
+            specs.append('{}/{}'.format(port, rand.randint(10, 16)))
+        else:
+            specs.append((port, port - rand.randint(0, 20)))
+    return specs
+
+
+class WidePortRange(PortRange):
+    port_length = 32
+
+
+@unittest.skipIf(
+    ThreadPoolExecutor is None, "Python 2 requires the futures backport.")
+class TestNormalizeParallel(unittest.TestCase):
+
+    def test_serial_equivalence(self):
+        specs = random_specs(5000)
+        expected = PortRangeSet(specs)
+        self.assertEqual(
+            normalize_parallel(specs, workers=2, shard_size=700), expected)
+        self.assertEqual(
+            normalize_parallel(iter(specs), workers=1, shard_size=700),
+            expected)
+        with ThreadPoolExecutor(max_workers=3) as executor:
+            self.assertEqual(
+                normalize_parallel(
+                    specs, shard_size=100, executor=executor),
+                expected)
+        self.assertEqual(normalize_parallel([]), PortRangeSet())
+
+    def test_strict_mode(self):
+        specs = ['80', '443', '1000-2000'] * 10 + ['90-80']
+        self.assertTrue(
+            normalize_parallel(specs[:-1], strict=True, workers=1).strict)
+        with self.assertRaises(ParseError) as context:
+            normalize_parallel(specs, workers=2, strict=True, shard_size=4)
+        self.assertEqual(context.exception.index, 30)
+        self.assertEqual(context.exception.port_range, '90-80')
+        self.assertEqual(
+            str(normalize_parallel(specs, workers=2, shard_size=4)),
+            '80-90,443,1000-2000')
+
+    def test_range_class(self):
+        port_set = normalize_parallel(
+            ['80', '100000-200000'], workers=2, range_class=WidePortRange)
+        self.assertIs(port_set.range_class, WidePortRange)
+        self.assertTrue(all(
+            isinstance(port_range, WidePortRange) for port_range in port_set))
+        self.assertEqual(str(port_set), '80,100000-200000')
+        self.assertIs(
+            normalize_parallel(['80']).range_class, PortRange)
+
+    def test_invalid_arguments(self):
+        self.assertRaises(ValueError, normalize_parallel, ['80'], 0)
+        self.assertRaises(
+            ValueError, normalize_parallel, ['80'], shard_size=0)
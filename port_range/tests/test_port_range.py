@@ -14,9 +14,16 @@ from __future__ import (
     unicode_literals
 )
 
+import copy
+import pickle
 import unittest
 
-from port_range import PortRange
+from port_range import (
+    ParseError,
+    PortRange,
+    collapse_ranges,
+    summarize_range
+)
 
 
 class TestPortRange(unittest.TestCase):
@@ -203,3 +210,344 @@ class TestPortRange(unittest.TestCase):
     def test_computation(self):
         self.assertEqual(PortRange('2/3').bounds, (2, 8193))
         self.assertEqual(PortRange('7/3').bounds, (7, 8198))
+
+    def test_immutability(self):
+        port = PortRange('1027/15')
+        self.assertFalse(hasattr(port, '__dict__'))
+        with self.assertRaises(AttributeError):
+            port.port_from = 42
+        with self.assertRaises(AttributeError):
+            port.strict = True
+        with self.assertRaises(AttributeError):
+            del port.port_to
+        self.assertEqual(port.bounds, (1027, 1028))
+
+    def test_pickling(self):
+        for port in (PortRange('1027/15'), PortRange('42-4242', strict=True)):
+            for protocol in range(pickle.HIGHEST_PROTOCOL + 1):
+                clone = pickle.loads(pickle.dumps(port, protocol))
+                self.assertEqual(clone, port)
+                self.assertEqual(clone.strict, port.strict)
+            self.assertEqual(copy.copy(port), port)
+            self.assertEqual(copy.deepcopy(port), port)
+
+    def test_derived_properties(self):
+        # Compare bit-level properties against their plain definitions.
+        for port_from in (1, 2, 3, 255, 256, 1027, 32768, 65535):
+            for port_to in (port_from, port_from + 1, port_from + 255,
+                            port_from + 1023, 65535):
+                port = PortRange([port_from, port_to])
+                delta = port.port_to - port.port_from + 1
+                if delta in [2 ** i for i in range(17)]:
+                    self.assertEqual(
+                        port.prefix, 16 - len(bin(delta)) + 3)
+                    self.assertTrue(port.is_cidr)
+                else:
+                    self.assertIsNone(port.prefix)
+                    self.assertFalse(port.is_cidr)
+                highest = 2 ** (len(bin(port_from)) - 3)
+                self.assertEqual(port.offset, port_from - highest)
+
+    def test_power_of_two_helpers(self):
+        powers = set(2 ** i for i in range(65))
+        for value in list(range(0, 2050)) + [
+                2 ** 31 - 1, 2 ** 31, 2 ** 31 + 1, 2 ** 53 + 1, 2 ** 64]:
+            self.assertEqual(PortRange._is_power_of_two(value),
+                             value in powers)
+            self.assertEqual(
+                PortRange._nearest_power_of_two(value),
+                max([0] + [power for power in powers if power <= value]))
+
+    def test_port_length(self):
+        class WidePortRange(PortRange):
+            port_length = 32
+
+        self.assertEqual(WidePortRange.port_max, 2 ** 32 - 1)
+        self.assertEqual(PortRange.port_max, 65535)
+        self.assertFalse(hasattr(PortRange('80'), '__dict__'))
+
+        port = WidePortRange('2147483648/1')
+        self.assertEqual(port.bounds, (2 ** 31, 2 ** 32 - 1))
+        self.assertEqual(port.prefix, 1)
+        self.assertEqual(port.mask, 31)
+        self.assertEqual(str(port), '2147483648/1')
+        self.assertEqual(
+            WidePortRange('2147483648/1', strict=True), port)
+        self.assertEqual(
+            str(WidePortRange('4294967290-4294967295')),
+            '4294967290-4294967295')
+        self.assertEqual(str(WidePortRange('4294967294-4294967295')),
+                         '4294967294/31')
+        self.assertEqual(WidePortRange(2 ** 33).port_from, 2 ** 32 - 1)
+        self.assertRaises(ValueError, WidePortRange, 2 ** 32, True)
+        self.assertRaises(ValueError, WidePortRange, '1/33')
+        self.assertEqual(
+            [str(block) for block in
+             WidePortRange('4294967000-4294967295').to_cidrs()],
+            ['4294967000/29', '4294967008/27', '4294967040/24'])
+
+        # Bounds are exact, even beyond float precision.
+        class HugePortRange(PortRange):
+            port_length = 64
+
+        port = HugePortRange([2 ** 53 + 1, 2 ** 53 + 2])
+        self.assertEqual(port.prefix, 63)
+        self.assertEqual(port.offset, 1)
+        self.assertEqual(HugePortRange('{}/1'.format(2 ** 63)).port_to,
+                         2 ** 64 - 1)
+
+    def test_cidr_decomposition(self):
+        self.assertEqual(
+            [str(block) for block in PortRange('1000-2000').to_cidrs()],
+            ['1000/13', '1008/12', '1024/7', '1536/8', '1792/9', '1920/10',
+             '1984/12', '2000'])
+        self.assertEqual(PortRange('1024/6').to_cidrs(), [PortRange('1024/6')])
+        self.assertEqual(PortRange('80').to_cidrs(), [PortRange('80')])
+        self.assertEqual(len(PortRange('1-65535').to_cidrs()), 16)
+        self.assertTrue(all(
+            block.strict for block in PortRange('10-20', True).to_cidrs()))
+
+        for port_from, port_to in ((1, 1), (3, 17), (1027, 1028),
+                                   (4242, 42424), (32767, 65535)):
+            blocks = list(summarize_range(port_from, port_to))
+            # Blocks are contiguous and cover the whole range.
+            self.assertEqual(blocks[0].port_from, port_from)
+            self.assertEqual(blocks[-1].port_to, port_to)
+            for previous, block in zip(blocks, blocks[1:]):
+                self.assertEqual(previous.port_to + 1, block.port_from)
+            # Blocks are CIDR-like and aligned on their own size.
+            for block in blocks:
+                self.assertTrue(block.is_cidr)
+                self.assertEqual(block.port_from % (2 ** block.mask), 0)
+            # Going back gives the original range.
+            self.assertEqual(
+                list(collapse_ranges(blocks)),
+                [PortRange([port_from, port_to])])
+
+        # Port zero is aligned on the whole port space.
+        self.assertEqual(
+            list(PortRange._aligned_blocks(0, 3)), [(0, 3)])
+        # Bounds are checked before iterating.
+        with self.assertRaises(ValueError):
+            summarize_range(20, 10)
+        # Bounds outside of the port space are rejected, not clamped.
+        with self.assertRaises(ValueError):
+            summarize_range(65530, 70000)
+        with self.assertRaises(ValueError):
+            summarize_range(0, 3)
+        self.assertTrue(all(
+            block.strict for block in summarize_range(10, 20, True)))
+
+        class WidePortRange(PortRange):
+            port_length = 32
+
+        blocks = list(summarize_range(65536, 2 ** 17 - 1, True, WidePortRange))
+        self.assertEqual(blocks, [WidePortRange('65536/16')])
+        self.assertIsInstance(blocks[0], WidePortRange)
+        self.assertTrue(blocks[0].strict)
+        self.assertEqual(
+            WidePortRange('65535-65536').to_cidrs(),
+            [WidePortRange('65535'), WidePortRange('65536')])
+
+    def test_collapse(self):
+        self.assertEqual(
+            list(collapse_ranges(['20-30', '1-10', PortRange('11'), '25-40'])),
+            [PortRange('1-11'), PortRange('20-40')])
+        self.assertEqual(list(collapse_ranges([])), [])
+        self.assertRaises(
+            ValueError, list, collapse_ranges(['4242-42'], strict=True))
+        self.assertTrue(all(
+            port_range.strict
+            for port_range in collapse_ranges(['1-10', '5-20'], True)))
+
+        class WidePortRange(PortRange):
+            port_length = 32
+
+        collapsed = list(collapse_ranges(
+            [WidePortRange('100000-200000'), '150000-300000']))
+        self.assertEqual(collapsed, [WidePortRange('100000-300000')])
+        self.assertIsInstance(collapsed[0], WidePortRange)
+        collapsed = list(collapse_ranges(
+            ['100000-200000'], range_class=WidePortRange))
+        self.assertEqual(collapsed[0].bounds, (100000, 200000))
+
+    def test_parse_many(self):
+        specs = ['80', ' 4242-42 ', '1027/15', 443, (1, 2)]
+        self.assertEqual(
+            list(PortRange.parse_many(specs)),
+            [PortRange(spec) for spec in specs])
+        self.assertEqual(
+            list(PortRange.parse_many(specs, raw=True)),
+            [(80, 80), (42, 4242), (1027, 1028), (443, 443), (1, 2)])
+        self.assertTrue(all(
+            port.strict for port in PortRange.parse_many(['80'], True)))
+
+        # Parsing is lazy.
+        ports = PortRange.parse_many(iter(['80', 'abc']))
+        self.assertEqual(next(ports), PortRange('80'))
+        self.assertRaises(ValueError, next, ports)
+
+    def test_parse_many_errors(self):
+        specs = ['80\n', 'abc\n', '4242-42\n', '1024/17\n', '443\n']
+
+        with self.assertRaises(ParseError) as context:
+            list(PortRange.parse_many(specs, strict=True, start=1))
+        self.assertEqual(context.exception.index, 2)
+        self.assertEqual(context.exception.port_range, 'abc\n')
+        self.assertTrue(str(context.exception).startswith('Item #2 ('))
+        self.assertIsInstance(context.exception, ValueError)
+
+        self.assertEqual(
+            list(PortRange.parse_many(specs, True, 'skip', raw=True)),
+            [(80, 80), (443, 443)])
+
+        errors = []
+        self.assertEqual(
+            list(PortRange.parse_many(
+                specs, True, 'collect', errors=errors, raw=True)),
+            [(80, 80), (443, 443)])
+        self.assertEqual([error.index for error in errors], [1, 2, 3])
+        self.assertEqual(
+            str(errors[1]),
+            "Item #2 ({!r}): Invalid reversed port range.".format(
+                '4242-42\n'))
+        self.assertEqual(
+            str(errors[2]),
+            "Item #3 ({!r}): CIDR-like prefix out of bounds.".format(
+                '1024/17\n'))
+
+        # Errors survive pickling, e.g. to be sent across processes.
+        clone = pickle.loads(pickle.dumps(errors[1]))
+        self.assertEqual(str(clone), str(errors[1]))
+        self.assertEqual(clone.index, 2)
+
+        # Arguments are checked eagerly.
+        self.assertRaises(
+            ValueError, PortRange.parse_many, specs, on_error='ignore')
+        self.assertRaises(
+            ValueError, PortRange.parse_many, specs, on_error='collect')
+
+    def test_equality_with_other_types(self):
+        self.assertNotEqual(PortRange('80'), 80)
+        self.assertNotEqual(PortRange('80'), '80')
+        self.assertNotEqual(PortRange('80'), None)
+        self.assertFalse(PortRange('80') == (80, 80))
+        self.assertTrue(PortRange('80') != (80, 80))
+
+    def test_ordering(self):
+        ports = [PortRange(spec) for spec in (
+            '1000-2000', '80', '1000-1500', '443', '79-81', '1024/6')]
+        self.assertEqual(
+            [port.bounds for port in sorted(ports)],
+            sorted(port.bounds for port in ports))
+        self.assertLess(PortRange('80'), PortRange('81'))
+        self.assertLess(PortRange('80'), PortRange('80-81'))
+        self.assertLessEqual(PortRange('80'), PortRange('80'))
+        self.assertLessEqual(PortRange('80'), PortRange('90'))
+        self.assertLessEqual(PortRange('80-90'), PortRange('80-91'))
+        self.assertGreater(PortRange('81'), PortRange('80-100'))
+        self.assertGreater(PortRange('80-81'), PortRange('80'))
+        self.assertGreaterEqual(PortRange('80'), PortRange('80'))
+        self.assertGreaterEqual(PortRange('90'), PortRange('80-100'))
+        self.assertGreaterEqual(PortRange('80-91'), PortRange('80-90'))
+        self.assertFalse(PortRange('80-91') < PortRange('80-90'))
+        for operator in ('__lt__', '__le__', '__gt__', '__ge__', '__eq__',
+                         '__ne__'):
+            self.assertIs(
+                getattr(PortRange('80'), operator)(80), NotImplemented)
+        with self.assertRaises(TypeError):
+            PortRange('80') < 80
+
+    def test_containment(self):
+        port = PortRange('1000-2000')
+        self.assertIn(1000, port)
+        self.assertIn(2000, port)
+        self.assertNotIn(999, port)
+        self.assertNotIn(2001, port)
+        self.assertIn(PortRange('1024/7'), port)
+        self.assertIn('1000-2000', port)
+        self.assertNotIn('999-1500', port)
+        self.assertNotIn(PortRange('1024/6'), port)
+        self.assertIn((1000, '1500'), port)
+        self.assertIn([1500], port)
+
+        self.assertTrue(PortRange('1024/7').issubrange(port))
+        self.assertTrue(port.issubrange('1000-2000'))
+        self.assertFalse(port.issubrange('1001-2000'))
+
+    def test_containment_of_invalid_items(self):
+        port = PortRange('80')
+        self.assertNotIn(None, port)
+        self.assertNotIn(80.7, port)
+        self.assertNotIn((80.7,), port)
+        self.assertNotIn(object(), port)
+        self.assertNotIn('http', port)
+        self.assertNotIn('90-80-70', port)
+        self.assertNotIn((), port)
+        self.assertNotIn((80, 81, 82), port)
+        self.assertNotIn('70000', PortRange('1-65535', strict=True))
+
+    def test_overlap(self):
+        port = PortRange('1000-2000')
+        self.assertTrue(port.overlaps('2000-3000'))
+        self.assertTrue(port.overlaps('500-1000'))
+        self.assertTrue(port.overlaps(PortRange('1500')))
+        self.assertTrue(port.overlaps('1-65535'))
+        self.assertFalse(port.overlaps('2001-3000'))
+        self.assertFalse(port.overlaps(999))
+
+        self.assertTrue(port.adjacent('2001-3000'))
+        self.assertTrue(port.adjacent(999))
+        self.assertFalse(port.adjacent('2000-3000'))
+        self.assertFalse(port.adjacent('2002'))
+
+        self.assertEqual(
+            port.intersection('1500-2500'), PortRange('1500-2000'))
+        self.assertEqual(port.intersection('1-65535'), port)
+        self.assertEqual(port.intersection(PortRange('1500')).bounds,
+                         (1500, 1500))
+        self.assertIsNone(port.intersection('2001-3000'))
+        self.assertTrue(
+            PortRange('10-20', strict=True).intersection('15-25').strict)
+        self.assertRaises(
+            ValueError, PortRange('10-20', strict=True).intersection, '25-15')
+
+    def test_sequence(self):
+        port = PortRange('1000-1009')
+        self.assertEqual(len(port), 10)
+        self.assertEqual(len(PortRange('1-65535')), 65535)
+        self.assertEqual(list(port), list(range(1000, 1010)))
+        self.assertEqual(list(reversed(port)), list(range(1009, 999, -1)))
+        self.assertEqual(list(PortRange('80')), [80])
+        self.assertEqual(PortRange(port), port)
+        self.assertTrue(PortRange(port, strict=True).strict)
+
+        self.assertEqual(port[0], 1000)
+        self.assertEqual(port[-1], 1009)
+        self.assertRaises(IndexError, lambda: port[10])
+        self.assertRaises(IndexError, lambda: port[-11])
+
+        self.assertEqual(port[2:5], PortRange('1002-1004'))
+        self.assertEqual(port[-3:], PortRange('1007-1009'))
+        self.assertEqual(list(port[::3]), [1000, 1003, 1006, 1009])
+        self.assertEqual(list(port[::-4]), [1009, 1005, 1001])
+        self.assertEqual(list(port[5:2]), [])
+        self.assertTrue(PortRange('10-20', strict=True)[1:2].strict)
+
+    def test_chunks(self):
+        port = PortRange('1000-1100')
+        chunks = list(port.iter_chunks(30))
+        self.assertEqual(
+            [str(chunk) for chunk in chunks],
+            ['1000-1029', '1030-1059', '1060-1089', '1090-1100'])
+        self.assertEqual(
+            list(PortRange('80').iter_chunks(10)), [PortRange('80')])
+
+        chunks = list(port.iter_chunks(32, aligned=True))
+        self.assertEqual(
+            [str(chunk) for chunk in chunks],
+            ['1000-1023', '1024/11', '1056/11', '1088-1100'])
+        self.assertEqual(sum(len(chunk) for chunk in chunks), len(port))
+
+        self.assertRaises(ValueError, port.iter_chunks, 0)
+        self.assertRaises(ValueError, port.iter_chunks, 30, True)
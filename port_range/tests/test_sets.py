@@ -0,0 +1,215 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (c) 2014-2016 Scaleway and Contributors. All Rights Reserved.
+#                         Kevin Deldycke <kdeldycke@scaleway.com>
+#
+# Licensed under the BSD 2-Clause License (the "License"); you may not use this
+# file except in compliance with the License. You may obtain a copy of the
+# License at https://opensource.org/licenses/BSD-2-Clause
+
+from __future__ import (
+    absolute_import,
+    division,
+    print_function,
+    unicode_literals
+)
+
+import unittest
+
+from port_range import PortRange
+from port_range.sets import PortRangeSet
+
+
+class TestPortRangeSet(unittest.TestCase):
+
+    def test_normalization(self):
+        port_set = PortRangeSet(['80', '1000-2000', '1500-2500', '81', '79'])
+        self.assertEqual(port_set.bounds, [(79, 81), (1000, 2500)])
+        self.assertEqual(len(port_set), 2)
+        self.assertEqual(
+            port_set.ranges, [PortRange('79-81'), PortRange('1000-2500')])
+        self.assertEqual(str(port_set), '79-81,1000-2500')
+        self.assertEqual(
+            repr(port_set), "PortRangeSet(['79-81', '1000-2500'])")
+
+        # Mixed input types.
+        port_set = PortRangeSet([PortRange('1024/6'), (4242, 42), 443])
+        self.assertEqual(port_set.bounds, [(42, 4242)])
+
+        # Empty sets.
+        self.assertFalse(PortRangeSet())
+        self.assertFalse(PortRangeSet([]))
+        self.assertTrue(PortRangeSet([80]))
+
+    def test_strict_parsing(self):
+        self.assertRaises(ValueError, PortRangeSet, ['4242-42'], True)
+        self.assertEqual(PortRangeSet(['4242-42']).bounds, [(42, 4242)])
+        self.assertEqual(
+            [port_range.strict for port_range in PortRangeSet(
+                ['80', '1024/6'], strict=True)], [True, True])
+        self.assertEqual(
+            [port_range.strict for port_range in PortRangeSet(['80'])],
+            [False])
+
+    def test_ports(self):
+        port_set = PortRangeSet(['80-82', '443', '1000-1100'])
+        self.assertEqual(port_set.popcount(), 105)
+        self.assertEqual(PortRangeSet().popcount(), 0)
+        self.assertEqual(
+            list(port_set.iter_ports())[:5], [80, 81, 82, 443, 1000])
+        self.assertEqual(
+            list(port_set.iter_ports(reverse=True))[-5:],
+            [1000, 443, 82, 81, 80])
+        self.assertEqual(len(list(port_set.iter_ports())), 105)
+
+        self.assertEqual(
+            [str(chunk) for chunk in port_set.iter_chunks(50)],
+            ['80-82', '443', '1000-1049', '1050-1099', '1100'])
+        self.assertEqual(
+            [str(chunk) for chunk in port_set.iter_chunks(64, aligned=True)],
+            ['80-82', '443', '1000-1023', '1024/10', '1088-1100'])
+        self.assertRaises(ValueError, port_set.iter_chunks, 6, True)
+
+    def test_membership(self):
+        port_set = PortRangeSet(['80-90', '443', '1000-2000'])
+        self.assertIn(80, port_set)
+        self.assertIn(90, port_set)
+        self.assertIn(443, port_set)
+        self.assertNotIn(79, port_set)
+        self.assertNotIn(91, port_set)
+        self.assertNotIn(444, port_set)
+        self.assertNotIn(1, port_set)
+        self.assertNotIn(65535, port_set)
+        self.assertIn(PortRange('1024/7'), port_set)
+        self.assertNotIn(PortRange('1024/6'), port_set)
+        self.assertIn('1500-2000', port_set)
+        self.assertNotIn('1500-2001', port_set)
+        self.assertNotIn('85-445', port_set)
+
+    def test_union(self):
+        left = PortRangeSet(['1-10', '20-30'])
+        right = PortRangeSet(['11-15', '25-40', '100'])
+        self.assertEqual(
+            (left | right).bounds, [(1, 15), (20, 40), (100, 100)])
+        self.assertEqual(
+            left.union(['50'], ['60']).bounds,
+            [(1, 10), (20, 30), (50, 50), (60, 60)])
+
+    def test_intersection(self):
+        left = PortRangeSet(['1-10', '20-30', '50-60'])
+        right = PortRangeSet(['5-25', '55', '70'])
+        self.assertEqual(
+            (left & right).bounds, [(5, 10), (20, 25), (55, 55)])
+        self.assertEqual(
+            left.intersection(['1-100'], ['8-9']).bounds, [(8, 9)])
+        self.assertFalse(left & PortRangeSet(['100-200']))
+
+    def test_difference(self):
+        left = PortRangeSet(['1-100', '200-300'])
+        right = PortRangeSet(['10-20', '30', '90-210', '300'])
+        self.assertEqual(
+            (left - right).bounds,
+            [(1, 9), (21, 29), (31, 89), (211, 299)])
+        self.assertEqual((right - left).bounds, [(101, 199)])
+        self.assertEqual((left - left).bounds, [])
+        self.assertEqual(left.difference(['1-50'], ['51-300']).bounds, [])
+
+    def test_symmetric_difference(self):
+        left = PortRangeSet(['1-10'])
+        right = PortRangeSet(['5-15'])
+        self.assertEqual((left ^ right).bounds, [(1, 4), (11, 15)])
+        self.assertEqual(
+            left.symmetric_difference(['11-20']).bounds, [(1, 20)])
+
+    def test_in_place_updates(self):
+        port_set = PortRangeSet(['1-10'])
+        alias = port_set
+        port_set |= PortRangeSet(['20'])
+        port_set.update(['30'], ['11-19'])
+        self.assertEqual(alias.bounds, [(1, 20), (30, 30)])
+        port_set -= PortRangeSet(['5'])
+        port_set.difference_update(['30'])
+        self.assertEqual(alias.bounds, [(1, 4), (6, 20)])
+        port_set &= PortRangeSet(['3-7'])
+        port_set.intersection_update(['1-6'])
+        self.assertEqual(alias.bounds, [(3, 4), (6, 6)])
+        port_set ^= PortRangeSet(['1-4'])
+        port_set.symmetric_difference_update(['8'])
+        self.assertEqual(alias.bounds, [(1, 2), (6, 6), (8, 8)])
+        self.assertEqual(port_set.popcount(), 4)
+        self.assertIn(8, port_set)
+        self.assertIs(port_set, alias)
+
+    def test_diff(self):
+        old = PortRangeSet(['80', '443', '1000-2000', '8000-8100'])
+        new = PortRangeSet(['80-81', '1000-1499', '1600-2000', '9000'])
+        delta = old.diff(new)
+        self.assertEqual(
+            [str(port_range) for port_range in delta.added],
+            ['81', '9000'])
+        self.assertEqual(
+            [str(port_range) for port_range in delta.removed],
+            ['443', '1500-1599', '8000-8100'])
+        self.assertEqual(old.diff(old), ([], []))
+        self.assertEqual(
+            PortRangeSet().diff(['1-65535'], cidr=True).added,
+            PortRange('1-65535').to_cidrs())
+
+        delta = old.diff(new, cidr=True)
+        self.assertTrue(all(
+            port_range.is_cidr for port_range in delta.removed))
+        self.assertEqual(
+            delta.removed,
+            PortRange('443').to_cidrs() + PortRange('1500-1599').to_cidrs() +
+            PortRange('8000-8100').to_cidrs())
+
+        # Deltas, as CIDR-like blocks or not, turn a set into the other.
+        for cidr in (False, True):
+            updated = PortRangeSet(old)
+            updated.apply(old.diff(new, cidr=cidr))
+            self.assertEqual(updated, new)
+            updated.apply(new.diff(old, cidr=cidr))
+            self.assertEqual(updated, old)
+
+    def test_comparison(self):
+        small = PortRangeSet(['10-20'])
+        large = PortRangeSet(['1-100'])
+        self.assertTrue(small.issubset(large))
+        self.assertTrue(small.issubset(['5-25']))
+        self.assertFalse(large.issubset(small))
+        self.assertTrue(large.issuperset(small))
+        self.assertTrue(small <= large)
+        self.assertTrue(small < large)
+        self.assertTrue(large > small)
+        self.assertTrue(large >= large)
+        self.assertFalse(large < large)
+        self.assertTrue(small.isdisjoint(['30-40']))
+        self.assertFalse(small.isdisjoint(large))
+        self.assertEqual(PortRangeSet(['1-5', '6-10']), PortRangeSet(['1-10']))
+        self.assertNotEqual(small, large)
+        self.assertNotEqual(small, ['10-20'])
+
+    def test_operand_types(self):
+        port_set = PortRangeSet(['80'])
+        for operator in ('__or__', '__and__', '__sub__', '__xor__',
+                         '__ior__', '__iand__', '__isub__', '__ixor__',
+                         '__le__', '__ge__', '__lt__', '__gt__'):
+            self.assertIs(
+                getattr(port_set, operator)(['80']), NotImplemented)
+        with self.assertRaises(TypeError):
+            port_set | ['80']
+        with self.assertRaises(TypeError):
+            hash(port_set)
+
+    def test_single_range_operands(self):
+        port_set = PortRangeSet(['1-100'])
+        self.assertEqual(str(port_set.union('200')), '1-100,200')
+        self.assertEqual(str(port_set.union(200)), '1-100,200')
+        self.assertEqual(str(port_set.difference('50')), '1-49,51-100')
+        self.assertTrue(port_set.isdisjoint('200'))
+        self.assertFalse(port_set.isdisjoint('1/16'))
+        self.assertTrue(port_set.issubset(PortRange('1-65535')))
+        self.assertFalse(port_set.issubset(PortRange('1-99')))
+        self.assertTrue(port_set.issuperset(PortRange('10-20')))
+        with self.assertRaises(TypeError):
+            PortRangeSet('443')
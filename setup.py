@@ -18,9 +18,11 @@ from __future__ import (
 
 import io
 import re
+import sys
 from os import path
 
 from setuptools import find_packages, setup
+from setuptools.command.build_py import build_py
 
 MODULE_NAME = 'port_range'
 PACKAGE_NAME = MODULE_NAME.replace('_', '-')
@@ -30,6 +32,10 @@ DEPENDENCIES = []
 EXTRA_DEPENDENCIES = {
     # Extra dependencies are made available through the
     # `$ pip install .[keyword]` command.
+    'numpy': [
+        'numpy'],
+    'parallel': [
+        'futures; python_version < "3"'],
     'tests': [
         'coverage',
         'nose',
@@ -100,6 +106,22 @@ def long_description():
         "CHANGES.rst#changelog>`_.".format(PACKAGE_NAME)])
 
 
+class BuildPy(build_py):
+
+    """ Skip modules using syntax unknown to the running interpreter. """
+
+    # Modules requiring asynchronous syntax, introduced by Python 3.5.
+    ASYNC_MODULES = [(MODULE_NAME, 'aio')]
+
+    def find_package_modules(self, package, package_dir):
+        modules = build_py.find_package_modules(self, package, package_dir)
+        if sys.version_info < (3, 5):
+            modules = [
+                module for module in modules
+                if module[:2] not in self.ASYNC_MODULES]
+        return modules
+
+
 setup(
     name=PACKAGE_NAME,
     version=version(),
@@ -121,6 +143,7 @@ setup(
     extras_require=EXTRA_DEPENDENCIES,
     dependency_links=[],
     test_suite='{}.tests'.format(MODULE_NAME),
+    cmdclass={'build_py': BuildPy},
 
     classifiers=[
         # See: https://pypi.python.org/pypi?:action=list_classifiers
@@ -145,6 +168,8 @@ setup(
     ],
 
     entry_points={
-        'console_scripts': [],
+        'console_scripts': [
+            'port-range = port_range.cli:main',
+        ],
     }
 )